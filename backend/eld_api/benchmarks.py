@@ -0,0 +1,281 @@
+"""Offline micro-benchmarks for the trip planning hot paths.
+
+Each case runs against a stub geocoder with fixed coordinates (and the
+road_route case against a synthetic road grid), so results only depend on
+this code and the machine. A case is timed over a number of
+runs, then run once more under tracemalloc and a query counter. Results
+can be saved as a JSON baseline and later runs compared against it.
+"""
+import csv
+import gc
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime
+from decimal import Decimal
+from unittest import mock
+
+from django.db import connection, transaction
+from django.test.client import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from geopy.location import Location
+
+from .geocoding import GeocodeCache
+from .models import LogEntry, LogSheet, Trip
+
+MILES_PER_DEGREE_LATITUDE = 69.05
+
+BENCHMARK_CASES = ('calculate_route', 'generate_log_sheets', 'generate_log_sheet_pdf', 'create_trip', 'road_route')
+
+
+class FixedGeocoder:
+    """Offline geocoder: 'Origin' sits at a fixed point, 'Destination <miles>' due north of it"""
+
+    origin = (30.0, -97.0)
+
+    def geocode(self, query):
+        if query.startswith('Destination '):
+            miles = float(query.split()[1])
+            return Location(query, (self.origin[0] + miles / MILES_PER_DEGREE_LATITUDE, self.origin[1]), {})
+        return Location(query, self.origin, {})
+
+
+def write_grid_extract(directory, origin, rows, cols, spacing_degrees=0.1, seed=1):
+    """Write a synthetic road grid north and east of `origin` as a nodes/edges extract.
+
+    Edges join neighbouring nodes, are up to 30% longer than the straight
+    line, run at 45, 55 or 70 mph, and one in ten is one-way. Returns the
+    (nodes, edges) CSV paths.
+    """
+    rng = random.Random(seed)
+    nodes_path = os.path.join(directory, 'nodes.csv')
+    edges_path = os.path.join(directory, 'edges.csv')
+    with open(nodes_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['id', 'lat', 'lon'])
+        for i in range(rows):
+            for j in range(cols):
+                writer.writerow([f"{i}_{j}", origin[0] + i * spacing_degrees, origin[1] + j * spacing_degrees])
+    with open(edges_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['u', 'v', 'length', 'speed_mph', 'oneway'])
+        for i in range(rows):
+            for j in range(cols):
+                for a, b in ((i + 1, j), (i, j + 1)):
+                    if a >= rows or b >= cols:
+                        continue
+                    degrees = spacing_degrees * (math.cos(math.radians(origin[0] + i * spacing_degrees)) if b > j else 1)
+                    meters = degrees * MILES_PER_DEGREE_LATITUDE * 1609.344 * rng.uniform(1.0, 1.3)
+                    writer.writerow([f"{i}_{j}", f"{a}_{b}", round(meters, 1), rng.choice((45, 55, 70)),
+                                     'yes' if rng.random() < 0.1 else 'no'])
+    return nodes_path, edges_path
+
+
+class Rollback(Exception):
+    """Raised to undo the rows a benchmark case wrote"""
+
+
+def measure(func, runs):
+    """Time `func` over `runs` calls, then profile one more call.
+
+    Returns ops/sec (from the median, which shrugs off the odd slow run)
+    and mean/p95 milliseconds, plus the peak traced memory (KiB), the
+    number of allocated blocks still live after the call and the SQL
+    queries (and INSERTs among them) of that one call. As with timeit, the garbage collector is off
+    while timing.
+    """
+    func()  # warm caches and lazy imports
+    timings = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(runs):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        with CaptureQueriesContext(connection) as queries:
+            func()
+        after = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, 'filename'))
+
+    timings.sort()
+    mean = statistics.mean(timings)
+    median = statistics.median(timings)
+    return {
+        'ops_per_sec': round(1 / median, 2) if median else None,
+        'mean_ms': round(mean * 1000, 3),
+        'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000, 3),
+        'peak_kib': round(peak / 1024, 1),
+        'allocated_blocks': blocks,
+        'queries': len(queries.captured_queries),
+        'inserts': sum(1 for q in queries.captured_queries if q['sql'].lstrip().upper().startswith('INSERT')),
+    }
+
+
+def run_benchmarks(miles_list=(100, 500, 1500, 3000), runs=20, cases=BENCHMARK_CASES):
+    """Run the selected cases for every trip length; returns {'case/miles': result}"""
+    # Imported here so patching get_geocoder below applies to them
+    from .pdf_service import ELDPDFService
+    from .services import ELDService, RouteService
+    from .views import create_trip
+
+    geocoder = FixedGeocoder()
+    results = {}
+    if 'road_route' in cases:
+        results.update(_measure_road_routes(miles_list, runs))
+    with mock.patch('eld_api.services.get_geocoder', return_value=geocoder):
+        for miles in miles_list:
+            destination = f"Destination {miles}"
+            route_service = RouteService(cache=GeocodeCache(), geolocator=geocoder)
+            route_data = route_service.calculate_route('Origin', destination, Decimal('10.00'))
+            trip = Trip(
+                pickup_location='Origin',
+                dropoff_location=destination,
+                current_cycle_hours=Decimal('10.00'),
+                created_at=timezone.make_aware(datetime(2026, 1, 5, 6, 0)),
+            )
+
+            if 'calculate_route' in cases:
+                results[f"calculate_route/{miles}"] = measure(
+                    lambda: route_service.calculate_route('Origin', destination, Decimal('10.00')), runs
+                )
+            if 'generate_log_sheets' in cases:
+                eld_service = ELDService()
+                results[f"generate_log_sheets/{miles}"] = measure(
+                    lambda: eld_service.generate_log_sheets(trip, route_data, start_date=date(2026, 1, 5)), runs
+                )
+            if 'generate_log_sheet_pdf' in cases:
+                results[f"generate_log_sheet_pdf/{miles}"] = _measure_pdf(
+                    ELDPDFService(), ELDService(), trip, route_data, runs
+                )
+            if 'create_trip' in cases:
+                results[f"create_trip/{miles}"] = _measure_create_trip(create_trip, destination, runs)
+    return results
+
+
+def _measure_road_routes(miles_list, runs):
+    """A* queries on a synthetic grid 1 degree wide, reaching past the longest trip"""
+    from .routing import RoadGraph, build_road_graph
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        # Origin sits in the middle column of the grid
+        corner = (FixedGeocoder.origin[0], FixedGeocoder.origin[1] - 0.5)
+        rows = int(max(miles_list) / MILES_PER_DEGREE_LATITUDE / 0.1) + 2
+        nodes_path, edges_path = write_grid_extract(directory, corner, rows, 11)
+        build_road_graph(nodes_path, edges_path, os.path.join(directory, 'graph'))
+        graph = RoadGraph(os.path.join(directory, 'graph'))
+        for miles in miles_list:
+            location = FixedGeocoder().geocode(f"Destination {miles}")
+            destination = (location.latitude, location.longitude)
+
+            def route():
+                assert graph.route(FixedGeocoder.origin, destination) is not None
+
+            results[f"road_route/{miles}"] = measure(route, runs)
+    return results
+
+
+def _measure_pdf(pdf_service, eld_service, trip, route_data, runs):
+    """Render the busiest log sheet of the trip, from rows that are rolled back afterwards"""
+    result = None
+    try:
+        with transaction.atomic():
+            trip.save()
+            sheets = eld_service.generate_log_sheets(trip, route_data, start_date=date(2026, 1, 5))
+            sheet_data = max(sheets, key=lambda sheet: len(sheet['entries']))
+            fields = {key: value for key, value in sheet_data.items() if key != 'entries'}
+            log_sheet = LogSheet.objects.create(trip=trip, **fields)
+            LogEntry.objects.bulk_create([LogEntry(log_sheet=log_sheet, **entry) for entry in sheet_data['entries']])
+            log_sheet = LogSheet.objects.prefetch_related('entries').get(id=log_sheet.id)
+            result = measure(lambda: pdf_service.generate_log_sheet_pdf(log_sheet, trip), runs)
+            raise Rollback
+    except Rollback:
+        pass
+    trip.id = None
+    return result
+
+
+def _measure_create_trip(view, destination, runs):
+    """Full create_trip request; every trip it writes is rolled back"""
+    factory = RequestFactory(SERVER_NAME='localhost')
+    payload = {
+        'current_location': 'Origin',
+        'pickup_location': 'Origin',
+        'dropoff_location': destination,
+        'current_cycle_hours': '10.00',
+    }
+
+    def request():
+        response = view(factory.post('/api/trips/create/', payload, content_type='application/json'))
+        assert response.status_code == 201, response.data
+
+    result = None
+    try:
+        with transaction.atomic():
+            result = measure(request, runs)
+            raise Rollback
+    except Rollback:
+        pass
+    return result
+
+
+def machine_info():
+    """Where a baseline was recorded; timings only compare on the same setup"""
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def load_baseline(path):
+    """Return (results, machine info) from a baseline file"""
+    with open(path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    return baseline['results'], baseline.get('machine', {})
+
+
+def save_baseline(path, results):
+    baseline = {'created_at': timezone.now().isoformat(), 'machine': machine_info(), 'results': results}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def compare(results, baseline, threshold=0.25):
+    """Regressions against a baseline, as human-readable strings.
+
+    Throughput and peak memory may drift by `threshold` (a fraction) before
+    they count; any increase in queries counts.
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base or not result:
+            continue
+        if base.get('ops_per_sec') and result['ops_per_sec'] < base['ops_per_sec'] * (1 - threshold):
+            regressions.append(f"{name}: {result['ops_per_sec']} ops/s, baseline {base['ops_per_sec']}")
+        if base.get('peak_kib') and result['peak_kib'] > base['peak_kib'] * (1 + threshold):
+            regressions.append(f"{name}: peak {result['peak_kib']} KiB, baseline {base['peak_kib']}")
+        if result['queries'] > base.get('queries', 0):
+            regressions.append(f"{name}: {result['queries']} queries, baseline {base['queries']}")
+    return regressions
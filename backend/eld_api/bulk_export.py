@@ -0,0 +1,114 @@
+"""Streaming NDJSON export of trips with their routes, log sheets and entries.
+
+Trips are read in id order with `.iterator(chunk_size=...)`, which uses a
+server-side cursor on PostgreSQL. The children of each chunk of trips are
+fetched with one query per table, so memory depends on the chunk size and
+never on the size of the export. Each line is one record:
+
+    {"type": "trip", "data": {...}}
+    {"type": "route", "data": {...}}
+    {"type": "log_sheet", "data": {...}}
+    {"type": "log_entry", "data": {...}}
+    {"type": "checkpoint", "cursor": "..."}
+    {"type": "end", "trips": 42, "cursor": "..."}
+
+Records have the same fields as the API returns. A checkpoint follows each
+complete trip; passing its cursor to a new export resumes right after that
+trip. The cursor on the final `end` line (absent when no trip was exported)
+picks up trips created since.
+"""
+import base64
+from datetime import datetime, time, timedelta
+
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .fast_serializers import TripRowSerializer
+from .models import LogSheet, Trip
+from .renderers import FastJSONRenderer
+
+EXPORT_CONTENT_TYPE = 'application/x-ndjson'
+
+
+def encode_export_cursor(trip_id):
+    return base64.urlsafe_b64encode(f"trip:{trip_id}".encode('ascii')).decode('ascii')
+
+
+def decode_export_cursor(cursor):
+    """Trip id an export cursor points after; ValueError when malformed"""
+    try:
+        kind, trip_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('ascii').split(':')
+    except (TypeError, ValueError, UnicodeError):
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    if kind != 'trip' or not trip_id.isdigit():
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return int(trip_id)
+
+
+def export_trips_queryset(start_date=None, end_date=None, driver_name=None, cursor=None):
+    """Trips to export, in id order.
+
+    Dates bound the day a trip was created (inclusive), `driver_name`
+    keeps trips with log sheets for that driver, and `cursor` skips the
+    trips an earlier export already covered.
+    """
+    trips = Trip.objects.all()
+    if start_date:
+        trips = trips.filter(created_at__gte=timezone.make_aware(datetime.combine(start_date, time.min)))
+    if end_date:
+        trips = trips.filter(created_at__lt=timezone.make_aware(datetime.combine(end_date + timedelta(days=1), time.min)))
+    if driver_name:
+        trips = trips.filter(Exists(LogSheet.objects.filter(trip=OuterRef('pk'), driver_name=driver_name)))
+    if cursor:
+        trips = trips.filter(id__gt=decode_export_cursor(cursor))
+    return trips.order_by('id')
+
+
+def _trip_records(trip):
+    routes = trip.pop('routes')
+    log_sheets = trip.pop('log_sheets')
+    yield {'type': 'trip', 'data': trip}
+    for route in routes:
+        yield {'type': 'route', 'data': route}
+    for log_sheet in log_sheets:
+        entries = log_sheet.pop('entries')
+        yield {'type': 'log_sheet', 'data': log_sheet}
+        for entry in entries:
+            yield {'type': 'log_entry', 'data': entry}
+    yield {'type': 'checkpoint', 'cursor': encode_export_cursor(trip['id'])}
+
+
+def iter_export_records(trips, chunk_size=100):
+    """Export records (dicts) for an ordered trip queryset, one chunk of trips in memory at a time"""
+    serializer = TripRowSerializer()
+    count = 0
+    last_id = None
+    chunk = []
+
+    def flush():
+        for trip in serializer.serialize(chunk):
+            yield from _trip_records(trip)
+
+    for row in serializer.values_list(trips).iterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield from flush()
+            count += len(chunk)
+            last_id = chunk[-1][1]
+            chunk = []
+    if chunk:
+        yield from flush()
+        count += len(chunk)
+        last_id = chunk[-1][1]
+
+    end = {'type': 'end', 'trips': count}
+    if last_id is not None:
+        end['cursor'] = encode_export_cursor(last_id)
+    yield end
+
+
+def iter_ndjson(records):
+    """Encode records as NDJSON lines (bytes)"""
+    renderer = FastJSONRenderer()
+    for record in records:
+        yield renderer.render(record) + b'\n'
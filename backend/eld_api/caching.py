@@ -0,0 +1,95 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_etags, quote_etag
+
+from .geocoding import normalize_location
+from .metrics import observe_cache
+
+
+def make_etag(data):
+    """Strong ETag over the JSON form of a response payload"""
+    payload = json.dumps(data, sort_keys=True, separators=(',', ':'), default=str)
+    return quote_etag(hashlib.md5(payload.encode('utf-8')).hexdigest())
+
+
+def etag_matches(request, etag):
+    """True when the request's If-None-Match header covers the given ETag.
+
+    The comparison is weak, as If-None-Match requires: GZip turns ETags of
+    compressed responses into W/"..." ones, which must still match.
+    """
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    etags = [tag.removeprefix('W/') for tag in parse_etags(header)]
+    return '*' in etags or etag.removeprefix('W/') in etags
+
+
+def set_validators(response, etag, last_modified=None):
+    """Add ETag/Last-Modified to a response; clients must revalidate before reusing it"""
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def conditional_response(request, etag, last_modified=None):
+    """304 (or 412) response when the request's preconditions say so, else None"""
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(last_modified.timestamp()) if last_modified is not None else None,
+    )
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def version_etag(kind, object_id, version, updated_at):
+    """ETag of a resource whose content is fully determined by its trip version.
+
+    The version's timestamp is part of it so that a snapshot recreated at
+    version 1 never matches an ETag handed out for the one it replaced.
+    """
+    return quote_etag(f"{kind}-{object_id}-v{version}-{updated_at.timestamp():.6f}")
+
+
+def route_plan_cache_key(pickup_location, dropoff_location, current_cycle_hours, current_location=None):
+    """Cache key for a route plan: normalized endpoints plus a cycle-hours bucket"""
+    bucket = int(current_cycle_hours // getattr(settings, 'ROUTE_PLAN_CYCLE_BUCKET_HOURS', 1))
+    parts = [normalize_location(pickup_location), normalize_location(dropoff_location),
+             normalize_location(current_location or ''), str(bucket)]
+    digest = hashlib.md5('|'.join(parts).encode('utf-8')).hexdigest()
+    return f"route_plan:{digest}"
+
+
+def get_cached_route_plan(key):
+    """Return the cached {'etag', 'route_data'} entry for a plan key, if any"""
+    entry = cache.get(key)
+    observe_cache('route_plan', entry is not None)
+    return entry
+
+
+def cache_route_plan(key, route_data):
+    entry = {'etag': make_etag(route_data), 'route_data': route_data}
+    cache.set(key, entry, getattr(settings, 'ROUTE_PLAN_CACHE_TTL', 60 * 60))
+    return entry
+
+
+async def aget_cached_route_plan(key):
+    """Async get_cached_route_plan"""
+    entry = await cache.aget(key)
+    observe_cache('route_plan', entry is not None)
+    return entry
+
+
+async def acache_route_plan(key, route_data):
+    """Async cache_route_plan"""
+    entry = {'etag': make_etag(route_data), 'route_data': route_data}
+    await cache.aset(key, entry, getattr(settings, 'ROUTE_PLAN_CACHE_TTL', 60 * 60))
+    return entry
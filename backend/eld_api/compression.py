@@ -0,0 +1,50 @@
+"""Response compression for the API's JSON.
+
+Trip documents with every log entry run to hundreds of kilobytes of very
+repetitive JSON. CompressionMiddleware is Django's GZipMiddleware plus
+Brotli, which compresses such payloads noticeably better. Brotli is used
+when the client accepts `br` and the optional `brotli` package is
+installed. Only JSON and text are compressed; PDFs and ZIP archives are
+left as they are.
+"""
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional
+    brotli = None
+
+re_accepts_brotli = _lazy_re_compile(r'\bbr\b')
+
+COMPRESSIBLE_CONTENT_TYPES = ('application/json', 'application/x-ndjson', 'text/')
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """Compress JSON and text responses with Brotli when accepted, else gzip"""
+
+    def process_response(self, request, response):
+        if not response.get('Content-Type', '').startswith(COMPRESSIBLE_CONTENT_TYPES):
+            return response
+        if (brotli is None or response.streaming or len(response.content) < 200
+                or response.has_header('Content-Encoding')
+                or not re_accepts_brotli.search(request.META.get('HTTP_ACCEPT_ENCODING', ''))):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        compressed_content = brotli.compress(
+            response.content, mode=brotli.MODE_TEXT, quality=getattr(settings, 'BROTLI_QUALITY', 5)
+        )
+        if len(compressed_content) >= len(response.content):
+            return response
+        response.content = compressed_content
+        response.headers['Content-Length'] = str(len(response.content))
+
+        # Weak ETag for the encoded representation, as GZipMiddleware does
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+        return response
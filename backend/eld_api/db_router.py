@@ -0,0 +1,149 @@
+"""Read replica routing.
+
+Views decorated with `replica_reads` (trip and log sheet reads, PDF
+downloads) read from one of the DATABASE_REPLICAS; every write goes to the
+primary. A request stays on the primary:
+
+- after its own first write;
+- when its client wrote within DATABASE_REPLICA_STICKY_SECONDS, marked by
+  a short-lived cookie, so that clients read their own writes despite
+  replication lag;
+- inside a `primary_reads()` block.
+
+With no replicas configured, everything uses the primary.
+"""
+import contextvars
+import random
+from contextlib import contextmanager
+from functools import wraps
+from types import SimpleNamespace
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+PIN_COOKIE = 'eld_primary'
+
+_routing = contextvars.ContextVar('eld_db_routing', default=None)
+
+
+def replica_aliases():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+@contextmanager
+def _replica_reads():
+    state = _routing.get()
+    if state is None:
+        yield
+        return
+    previous, state.use_replica = state.use_replica, True
+    try:
+        yield
+    finally:
+        state.use_replica = previous
+
+
+def replica_reads(view):
+    """Let a read-only view (sync or async) read from a replica"""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(*args, **kwargs):
+            with _replica_reads():
+                return await view(*args, **kwargs)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        with _replica_reads():
+            return view(*args, **kwargs)
+    return wrapper
+
+
+@contextmanager
+def primary_reads():
+    """Read from the primary inside this block"""
+    state = _routing.get()
+    if state is None:
+        yield
+        return
+    previous, state.pinned = state.pinned, True
+    try:
+        yield
+    finally:
+        state.pinned = previous
+
+
+class ReplicaRouter:
+    """Database router sending reads of replica_reads views to a replica"""
+
+    def db_for_read(self, model, **hints):
+        state = _routing.get()
+        aliases = replica_aliases()
+        if state is None or not state.use_replica or state.pinned or not aliases:
+            return DEFAULT_DB_ALIAS
+        # One replica per request, for consistent reads within it
+        if state.replica is None:
+            state.replica = random.choice(aliases)
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _routing.get()
+        if state is not None:
+            state.wrote = state.pinned = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema through replication
+        if db in replica_aliases():
+            return False
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """Track database routing per request and keep writing clients on the primary for a while"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state, token = self._start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing.reset(token)
+        return self._finish(state, response)
+
+    async def __acall__(self, request):
+        state, token = self._start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _routing.reset(token)
+        return self._finish(state, response)
+
+    def _start(self, request):
+        state = SimpleNamespace(
+            use_replica=False, replica=None, wrote=False,
+            pinned=request.method not in ('GET', 'HEAD', 'OPTIONS') or PIN_COOKIE in request.COOKIES,
+        )
+        return state, _routing.set(state)
+
+    def _finish(self, state, response):
+        if state.wrote and replica_aliases():
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=getattr(settings, 'DATABASE_REPLICA_STICKY_SECONDS', 5),
+                secure=settings.SESSION_COOKIE_SECURE, httponly=True, samesite=settings.SESSION_COOKIE_SAMESITE,
+            )
+        return response
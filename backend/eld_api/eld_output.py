@@ -0,0 +1,211 @@
+"""FMCSA ELD output file (49 CFR 395 subpart B, appendix A, section 4.8.2).
+
+ELDOutputFile streams the standard CSV output file for one driver's log
+sheets over a date range. The header segment and user and CMV lists come
+first. Then each log entry becomes a change-in-duty-status event, and
+entries with remarks also get an annotation line. Sections this app has no
+data for, such as certifications, malfunctions, logins and engine power
+events, are written with their headers only. Sheets are read in keyset
+chunks of ELD_OUTPUT_CHUNK_SIZE on (date, id), so memory does not grow
+with the range. The file data check value is summed line by line as the
+file streams.
+
+Odometer and engine hours are not tracked, so those fields are 0.
+Coordinates come from the trip's route stop at the entry's location, when
+there is one.
+"""
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import LogEntry, LogSheet, Route
+
+# ASCII value - 48 for 1-9, A-Z and a-z, 0 for anything else (appendix A, table 3)
+_CHECK_VALUES = bytes(b - 48 if chr(b).isascii() and chr(b).isalnum() else 0 for b in range(256))
+
+# Duty status event codes for event type 1 (change in driver's duty status)
+EVENT_CODES = {'off_duty': '1', 'sleeper': '2', 'driving': '3', 'on_duty': '4'}
+
+# Driving is recorded automatically by the ELD; other statuses are entered by the driver
+EVENT_ORIGINS = {'driving': '1'}
+
+# Multi-day basis of the 70 hour / 8 day cycle the planner uses
+MULTIDAY_BASIS = '8'
+
+EMPTY_SECTIONS = (
+    "Driver's Certification/Recertification Actions:",
+    'Malfunctions and Data Diagnostic Events:',
+    'ELD Login/Logout Report:',
+    'CMV Engine Power-Up and Shut Down Activity:',
+    'Unidentified Driver Profile Records:',
+)
+
+
+def _rotate_left(value, bits, width):
+    mask = (1 << width) - 1
+    return ((value << bits) | (value >> (width - bits))) & mask
+
+
+def _char_sum(text):
+    return sum(text.encode('ascii', 'replace').translate(_CHECK_VALUES))
+
+
+def line_check_value(text):
+    """Line data check value of a line's text, as two hex digits"""
+    return f'{_rotate_left(_char_sum(text) & 0xFF, 3, 8) ^ 0x96:02X}'
+
+
+def event_check_value(*fields):
+    """Event data check value over an event's type, code, date, time, miles, hours, position, CMV and user"""
+    return f'{_rotate_left(sum(_char_sum(field) for field in fields) & 0xFF, 3, 8) ^ 0xC3:02X}'
+
+
+def file_check_value(line_check_total):
+    """File data check value from the sum of all line data check values, as four hex digits"""
+    return f'{_rotate_left(line_check_total & 0xFFFF, 3, 16) ^ 0x969C:04X}'
+
+
+def clean_field(value, max_length=60):
+    """Field text without the commas, line breaks and non-ASCII characters the format cannot carry"""
+    text = ' '.join(str(value or '').replace(',', ' ').split())
+    return text.encode('ascii', 'replace').decode('ascii')[:max_length]
+
+
+def split_driver_name(driver_name):
+    """(last name, first name) of a 'First Last' driver name"""
+    first, _, last = clean_field(driver_name).rpartition(' ')
+    return last, first
+
+
+def eld_username(driver_name):
+    return ''.join(c for c in clean_field(driver_name).lower() if c.isalnum())[:60]
+
+
+class ELDOutputFile:
+    """Iterable of the encoded lines of a driver's ELD output file"""
+
+    def __init__(self, driver_name, start_date, end_date, comment='', chunk_size=None):
+        self.driver_name = driver_name
+        self.log_sheets = LogSheet.objects.filter(driver_name=driver_name, date__range=(start_date, end_date))
+        self.comment = clean_field(comment)
+        self.chunk_size = chunk_size or getattr(settings, 'ELD_OUTPUT_CHUNK_SIZE', 100)
+        self.last_name, self.first_name = split_driver_name(driver_name)
+        self.username = eld_username(driver_name)
+        self._check_total = 0
+
+    @property
+    def filename(self):
+        return f"eld_{self.username}_{timezone.now():%m%d%y}.csv"
+
+    def __iter__(self):
+        # Lines are joined into blocks of about 64 KB rather than written one by one
+        block, size = [], 0
+        for line in self.lines():
+            block.append(line)
+            size += len(line)
+            if size >= 65536:
+                yield ('\r\n'.join(block) + '\r\n').encode('ascii')
+                block, size = [], 0
+        if block:
+            yield ('\r\n'.join(block) + '\r\n').encode('ascii')
+
+    def _line(self, *fields):
+        """CSV line of fields followed by its line data check value"""
+        text = ','.join(fields)
+        check = line_check_value(text)
+        self._check_total += int(check, 16)
+        return f'{text},{check}'
+
+    def lines(self):
+        self._check_total = 0
+        vehicles = list(self.log_sheets.order_by('vehicle_id').values_list('vehicle_id', flat=True).distinct())
+        current_vehicle = self.log_sheets.order_by('-date', '-id').values_list('vehicle_id', flat=True).first()
+        cmv_orders = {vehicle_id: str(order) for order, vehicle_id in enumerate(vehicles, 1)}
+        now = timezone.now()
+
+        yield 'ELD File Header Segment:'
+        yield self._line(self.last_name, self.first_name, self.username, '', '')
+        yield self._line('', '', '')
+        yield self._line(clean_field(current_vehicle or ''), '', '')
+        yield self._line(
+            clean_field(getattr(settings, 'ELD_CARRIER_USDOT', '')), clean_field(getattr(settings, 'ELD_CARRIER_NAME', '')),
+            MULTIDAY_BASIS, '000000', getattr(settings, 'ELD_TIME_ZONE_OFFSET', '00'),
+        )
+        yield self._line('', '0')
+        yield self._line(f'{now:%m%d%y}', f'{now:%H%M%S}', '', '', '0', '0.0')
+        yield self._line(
+            clean_field(getattr(settings, 'ELD_REGISTRATION_ID', '')), clean_field(getattr(settings, 'ELD_IDENTIFIER', '')),
+            '', self.comment,
+        )
+
+        yield 'User List:'
+        yield self._line('1', 'D', self.last_name, self.first_name)
+
+        yield 'CMV List:'
+        for vehicle_id, order in cmv_orders.items():
+            yield self._line(order, clean_field(vehicle_id), '')
+
+        yield 'ELD Event List:'
+        for sheet, entry, position in self._entries():
+            _, _, sheet_date, vehicle_id = sheet
+            entry_id, _, entry_time, status, _, _ = entry
+            code = EVENT_CODES.get(status, '1')
+            date, time = f'{sheet_date:%m%d%y}', f'{entry_time:%H%M%S}'
+            latitude, longitude = position
+            vehicle = clean_field(vehicle_id)
+            yield self._line(
+                f'{entry_id & 0xFFFF:X}', '1', EVENT_ORIGINS.get(status, '2'), '1', code, date, time,
+                '0', '0.0', latitude, longitude, '0', cmv_orders[vehicle_id], '1', '0', '0',
+                event_check_value('1', code, date, time, '0', '0.0', latitude, longitude, vehicle, self.username),
+            )
+
+        yield 'ELD Event Annotations or Comments:'
+        for sheet, entry, _ in self._entries(with_remarks=True):
+            entry_id, _, entry_time, _, location, remarks = entry
+            yield self._line(
+                f'{entry_id & 0xFFFF:X}', self.username, clean_field(remarks),
+                f'{sheet[2]:%m%d%y}', f'{entry_time:%H%M%S}', clean_field(location),
+            )
+
+        for header in EMPTY_SECTIONS:
+            yield header
+
+        yield 'End of File:'
+        yield file_check_value(self._check_total)
+
+    def _sheet_chunks(self):
+        """Lists of (id, trip_id, date, vehicle_id) sheet rows, keyset-paginated on (date, id)"""
+        sheets = self.log_sheets.order_by('date', 'id').values_list('id', 'trip_id', 'date', 'vehicle_id')
+        last = None
+        while True:
+            chunk = sheets
+            if last is not None:
+                chunk = chunk.filter(Q(date__gt=last[2]) | Q(date=last[2], id__gt=last[0]))
+            chunk = list(chunk[:self.chunk_size])
+            if not chunk:
+                return
+            yield chunk
+            last = chunk[-1]
+
+    def _entries(self, with_remarks=False):
+        """(sheet, entry, (latitude, longitude)) for every entry, in sheet and time order"""
+        for sheets in self._sheet_chunks():
+            entries = LogEntry.objects.filter(log_sheet_id__in=[sheet[0] for sheet in sheets])
+            if with_remarks:
+                entries = entries.exclude(remarks='')
+            by_sheet = {}
+            for entry in entries.order_by('time', 'id').values_list(
+                    'id', 'log_sheet_id', 'time', 'status', 'location', 'remarks'):
+                by_sheet.setdefault(entry[1], []).append(entry)
+
+            positions = {}
+            if not with_remarks:
+                stops = Route.objects.filter(
+                    trip_id__in={sheet[1] for sheet in sheets}, latitude__isnull=False, longitude__isnull=False
+                ).values_list('trip_id', 'location', 'latitude', 'longitude')
+                for trip_id, location, latitude, longitude in stops:
+                    positions[trip_id, location] = (f'{latitude:.2f}', f'{longitude:.2f}')
+
+            for sheet in sheets:
+                for entry in by_sheet.get(sheet[0], ()):
+                    yield sheet, entry, positions.get((sheet[1], entry[4]), ('', ''))
@@ -0,0 +1,147 @@
+import logging
+import multiprocessing
+import os
+import time
+import zipfile
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from .models import ExportJob, LogSheet
+from .pdf_workers import init_pdf_worker, render_log_sheet_pdf
+
+logger = logging.getLogger(__name__)
+
+# Shared pool running export jobs; each job renders on a process pool of its
+# own, so only a few run at once and the rest wait their turn as pending
+export_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'EXPORT_MAX_CONCURRENT_JOBS', 1),
+    thread_name_prefix='export',
+)
+
+
+def export_workers():
+    return getattr(settings, 'PDF_EXPORT_WORKERS', None) or os.cpu_count() or 1
+
+
+def write_log_sheets_zip(log_sheets, output, workers=None, progress=None):
+    """Render log sheets across a process pool into a ZIP archive.
+    
+    Each PDF is written into the archive as soon as its worker finishes, and
+    at most a few sheets per worker are in flight so memory stays bounded
+    however many sheets the iterable yields. `progress` is called with the
+    number of sheets written so far. Returns that number.
+    """
+    workers = workers or export_workers()
+    max_pending = workers * 4
+    written = 0
+    # Spawned workers do not inherit the parent's threads or DB connections
+    context = multiprocessing.get_context('spawn')
+    
+    # PDF content streams are already compressed, so entries are stored as-is
+    with zipfile.ZipFile(output, 'w', zipfile.ZIP_STORED) as archive, \
+            ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=init_pdf_worker) as pool:
+        pending = set()
+        
+        def collect(return_when):
+            nonlocal pending, written
+            done, pending = wait(pending, return_when=return_when)
+            for future in done:
+                name, data = future.result()
+                archive.writestr(name, data)
+                written += 1
+            if done and progress:
+                progress(written)
+        
+        for log_sheet in log_sheets:
+            pending.add(pool.submit(render_log_sheet_pdf, log_sheet))
+            if len(pending) >= max_pending:
+                collect(FIRST_COMPLETED)
+        collect(ALL_COMPLETED)
+    
+    return written
+
+
+def export_job_log_sheets(job):
+    """Log sheets selected by an export job, with their trips and entries preloaded"""
+    log_sheets = LogSheet.objects.select_related('trip').prefetch_related('entries')
+    if job.trip_id:
+        log_sheets = log_sheets.filter(trip_id=job.trip_id)
+    if job.driver_name:
+        log_sheets = log_sheets.filter(driver_name=job.driver_name)
+    if job.start_date:
+        log_sheets = log_sheets.filter(date__gte=job.start_date)
+    if job.end_date:
+        log_sheets = log_sheets.filter(date__lte=job.end_date)
+    return log_sheets.order_by('date', 'id')
+
+
+def run_export_job(job_id):
+    """Run an export job to completion, recording progress on the job row"""
+    job = ExportJob.objects.get(pk=job_id)
+    log_sheets = export_job_log_sheets(job)
+    path = os.path.join(str(settings.EXPORT_DIR), f"log_sheets_export_{job.id}.zip")
+    
+    # Claim the job; one left pending too long may already have been failed as stale
+    if not ExportJob.objects.filter(pk=job.id, status='pending').update(
+            status='running', total=log_sheets.count(), file_path=path, heartbeat_at=timezone.now()):
+        logger.warning(f"Export job {job.id} is no longer pending, not running it")
+        return
+    last_update = 0
+    
+    def progress(written):
+        # Throttle progress writes to a few per second
+        nonlocal last_update
+        now = time.monotonic()
+        if now - last_update >= 0.5:
+            ExportJob.objects.filter(pk=job.id).update(completed=written, heartbeat_at=timezone.now())
+            last_update = now
+    
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        written = write_log_sheets_zip(
+            log_sheets.iterator(chunk_size=settings.PDF_EXPORT_CHUNK_SIZE), path, progress=progress
+        )
+    except Exception as e:
+        logger.exception(f"Export job {job.id} failed")
+        ExportJob.objects.filter(pk=job.id).update(status='failed', error=str(e), finished_at=timezone.now())
+        return
+    
+    ExportJob.objects.filter(pk=job.id).update(status='completed', completed=written, finished_at=timezone.now())
+
+
+def start_export_job(job):
+    """Queue an export job on the shared export pool so the request returns at once"""
+    def target():
+        try:
+            run_export_job(job.id)
+        finally:
+            connection.close()
+    
+    export_executor.submit(target)
+
+
+def fail_stale_export_job(job):
+    """Mark an unfinished job as failed when it has made no progress for EXPORT_JOB_STALE_SECONDS.
+
+    Jobs run in the web process, so a restart or crash leaves them running
+    (or, if still queued, pending) forever otherwise. Progress is the last
+    heartbeat, or the job's creation for one that never started. Returns
+    whether the job was marked failed.
+    """
+    if job.status not in ('pending', 'running'):
+        return False
+    cutoff = timezone.now() - timedelta(seconds=getattr(settings, 'EXPORT_JOB_STALE_SECONDS', 600))
+    if (job.heartbeat_at or job.created_at) >= cutoff:
+        return False
+    error = 'Export stopped making progress, most likely because its worker process exited'
+    finished_at = timezone.now()
+    if not ExportJob.objects.filter(pk=job.id, status=job.status, heartbeat_at=job.heartbeat_at).update(
+            status='failed', error=error, finished_at=finished_at):
+        job.refresh_from_db()
+        return False
+    job.status, job.error, job.finished_at = 'failed', error, finished_at
+    return True
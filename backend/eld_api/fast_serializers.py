@@ -0,0 +1,220 @@
+"""Read-only serializers working on `.values_list()` rows.
+
+A ModelSerializer builds a model instance per row, then runs every field
+through a DRF field object. For a long trip, most of that time goes into
+Decimal and time conversions. The serializers here select only the columns
+they output. Each column gets a converter, compiled once from the matching
+DRF field, that formats values exactly as the field would. The JSON is
+therefore the same as the ModelSerializers in serializers.py produce.
+"""
+import decimal
+from collections import defaultdict
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.settings import ISO_8601, api_settings
+
+from .models import LogEntry, LogSheet, Route
+from .serializers import LogEntrySerializer, LogSheetSerializer, RouteSerializer, TripSerializer
+
+
+def _stock(field, field_class):
+    """True when `field` formats values with field_class's own to_representation"""
+    return isinstance(field, field_class) and type(field).to_representation is field_class.to_representation
+
+
+def _convert_decimal(field):
+    if (not getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+            or field.localize or getattr(field, 'normalize_output', False) or field.decimal_places is None):
+        return field.to_representation
+    quantum = decimal.Decimal('.1') ** field.decimal_places
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+    rounding = field.rounding
+
+    def convert(value):
+        if not isinstance(value, decimal.Decimal):
+            return field.to_representation(value)
+        return f'{value.quantize(quantum, rounding=rounding, context=context):f}'
+    return convert
+
+
+def _convert_datetime(field):
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    if output_format is None or output_format.lower() != ISO_8601 or field_timezone is None:
+        return field.to_representation
+
+    def convert(value):
+        if getattr(value, 'tzinfo', None) is None:
+            return field.to_representation(value)
+        text = value.astimezone(field_timezone).isoformat()
+        return text[:-6] + 'Z' if text.endswith('+00:00') else text
+    return convert
+
+
+def _convert_isoformat(field, default_format):
+    output_format = getattr(field, 'format', default_format)
+    if output_format is None or output_format.lower() != ISO_8601:
+        return field.to_representation
+
+    def convert(value):
+        return value if isinstance(value, str) else value.isoformat()
+    return convert
+
+
+def _convert_choice(field):
+    choices = field.choice_strings_to_values
+
+    def convert(value):
+        return choices.get(value, value) if isinstance(value, str) else field.to_representation(value)
+    return convert
+
+
+def compile_converter(field):
+    """Function formatting a non-null column value the way `field` does; None when no change is needed"""
+    if _stock(field, serializers.PrimaryKeyRelatedField) and field.pk_field is None:
+        return None
+    if _stock(field, serializers.DecimalField):
+        return _convert_decimal(field)
+    if _stock(field, serializers.DateTimeField):
+        return _convert_datetime(field)
+    if _stock(field, serializers.DateField):
+        return _convert_isoformat(field, api_settings.DATE_FORMAT)
+    if _stock(field, serializers.TimeField):
+        return _convert_isoformat(field, api_settings.TIME_FORMAT)
+    if _stock(field, serializers.ChoiceField):
+        return _convert_choice(field)
+    if _stock(field, serializers.IntegerField):
+        return int
+    # DRF 3.16+ maps BigAutoField ids to BigIntegerField
+    big_integer_field = getattr(serializers, 'BigIntegerField', None)
+    if big_integer_field is not None and _stock(field, big_integer_field):
+        return str if getattr(field, 'coerce_to_string', api_settings.COERCE_BIGINT_TO_STRING) else int
+    if _stock(field, serializers.FloatField):
+        return float
+    if _stock(field, serializers.CharField):
+        return str
+    return field.to_representation
+
+
+class RowSerializer:
+    """Read-only counterpart of a ModelSerializer instance for `.values_list()` rows.
+
+    `columns` lists the model columns to select, in row order. Fields that
+    are not columns, such as nested serializers or annotations, are read
+    from the `extra` dict passed to to_representation. They are left out
+    when missing there, as DRF skips a read-only attribute that the
+    instance does not have.
+    """
+
+    def __init__(self, serializer):
+        opts = serializer.Meta.model._meta
+        self.columns = []
+        self._plan = []
+        for name, field in serializer.fields.items():
+            try:
+                model_field = opts.get_field(field.source)
+            except FieldDoesNotExist:
+                model_field = None
+            if model_field is None or not model_field.concrete or isinstance(field, serializers.BaseSerializer):
+                self._plan.append((name, None, None))
+            else:
+                self._plan.append((name, len(self.columns), compile_converter(field)))
+                self.columns.append(model_field.attname)
+        self._flat = all(index is not None for _, index, _ in self._plan)
+
+    def to_representation(self, row, extra=None):
+        if self._flat:
+            return {
+                name: value if value is None or convert is None else convert(value)
+                for (name, _, convert), value in zip(self._plan, row)
+            }
+        data = {}
+        for name, index, convert in self._plan:
+            if index is None:
+                if extra and name in extra:
+                    data[name] = extra[name]
+                continue
+            value = row[index]
+            data[name] = value if value is None or convert is None else convert(value)
+        return data
+
+
+class LogSheetRowSerializer:
+    """Fast LogSheetSerializer: log sheets with their entries, two queries for any number of sheets"""
+
+    def __init__(self):
+        self.sheet = RowSerializer(LogSheetSerializer())
+        self.entry = RowSerializer(LogEntrySerializer())
+
+    def serialize(self, queryset, group_by=None):
+        """Serialized log sheets of a queryset, in its order.
+
+        With `group_by` (a column such as 'trip_id'), returns a dict of lists
+        of sheets keyed by that column instead.
+        """
+        extra_columns = ('id',) if group_by is None else ('id', group_by)
+        rows = list(queryset.values_list(*self.sheet.columns, *extra_columns))
+        entries = defaultdict(list)
+        if rows:
+            id_index = len(self.sheet.columns)
+            entry_rows = LogEntry.objects.filter(
+                log_sheet_id__in=[row[id_index] for row in rows]
+            ).values_list(*self.entry.columns, 'log_sheet_id')
+            for row in entry_rows:
+                entries[row[-1]].append(self.entry.to_representation(row))
+
+        if group_by is None:
+            return [self.sheet.to_representation(row, {'entries': entries[row[-1]]}) for row in rows]
+        grouped = defaultdict(list)
+        for row in rows:
+            grouped[row[-1]].append(self.sheet.to_representation(row, {'entries': entries[row[-2]]}))
+        return grouped
+
+
+class TripRowSerializer:
+    """Fast TripSerializer(many=True, fields=...) for trip_list and trip snapshots.
+
+    Trip rows come from `values_list(queryset)`; routes, log sheets and
+    entries are then fetched with one query each, as prefetch_related would.
+    """
+
+    def __init__(self, fields=None):
+        serializer = TripSerializer(fields=fields)
+        self.trip = RowSerializer(serializer)
+        self.routes = RowSerializer(RouteSerializer()) if 'routes' in serializer.fields else None
+        self.log_sheets = LogSheetRowSerializer() if 'log_sheets' in serializer.fields else None
+        self.log_sheet_count = 'log_sheet_count' in serializer.fields
+
+    def values_list(self, queryset):
+        """Rows of (created_at, id, *columns) for a trip queryset, plus log_sheet_count when annotated"""
+        columns = ['created_at', 'id', *self.trip.columns]
+        if self.log_sheet_count and 'log_sheet_count' in queryset.query.annotations:
+            columns.append('log_sheet_count')
+        return queryset.values_list(*columns)
+
+    def serialize(self, rows):
+        rows = list(rows)
+        trip_ids = [row[1] for row in rows]
+        routes = defaultdict(list)
+        if self.routes and trip_ids:
+            for row in Route.objects.filter(trip_id__in=trip_ids).values_list(*self.routes.columns, 'trip_id'):
+                routes[row[-1]].append(self.routes.to_representation(row))
+        log_sheets = defaultdict(list)
+        if self.log_sheets and trip_ids:
+            log_sheets = self.log_sheets.serialize(LogSheet.objects.filter(trip_id__in=trip_ids), group_by='trip_id')
+
+        width = 2 + len(self.trip.columns)
+        data = []
+        for row in rows:
+            extra = {}
+            if self.routes:
+                extra['routes'] = routes[row[1]]
+            if self.log_sheets:
+                extra['log_sheets'] = log_sheets[row[1]]
+            if len(row) > width:
+                extra['log_sheet_count'] = row[width]
+            data.append(self.trip.to_representation(row[2:width], extra))
+        return data
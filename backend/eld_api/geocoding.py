@@ -0,0 +1,463 @@
+import asyncio
+import csv
+import logging
+import mmap
+import os
+import re
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from datetime import timedelta
+from functools import lru_cache
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError
+from django.utils import timezone
+from geopy.adapters import AioHTTPAdapter
+from geopy.geocoders import Nominatim
+from geopy.location import Location
+
+from .metrics import observe_cache
+from .models import GeocodeCacheEntry
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_location(location):
+    """Normalize a location string so equivalent spellings share a cache key"""
+    location = re.sub(r'\s*,\s*', ', ', location.strip().lower())
+    return re.sub(r'\s+', ' ', location).strip(' ,')
+
+
+US_STATES = {
+    'al': 'alabama', 'ak': 'alaska', 'az': 'arizona', 'ar': 'arkansas', 'ca': 'california',
+    'co': 'colorado', 'ct': 'connecticut', 'de': 'delaware', 'dc': 'district of columbia',
+    'fl': 'florida', 'ga': 'georgia', 'hi': 'hawaii', 'id': 'idaho', 'il': 'illinois',
+    'in': 'indiana', 'ia': 'iowa', 'ks': 'kansas', 'ky': 'kentucky', 'la': 'louisiana',
+    'me': 'maine', 'md': 'maryland', 'ma': 'massachusetts', 'mi': 'michigan', 'mn': 'minnesota',
+    'ms': 'mississippi', 'mo': 'missouri', 'mt': 'montana', 'ne': 'nebraska', 'nv': 'nevada',
+    'nh': 'new hampshire', 'nj': 'new jersey', 'nm': 'new mexico', 'ny': 'new york',
+    'nc': 'north carolina', 'nd': 'north dakota', 'oh': 'ohio', 'ok': 'oklahoma', 'or': 'oregon',
+    'pa': 'pennsylvania', 'ri': 'rhode island', 'sc': 'south carolina', 'sd': 'south dakota',
+    'tn': 'tennessee', 'tx': 'texas', 'ut': 'utah', 'vt': 'vermont', 'va': 'virginia',
+    'wa': 'washington', 'wv': 'west virginia', 'wi': 'wisconsin', 'wy': 'wyoming',
+}
+
+COUNTRY_SUFFIXES = (', usa', ', us', ', united states', ', united states of america')
+
+GAZETTEER_MAGIC = b'GAZ1'
+
+
+def gazetteer_key(location):
+    """Normalize a location for the gazetteer index (drops a trailing country)"""
+    key = normalize_location(location)
+    for suffix in COUNTRY_SUFFIXES:
+        if key.endswith(suffix):
+            return key[:-len(suffix)]
+    return key
+
+
+def build_gazetteer_index(source_path, output_path):
+    """Build a sorted, memory-mappable index from a city/state/zip CSV.
+
+    The source needs `city`, `state`, `latitude` and `longitude` columns and
+    may have a `zip` column. Each row is indexed as "city, st", "city, state"
+    and its zip code. The output layout is:
+
+        magic (4 bytes) | count (uint32)
+        coordinates     (count * 2 float64, lat/lon)
+        key offsets     ((count + 1) uint32 into the key blob)
+        key blob        (utf-8 keys, sorted bytewise)
+
+    Returns the number of keys written.
+    """
+    entries = {}
+    with open(source_path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            try:
+                coords = (float(row['latitude']), float(row['longitude']))
+            except (KeyError, TypeError, ValueError):
+                continue
+            city = normalize_location(row.get('city') or '')
+            state = normalize_location(row.get('state') or '')
+            zip_code = (row.get('zip') or '').strip()
+            keys = []
+            if city and state:
+                keys.append(f"{city}, {state}")
+                if state in US_STATES:
+                    keys.append(f"{city}, {US_STATES[state]}")
+            if zip_code:
+                keys.append(zip_code)
+            for key in keys:
+                # First row wins so duplicate city names keep a stable position
+                entries.setdefault(key.encode('utf-8'), coords)
+
+    keys = sorted(entries)
+    coords = array('d')
+    offsets = array('I', [0])
+    for key in keys:
+        coords.extend(entries[key])
+        offsets.append(offsets[-1] + len(key))
+
+    tmp_path = f"{output_path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(GAZETTEER_MAGIC)
+        f.write(array('I', [len(keys)]).tobytes())
+        f.write(coords.tobytes())
+        f.write(offsets.tobytes())
+        f.write(b''.join(keys))
+    os.replace(tmp_path, output_path)
+    return len(keys)
+
+
+class GazetteerIndex:
+    """Read-only view over a memory-mapped gazetteer index file"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:4] != GAZETTEER_MAGIC:
+            raise ValueError(f"{path} is not a gazetteer index")
+        view = memoryview(self._mmap)
+        self.count = view[4:8].cast('I')[0]
+        coords_end = 8 + 16 * self.count
+        offsets_end = coords_end + 4 * (self.count + 1)
+        self._coords = view[8:coords_end].cast('d')
+        self._offsets = view[coords_end:offsets_end].cast('I')
+        self._keys_base = offsets_end
+
+    def __len__(self):
+        return self.count
+
+    def _key(self, i):
+        start = self._keys_base + self._offsets[i]
+        return self._mmap[start:self._keys_base + self._offsets[i + 1]]
+
+    def _coordinates(self, i):
+        return (self._coords[2 * i], self._coords[2 * i + 1])
+
+    def _lower_bound(self, key):
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def lookup(self, location):
+        """Exact match on the normalized key, or a bare city name that names one place.
+
+        "amarillo" matches when every "amarillo, ..." key has the same
+        coordinates. Partial names and zips, and names shared by several
+        places ("springfield"), are misses left to the fallback geocoder;
+        search() lists prefix matches.
+        """
+        key = gazetteer_key(location).encode('utf-8')
+        if not key:
+            return None
+        i = self._lower_bound(key)
+        if i < self.count and self._key(i) == key:
+            return key.decode('utf-8'), self._coordinates(i)
+
+        city_prefix = key + b','
+        i = self._lower_bound(city_prefix)
+        if i >= self.count or not self._key(i).startswith(city_prefix):
+            return None
+        coordinates = self._coordinates(i)
+        j = i + 1
+        while j < self.count and self._key(j).startswith(city_prefix):
+            if self._coordinates(j) != coordinates:
+                return None
+            j += 1
+        return self._key(i).decode('utf-8'), coordinates
+
+    def search(self, prefix, limit=10):
+        """Return up to `limit` (key, coordinates) pairs starting with a prefix"""
+        key = gazetteer_key(prefix).encode('utf-8')
+        results = []
+        i = self._lower_bound(key)
+        while i < self.count and len(results) < limit and self._key(i).startswith(key):
+            results.append((self._key(i).decode('utf-8'), self._coordinates(i)))
+            i += 1
+        return results
+
+
+@lru_cache(maxsize=None)
+def load_gazetteer(path):
+    """Map a gazetteer index once per process"""
+    return GazetteerIndex(path)
+
+
+class GazetteerGeocoder:
+    """Geocoder backed by the local gazetteer index.
+
+    Exposes the same `geocode()` call as geopy geocoders. Misses are passed to
+    the fallback geocoder, if any.
+    """
+
+    def __init__(self, index, fallback=None):
+        self.index = index
+        self.fallback = fallback
+
+    def geocode(self, query):
+        match = self.index.lookup(query)
+        if match:
+            address, coords = match
+            return Location(address, coords, {'source': 'gazetteer'})
+        if self.fallback is not None:
+            return self.fallback.geocode(query)
+        return None
+
+
+class RequestThrottle:
+    """Process-wide spacing of geocoder requests to at most `rate` per second.
+
+    Each caller reserves the next free slot under a lock and then sleeps
+    until it, so threads and event loops share one schedule.
+    """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def delay(self):
+        """Seconds to wait before the caller's request may go out"""
+        if not self.interval:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+            return slot - now
+
+    def wait(self):
+        delay = self.delay()
+        if delay:
+            time.sleep(delay)
+
+    async def await_slot(self):
+        delay = self.delay()
+        if delay:
+            await asyncio.sleep(delay)
+
+
+@lru_cache(maxsize=None)
+def get_nominatim_throttle():
+    return RequestThrottle(getattr(settings, 'GEOCODE_RATE_LIMIT', 1))
+
+
+class ThrottledGeocoder:
+    """Geocoder whose requests are spaced by the shared Nominatim throttle"""
+
+    def __init__(self, geocoder, throttle=None):
+        self.geocoder = geocoder
+        self.throttle = throttle or get_nominatim_throttle()
+
+    def geocode(self, query):
+        self.throttle.wait()
+        return self.geocoder.geocode(query)
+
+
+class AsyncThrottledGeocoder(ThrottledGeocoder):
+    """ThrottledGeocoder over an async geocoder, used with `async with`"""
+
+    async def geocode(self, query):
+        await self.throttle.await_slot()
+        return await self.geocoder.geocode(query)
+
+    async def __aenter__(self):
+        await self.geocoder.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.geocoder.__aexit__(*exc_info)
+
+
+def nominatim_client(**kwargs):
+    return Nominatim(
+        user_agent="trucking_eld_app",
+        domain=getattr(settings, 'NOMINATIM_DOMAIN', 'nominatim.openstreetmap.org'),
+        timeout=getattr(settings, 'GEOCODE_REQUEST_TIMEOUT', 5),
+        **kwargs
+    )
+
+
+def get_geocoder():
+    """Build the geocoder selected by settings.GEOCODER_BACKEND"""
+    nominatim = ThrottledGeocoder(nominatim_client())
+    if getattr(settings, 'GEOCODER_BACKEND', 'nominatim') != 'gazetteer':
+        return nominatim
+
+    path = settings.GAZETTEER_INDEX_PATH
+    try:
+        index = load_gazetteer(str(path))
+    except (OSError, ValueError) as e:
+        logger.warning(f"Gazetteer index unavailable at {path}, using Nominatim: {e}")
+        return nominatim
+    fallback = nominatim if getattr(settings, 'GAZETTEER_FALLBACK', True) else None
+    return GazetteerGeocoder(index, fallback=fallback)
+
+
+class AsyncGazetteerGeocoder(GazetteerGeocoder):
+    """GazetteerGeocoder for async callers; the fallback must be async too"""
+
+    async def geocode(self, query):
+        match = self.index.lookup(query)
+        if match:
+            address, coords = match
+            return Location(address, coords, {'source': 'gazetteer'})
+        if self.fallback is not None:
+            return await self.fallback.geocode(query)
+        return None
+
+    async def __aenter__(self):
+        if self.fallback is not None:
+            await self.fallback.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        if self.fallback is not None:
+            await self.fallback.__aexit__(*exc_info)
+
+
+class ThreadedAsyncGeocoder:
+    """Async interface over a blocking geocoder, run on worker threads"""
+
+    def __init__(self, geocoder):
+        self.geocoder = geocoder
+
+    async def geocode(self, query):
+        return await sync_to_async(self.geocoder.geocode, thread_sensitive=False)(query)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+
+def get_async_geocoder():
+    """Async counterpart of get_geocoder(), to be used with `async with`.
+
+    Nominatim runs on aiohttp when it is installed; otherwise the blocking
+    client is moved to worker threads so the event loop stays free.
+    """
+    if AioHTTPAdapter.is_available:
+        nominatim = nominatim_client(adapter_factory=AioHTTPAdapter)
+    else:
+        nominatim = ThreadedAsyncGeocoder(nominatim_client())
+    nominatim = AsyncThrottledGeocoder(nominatim)
+    if getattr(settings, 'GEOCODER_BACKEND', 'nominatim') != 'gazetteer':
+        return nominatim
+
+    path = settings.GAZETTEER_INDEX_PATH
+    try:
+        index = load_gazetteer(str(path))
+    except (OSError, ValueError) as e:
+        logger.warning(f"Gazetteer index unavailable at {path}, using Nominatim: {e}")
+        return nominatim
+    fallback = nominatim if getattr(settings, 'GAZETTEER_FALLBACK', True) else None
+    return AsyncGazetteerGeocoder(index, fallback=fallback)
+
+
+class GeocodeCache:
+    """Two-tier geocode cache: an in-process LRU in front of the database table.
+
+    Entries map a normalized location string to a (lat, lon) tuple, or to None
+    for lookups that returned no result (negative caching).
+    """
+
+    def __init__(self, max_size=None, ttl=None, negative_ttl=None):
+        self.max_size = max_size or getattr(settings, 'GEOCODE_CACHE_MAX_SIZE', 1024)
+        self.ttl = ttl or getattr(settings, 'GEOCODE_CACHE_TTL', 60 * 60 * 24 * 30)
+        self.negative_ttl = negative_ttl or getattr(settings, 'GEOCODE_CACHE_NEGATIVE_TTL', 60 * 60 * 24)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    def get(self, location):
+        """Return (found, coordinates) for a location string"""
+        key = normalize_location(location)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                coords, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.memory_hits += 1
+                    observe_cache('geocode_memory', True)
+                    return True, coords
+                del self._entries[key]
+        observe_cache('geocode_memory', False)
+
+        try:
+            row = GeocodeCacheEntry.objects.filter(query=key, expires_at__gt=timezone.now()).first()
+        except DatabaseError as e:
+            logger.warning(f"Geocode cache lookup failed for {key}: {e}")
+            row = None
+
+        observe_cache('geocode_db', row is not None)
+        if row is None:
+            with self._lock:
+                self.misses += 1
+            return False, None
+
+        coords = row.coordinates
+        self._remember(key, coords, row.expires_at.timestamp())
+        with self._lock:
+            self.db_hits += 1
+        return True, coords
+
+    def set(self, location, coords):
+        """Store coordinates (or None for a failed lookup) in both tiers"""
+        key = normalize_location(location)
+        ttl = self.ttl if coords else self.negative_ttl
+        expires_at = timezone.now() + timedelta(seconds=ttl)
+        self._remember(key, coords, expires_at.timestamp())
+
+        latitude, longitude = coords if coords else (None, None)
+        try:
+            GeocodeCacheEntry.objects.update_or_create(
+                query=key,
+                defaults={'latitude': latitude, 'longitude': longitude, 'expires_at': expires_at},
+            )
+        except DatabaseError as e:
+            logger.warning(f"Geocode cache write failed for {key}: {e}")
+
+    def clear(self):
+        """Drop the in-process tier and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.memory_hits = self.db_hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.memory_hits + self.db_hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'memory_hits': self.memory_hits,
+                'db_hits': self.db_hits,
+                'misses': self.misses,
+                'hit_rate': (self.memory_hits + self.db_hits) / lookups if lookups else 0.0,
+            }
+
+    def _remember(self, key, coords, expires_at):
+        with self._lock:
+            self._entries[key] = (coords, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+# Shared by every RouteService in the process
+geocode_cache = GeocodeCache()
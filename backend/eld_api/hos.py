@@ -0,0 +1,274 @@
+"""Event-driven Hours-of-Service simulation for property-carrying drivers.
+
+A trip is walked as a stream of duty-status segments in integer minutes,
+applying the rules that bound a driver's day:
+
+- 11 hours of driving after 10 consecutive hours off duty
+- no driving after the 14th hour since coming on duty
+- a 30-minute break after 8 cumulative hours of driving
+- 70 hours on duty in any 8 consecutive days, reset by a 34-hour restart
+
+Each step either drives until the nearest limit or takes the stop that limit
+calls for, so a trip costs O(segments) regardless of its length. The result
+is kept in compact integer arrays and folded into per-day log totals and
+entries in one more pass. Nothing depends on the wall clock: the same trip
+and start time always produce the same logs.
+"""
+from array import array
+from datetime import time, timedelta
+
+MINUTES_PER_DAY = 24 * 60
+
+# Duty statuses, in the order of the lines on an ELD grid
+OFF_DUTY, SLEEPER, DRIVING, ON_DUTY = range(4)
+STATUSES = ('off_duty', 'sleeper', 'driving', 'on_duty')
+
+# Why a segment happened; drives the entry remarks and the stop counters
+KIND_OFF, KIND_PICKUP, KIND_DRIVE, KIND_BREAK, KIND_FUEL, KIND_REST, KIND_RESTART, KIND_DROPOFF = range(8)
+REMARKS = (
+    'Off duty',
+    'Pickup - loading',
+    'Driving',
+    '30-minute break',
+    'Fuel stop',
+    '10-hour rest period',
+    '34-hour cycle restart',
+    'Dropoff - unloading',
+)
+REST_KINDS = (KIND_BREAK, KIND_REST, KIND_RESTART)
+
+
+class HOSTimeline:
+    """Duty-status segments of a simulated trip.
+
+    Parallel arrays, one item per segment: start minute (counted from
+    midnight of the first day), duration in minutes, status, kind and the
+    route mileage at the start of the segment.
+    """
+
+    def __init__(self):
+        self.starts = array('i')
+        self.durations = array('i')
+        self.statuses = array('b')
+        self.kinds = array('b')
+        self.miles = array('d')
+        self.total_miles = 0.0
+        self.cycle_minutes_by_day = []
+
+    def __len__(self):
+        return len(self.starts)
+
+    @property
+    def end(self):
+        return self.starts[-1] + self.durations[-1] if self.starts else 0
+
+    @property
+    def days(self):
+        return -(-self.end // MINUTES_PER_DAY)
+
+
+class HOSSimulator:
+    """Plan a trip's duty statuses under the property-carrying HOS rules"""
+
+    def __init__(self, average_speed_mph=60, max_driving_hours=11, duty_window_hours=14,
+                 break_after_hours=8, break_minutes=30, required_rest_hours=10,
+                 max_cycle_hours=70, cycle_days=8, restart_hours=34,
+                 fuel_interval_miles=1000, fuel_minutes=30, pickup_minutes=60, dropoff_minutes=60):
+        self.average_speed_mph = average_speed_mph
+        self.max_driving = max_driving_hours * 60
+        self.duty_window = duty_window_hours * 60
+        self.break_after = break_after_hours * 60
+        self.break_minutes = break_minutes
+        self.required_rest = required_rest_hours * 60
+        self.max_cycle = max_cycle_hours * 60
+        self.cycle_days = cycle_days
+        self.restart = restart_hours * 60
+        self.fuel_interval_miles = fuel_interval_miles
+        self.fuel_minutes = fuel_minutes
+        self.pickup_minutes = pickup_minutes
+        self.dropoff_minutes = dropoff_minutes
+
+    def simulate(self, distance_miles, start_minute=6 * 60, prior_cycle_hours=0, average_speed_mph=None):
+        """Simulate a trip starting `start_minute` after midnight of day one.
+
+        `prior_cycle_hours` are on-duty hours already worked; they are taken
+        as spread evenly over the 7 days before the trip and drop out of the
+        rolling window one day at a time. `average_speed_mph` overrides the
+        simulator's speed for this trip, e.g. with one derived from road speeds.
+        """
+        timeline = HOSTimeline()
+        timeline.total_miles = float(distance_miles)
+
+        # On-duty minutes per calendar day; the first cycle_days - 1 slots
+        # hold the prior days so the window is a plain slice
+        prior_days = self.cycle_days - 1
+        prior_minutes = int(round(float(prior_cycle_hours) * 60))
+        on_duty_by_day = [prior_minutes // prior_days + (1 if i < prior_minutes % prior_days else 0)
+                          for i in range(prior_days)]
+        self._timeline = timeline
+        self._on_duty_by_day = on_duty_by_day
+        self._prior_days = prior_days
+        self._restart_slots = []
+        self._now = 0
+        self._mile = 0.0
+
+        if start_minute:
+            self._emit(OFF_DUTY, KIND_OFF, start_minute)
+
+        self._emit(ON_DUTY, KIND_PICKUP, self.pickup_minutes)
+        window_start = start_minute
+        driven_since_rest = 0
+        driven_since_break = 0
+        miles_left = float(distance_miles)
+        next_fuel = self.fuel_interval_miles
+        minutes_per_mile = 60.0 / (average_speed_mph or self.average_speed_mph)
+
+        while miles_left > 1e-9:
+            cycle_left = self.max_cycle - self._cycle_used()
+            if cycle_left <= 0:
+                self._emit(OFF_DUTY, KIND_RESTART, self.restart)
+                # Days before the one the restart ends on no longer count
+                self._restart_slots.append(prior_days + self._now // MINUTES_PER_DAY)
+                window_start = self._now
+                driven_since_rest = driven_since_break = 0
+                continue
+            if driven_since_rest >= self.max_driving or self._now - window_start >= self.duty_window:
+                self._emit(OFF_DUTY, KIND_REST, self.required_rest)
+                window_start = self._now
+                driven_since_rest = driven_since_break = 0
+                continue
+            if driven_since_break >= self.break_after:
+                self._emit(OFF_DUTY, KIND_BREAK, self.break_minutes)
+                driven_since_break = 0
+                continue
+            if self._mile >= next_fuel - 1e-9:
+                self._emit(ON_DUTY, KIND_FUEL, self.fuel_minutes)
+                next_fuel += self.fuel_interval_miles
+                # A 30-minute stop also satisfies the break rule
+                if self.fuel_minutes >= self.break_minutes:
+                    driven_since_break = 0
+                continue
+
+            # Drive until the nearest limit, the next fuel stop, midnight
+            # (the rolling cycle is recomputed per day) or the destination
+            drive = min(
+                self.max_driving - driven_since_rest,
+                window_start + self.duty_window - self._now,
+                self.break_after - driven_since_break,
+                cycle_left,
+                MINUTES_PER_DAY - self._now % MINUTES_PER_DAY,
+            )
+            miles = min(miles_left, next_fuel - self._mile, drive / minutes_per_mile)
+            minutes = max(1, int(round(miles * minutes_per_mile)))
+            self._emit(DRIVING, KIND_DRIVE, minutes, miles)
+            miles_left -= miles
+            driven_since_rest += minutes
+            driven_since_break += minutes
+
+        self._emit(ON_DUTY, KIND_DROPOFF, self.dropoff_minutes)
+
+        # Fill the last day so every day accounts for 24 hours
+        tail = -self._now % MINUTES_PER_DAY
+        if tail:
+            self._emit(OFF_DUTY, KIND_OFF, tail)
+
+        timeline.cycle_minutes_by_day = [self._cycle_used(day) for day in range(timeline.days)]
+        return timeline
+
+    def _cycle_used(self, day=None):
+        """On-duty minutes in the rolling window ending on a day (default: today)"""
+        if day is None:
+            day = self._now // MINUTES_PER_DAY
+        end = self._prior_days + day + 1
+        start = max([0, end - self.cycle_days] + [slot for slot in self._restart_slots if slot < end])
+        return sum(self._on_duty_by_day[start:end])
+
+    def _emit(self, status, kind, minutes, miles=0.0):
+        timeline = self._timeline
+        timeline.starts.append(self._now)
+        timeline.durations.append(minutes)
+        timeline.statuses.append(status)
+        timeline.kinds.append(kind)
+        timeline.miles.append(self._mile)
+
+        if status in (DRIVING, ON_DUTY):
+            # Book on-duty time against each calendar day it touches
+            start, end = self._now, self._now + minutes
+            while start < end:
+                day = start // MINUTES_PER_DAY
+                day_end = min(end, (day + 1) * MINUTES_PER_DAY)
+                slot = self._prior_days + day
+                while len(self._on_duty_by_day) <= slot:
+                    self._on_duty_by_day.append(0)
+                self._on_duty_by_day[slot] += day_end - start
+                start = day_end
+
+        self._now += minutes
+        self._mile += miles
+
+
+def daily_logs(timeline, start_date, locate=None):
+    """Fold a timeline into one log per calendar day.
+
+    Each day gets minutes per status, miles driven, stop counts, the rolling
+    cycle minutes used at the end of the day and its entries. A segment that
+    runs past midnight is split, and the next day opens with an entry at
+    00:00. `locate(mile)` names the location at a route mileage.
+    """
+    days = timeline.days
+    logs = [{
+        'date': start_date + timedelta(days=day),
+        'minutes': [0, 0, 0, 0],
+        'miles': 0.0,
+        'fuel_stops': 0,
+        'rest_stops': 0,
+        'cycle_minutes': timeline.cycle_minutes_by_day[day] if day < len(timeline.cycle_minutes_by_day) else 0,
+        'entries': [],
+    } for day in range(days)]
+
+    if locate is None:
+        locate = route_locator(timeline.total_miles)
+
+    for i in range(len(timeline)):
+        start = timeline.starts[i]
+        end = start + timeline.durations[i]
+        status = timeline.statuses[i]
+        kind = timeline.kinds[i]
+        first_day = start // MINUTES_PER_DAY
+        location = locate(timeline.miles[i])
+
+        if kind == KIND_FUEL:
+            logs[first_day]['fuel_stops'] += 1
+        elif kind in REST_KINDS:
+            logs[first_day]['rest_stops'] += 1
+        if status == DRIVING:
+            miles = (timeline.miles[i + 1] if i + 1 < len(timeline) else timeline.total_miles) - timeline.miles[i]
+
+        while start < end:
+            day = start // MINUTES_PER_DAY
+            day_end = min(end, (day + 1) * MINUTES_PER_DAY)
+            log = logs[day]
+            minute_of_day = start - day * MINUTES_PER_DAY
+            log['minutes'][status] += day_end - start
+            if status == DRIVING:
+                log['miles'] += miles * (day_end - start) / timeline.durations[i]
+            log['entries'].append({
+                'time': time(minute_of_day // 60, minute_of_day % 60),
+                'status': STATUSES[status],
+                'location': location,
+                'remarks': REMARKS[kind] if day == first_day else f"{REMARKS[kind]} (continued)",
+            })
+            start = day_end
+
+    return logs
+
+
+def route_locator(total_miles, pickup_location='Pickup', dropoff_location='Dropoff'):
+    """Name the location at a route mileage for log entries"""
+    def locate(mile):
+        if mile <= 0:
+            return pickup_location
+        if mile >= total_miles - 1e-6:
+            return dropoff_location
+        return f"En route - mile {int(mile)}"
+    return locate
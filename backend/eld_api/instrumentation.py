@@ -0,0 +1,199 @@
+"""Per-request performance instrumentation.
+
+`timed('phase')` records how long a named phase of the current request took
+(geocode, route_plan, hos, db_write, serialize, pdf_render). Phases may nest;
+each one is reported net of the phases inside it, so they never add up to
+more than the request. `PerformanceMiddleware` collects the phases and the
+SQL queries of every request. It reports them in a `Server-Timing` header
+and a structured log line. When asked, it also writes a cProfile profile
+of the request to disk.
+"""
+import cProfile
+import contextvars
+import json
+import logging
+import os
+import re
+import time
+from contextlib import ContextDecorator, contextmanager
+from types import SimpleNamespace
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.crypto import constant_time_compare
+
+from .metrics import observe_request
+
+logger = logging.getLogger('eld_api.performance')
+
+_current_timer = contextvars.ContextVar('eld_request_timer', default=None)
+
+
+class RequestTimer:
+    """Phase durations and SQL counters for one request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.total_seconds = None
+        self._stack = []
+
+    def enter(self):
+        # Child time of the phase being entered
+        self._stack.append(0.0)
+
+    def exit(self, phase, elapsed):
+        child = self._stack.pop()
+        self.phases[phase] = self.phases.get(phase, 0.0) + elapsed - child
+        if self._stack:
+            self._stack[-1] += elapsed
+
+    def finish(self):
+        self.total_seconds = time.perf_counter() - self.started
+
+
+class timed(ContextDecorator):
+    """Time a phase of the current request; a no-op outside of one"""
+
+    def __init__(self, phase):
+        self.phase = phase
+
+    def _recreate_cm(self):
+        # A fresh instance per decorated call keeps concurrent calls apart
+        return timed(self.phase)
+
+    def __enter__(self):
+        self._timer = _current_timer.get()
+        if self._timer is not None:
+            self._timer.enter()
+            self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._timer is not None:
+            self._timer.exit(self.phase, time.perf_counter() - self._start)
+        return False
+
+
+def count_query(execute, sql, params, many, context):
+    """Execute wrapper adding each query and its time to the current request"""
+    timer = _current_timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timer.queries += 1
+        timer.db_seconds += time.perf_counter() - start
+
+
+def install_query_counter(sender, connection, **kwargs):
+    """connection_created receiver: count queries on every connection.
+
+    Installed per connection rather than per request so that queries made
+    from sync_to_async threads, which use their own connections, are
+    counted too; the current request is found through a context variable.
+    """
+    if count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_query)
+
+
+def server_timing_header(timer):
+    """Server-Timing value for a finished request"""
+    metrics = [f"{phase};dur={seconds * 1000:.1f}" for phase, seconds in timer.phases.items()]
+    metrics.append(f'db;dur={timer.db_seconds * 1000:.1f};desc="{timer.queries} queries"')
+    metrics.append(f"total;dur={timer.total_seconds * 1000:.1f}")
+    return ', '.join(metrics)
+
+
+def should_profile(request):
+    """Profile every request when PROFILE_REQUESTS is on, or one that sends the profiling token"""
+    if getattr(settings, 'PROFILE_REQUESTS', False):
+        return True
+    token = getattr(settings, 'PROFILE_TOKEN', '')
+    header = request.META.get('HTTP_X_PROFILE', '')
+    return bool(token and header and constant_time_compare(header, token))
+
+
+def profile_path(request):
+    slug = re.sub(r'[^A-Za-z0-9]+', '-', request.path).strip('-') or 'root'
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{int(time.time() * 1000) % 1000:03d}-{request.method}-{slug}.prof"
+    return os.path.join(str(settings.PROFILE_DIR), name)
+
+
+class PerformanceMiddleware:
+    """Time request phases and SQL, report them, and profile requests on demand"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with self._measure(request) as measurement:
+            measurement.response = self.get_response(request)
+        return self._report(request, measurement)
+
+    async def __acall__(self, request):
+        with self._measure(request) as measurement:
+            measurement.response = await self.get_response(request)
+        return self._report(request, measurement)
+
+    @contextmanager
+    def _measure(self, request):
+        measurement = SimpleNamespace(timer=RequestTimer(), response=None, profiler=None)
+        if should_profile(request):
+            measurement.profiler = cProfile.Profile()
+        token = _current_timer.set(measurement.timer)
+        if measurement.profiler is not None:
+            measurement.profiler.enable()
+        try:
+            yield measurement
+        finally:
+            if measurement.profiler is not None:
+                measurement.profiler.disable()
+            _current_timer.reset(token)
+            measurement.timer.finish()
+
+    def _report(self, request, measurement):
+        timer, response = measurement.timer, measurement.response
+        if getattr(settings, 'SERVER_TIMING', True):
+            response['Server-Timing'] = server_timing_header(timer)
+
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(timer.total_seconds * 1000, 1),
+            'queries': timer.queries,
+            'db_ms': round(timer.db_seconds * 1000, 1),
+            'phases': {phase: round(seconds * 1000, 1) for phase, seconds in timer.phases.items()},
+        }
+        if measurement.profiler is not None:
+            path = profile_path(request)
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                measurement.profiler.dump_stats(path)
+                record['profile'] = path
+            except OSError as e:
+                logger.warning(f"Could not write profile to {path}: {e}")
+        logger.info(json.dumps(record), extra={'performance': record})
+
+        match = getattr(request, 'resolver_match', None)
+        observe_request(
+            request.method,
+            match.url_name or match.view_name if match else 'unmatched',
+            response.status_code,
+            timer.total_seconds,
+            timer.queries,
+            timer.phases,
+        )
+        return response
@@ -0,0 +1,58 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from eld_api.benchmarks import (
+    BENCHMARK_CASES, compare, load_baseline, machine_info, run_benchmarks, save_baseline,
+)
+
+
+class Command(BaseCommand):
+    help = 'Run the offline benchmark suite and compare it with the saved baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--miles', type=int, nargs='+', default=[100, 500, 1500, 3000])
+        parser.add_argument('--runs', type=int, default=20)
+        parser.add_argument('--case', dest='cases', choices=BENCHMARK_CASES, action='append',
+                            help='Run only this case (repeatable)')
+        parser.add_argument('--baseline', default=settings.BENCHMARK_BASELINE_PATH,
+                            help='Baseline JSON file (default: settings.BENCHMARK_BASELINE_PATH)')
+        parser.add_argument('--save', action='store_true', help='Write the results as the new baseline')
+        parser.add_argument('--threshold', type=float, default=0.25,
+                            help='Allowed throughput/memory regression as a fraction (default: 0.25)')
+
+    def handle(self, *args, **options):
+        results = run_benchmarks(options['miles'], options['runs'], options['cases'] or BENCHMARK_CASES)
+
+        self.stdout.write(
+            f"{'case':<30} {'ops/s':>10} {'mean ms':>9} {'p95 ms':>9} {'peak KiB':>9} {'blocks':>8} {'queries':>8} "
+            f"{'inserts':>8}"
+        )
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<30} {result['ops_per_sec']:>10.1f} {result['mean_ms']:>9.2f} {result['p95_ms']:>9.2f} "
+                f"{result['peak_kib']:>9.1f} {result['allocated_blocks']:>8} {result['queries']:>8} "
+                f"{result['inserts']:>8}"
+            )
+
+        baseline_path = str(options['baseline'])
+        if options['save']:
+            os.makedirs(os.path.dirname(baseline_path) or '.', exist_ok=True)
+            save_baseline(baseline_path, results)
+            self.stdout.write(self.style.SUCCESS(f"Saved baseline to {baseline_path}"))
+            return
+
+        if not os.path.exists(baseline_path):
+            self.stdout.write(f"No baseline at {baseline_path}; run with --save to create one")
+            return
+
+        baseline, machine = load_baseline(baseline_path)
+        if machine and machine != machine_info():
+            self.stdout.write(self.style.WARNING(
+                f"Baseline was recorded on a different setup ({machine}); timings may not compare"
+            ))
+        regressions = compare(results, baseline, options['threshold'])
+        if regressions:
+            raise CommandError("Benchmark regressions:\n  " + "\n  ".join(regressions))
+        self.stdout.write(self.style.SUCCESS(f"No regressions against {baseline_path}"))
@@ -0,0 +1,36 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from eld_api.hos import HOSSimulator, daily_logs
+
+
+class Command(BaseCommand):
+    help = 'Measure how many multi-day trips per second the HOS simulator plans'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--trips', type=int, default=5000)
+        parser.add_argument('--min-miles', type=int, default=100)
+        parser.add_argument('--max-miles', type=int, default=3000)
+
+    def handle(self, *args, **options):
+        simulator = HOSSimulator()
+        trips = options['trips']
+        span = options['max_miles'] - options['min_miles'] + 1
+        start_date = date(2026, 1, 1)
+
+        segments = days = 0
+        start = time.perf_counter()
+        for i in range(trips):
+            # Deterministic spread of trip lengths and prior cycle hours
+            miles = options['min_miles'] + (i * 7919) % span
+            timeline = simulator.simulate(miles, prior_cycle_hours=(i * 13) % 70)
+            days += len(daily_logs(timeline, start_date))
+            segments += len(timeline)
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write(
+            f"{trips} trips ({segments} segments, {days} log days) in {elapsed:.2f}s: "
+            f"{trips / elapsed:,.0f} trips/s, {segments / elapsed:,.0f} segments/s"
+        )
@@ -0,0 +1,25 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from eld_api.geocoding import build_gazetteer_index
+
+
+class Command(BaseCommand):
+    help = 'Build the memory-mapped gazetteer index from a city/state/zip CSV file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help='CSV with city, state, zip, latitude and longitude columns')
+        parser.add_argument('--output', default=settings.GAZETTEER_INDEX_PATH,
+                            help='Index file to write (default: settings.GAZETTEER_INDEX_PATH)')
+
+    def handle(self, *args, **options):
+        source = options['source']
+        output = str(options['output'])
+        if not os.path.exists(source):
+            raise CommandError(f"Gazetteer source {source} does not exist")
+
+        os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+        count = build_gazetteer_index(source, output)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {count} gazetteer keys to {output}"))
@@ -0,0 +1,25 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from eld_api.pois import build_poi_index
+
+
+class Command(BaseCommand):
+    help = 'Build the truck stop index used to snap rest and fuel stops from a facilities CSV file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help='CSV with name, latitude and longitude columns, optionally kind, city and state')
+        parser.add_argument('--output', default=settings.POI_INDEX_PATH,
+                            help='Index file to write (default: settings.POI_INDEX_PATH)')
+
+    def handle(self, *args, **options):
+        source = options['source']
+        output = str(options['output'])
+        if not os.path.exists(source):
+            raise CommandError(f"POI source {source} does not exist")
+
+        os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+        count = build_poi_index(source, output)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {count} POIs to {output}"))
@@ -0,0 +1,35 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from eld_api.routing import build_road_graph
+
+
+class Command(BaseCommand):
+    help = 'Build the memory-mapped road graph used for offline routing from a nodes/edges extract'
+
+    def add_arguments(self, parser):
+        parser.add_argument('nodes', help='CSV with id, lat and lon columns')
+        parser.add_argument('edges', help='CSV with u, v and length (meters) columns, optionally speed_mph and oneway')
+        parser.add_argument('--output', default=settings.ROAD_GRAPH_PATH,
+                            help='Directory to write the graph arrays to (default: settings.ROAD_GRAPH_PATH)')
+        parser.add_argument('--landmarks', type=int, default=16,
+                            help='Number of landmarks for the A* lower bound (default: 16)')
+        parser.add_argument('--default-speed', type=float, default=55,
+                            help='Speed in mph for edges without speed_mph (default: 55)')
+
+    def handle(self, *args, **options):
+        for path in (options['nodes'], options['edges']):
+            if not os.path.exists(path):
+                raise CommandError(f"Road extract {path} does not exist")
+
+        output = str(options['output'])
+        nodes, edges = build_road_graph(
+            options['nodes'],
+            options['edges'],
+            output,
+            landmarks=options['landmarks'],
+            default_speed_mph=options['default_speed'],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Wrote road graph with {nodes} nodes and {edges} edges to {output}"))
@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from eld_api.exports import export_job_log_sheets, export_workers, write_log_sheets_zip
+from eld_api.models import ExportJob
+
+
+class Command(BaseCommand):
+    help = 'Render log sheets in parallel into a ZIP of PDFs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='ZIP file to write')
+        parser.add_argument('--trip', type=int, help='Trip id')
+        parser.add_argument('--driver', help='Driver name')
+        parser.add_argument('--start-date', help='First date (YYYY-MM-DD)')
+        parser.add_argument('--end-date', help='Last date (YYYY-MM-DD)')
+        parser.add_argument('--workers', type=int, help='Worker processes (default: CPU count)')
+
+    def handle(self, *args, **options):
+        if not options['trip'] and not options['driver']:
+            raise CommandError('Either --trip or --driver is required')
+
+        # An unsaved job just carries the filters
+        job = ExportJob(
+            trip_id=options['trip'],
+            driver_name=options['driver'] or '',
+            start_date=parse_date(options['start_date'] or ''),
+            end_date=parse_date(options['end_date'] or ''),
+        )
+        log_sheets = export_job_log_sheets(job)
+        total = log_sheets.count()
+        workers = options['workers'] or export_workers()
+        start = time.perf_counter()
+
+        def progress(written):
+            self.stdout.write(f"\r{written}/{total} sheets", ending='')
+            self.stdout.flush()
+
+        written = write_log_sheets_zip(log_sheets.iterator(chunk_size=100), options['output'],
+                                       workers=workers, progress=progress)
+        elapsed = time.perf_counter() - start
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {written} sheets to {options['output']} with {workers} workers "
+            f"in {elapsed:.1f}s ({written / elapsed if elapsed else 0:.1f} sheets/s)"
+        ))
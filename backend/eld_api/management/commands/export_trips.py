@@ -0,0 +1,82 @@
+import json
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from eld_api.bulk_export import export_trips_queryset, iter_export_records, iter_ndjson
+
+
+def last_checkpoint(path):
+    """(cursor, byte offset just past it) of the last checkpoint line in an export file"""
+    cursor, offset = None, 0
+    with open(path, 'rb') as f:
+        position = 0
+        for line in f:
+            position += len(line)
+            if line.startswith(b'{"type":"checkpoint"') and line.endswith(b'\n'):
+                cursor, offset = json.loads(line)['cursor'], position
+    return cursor, offset
+
+
+class Command(BaseCommand):
+    help = 'Stream trips with their routes, log sheets and entries to an NDJSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help="NDJSON file to write, or - for stdout")
+        parser.add_argument('--driver', help='Driver name')
+        parser.add_argument('--start-date', help='First day trips were created (YYYY-MM-DD)')
+        parser.add_argument('--end-date', help='Last day trips were created (YYYY-MM-DD)')
+        parser.add_argument('--cursor', help='Start after this checkpoint cursor')
+        parser.add_argument('--resume', action='store_true',
+                            help='Continue an interrupted export after the last checkpoint in the output file')
+        parser.add_argument('--chunk-size', type=int, help='Trips per chunk (default: TRIP_EXPORT_CHUNK_SIZE)')
+
+    def handle(self, *args, **options):
+        output = options['output']
+        filters = {}
+        for name in ('start_date', 'end_date'):
+            if options[name]:
+                filters[name] = parse_date(options[name])
+                if filters[name] is None:
+                    raise CommandError(f"--{name.replace('_', '-')} must be a date (YYYY-MM-DD)")
+
+        cursor, offset = options['cursor'], 0
+        if options['resume']:
+            if output == '-':
+                raise CommandError('--resume needs an output file')
+            if cursor:
+                raise CommandError('Use either --cursor or --resume')
+            try:
+                cursor, offset = last_checkpoint(output)
+            except FileNotFoundError:
+                pass
+
+        try:
+            trips = export_trips_queryset(driver_name=options['driver'], cursor=cursor, **filters)
+        except ValueError as e:
+            raise CommandError(str(e))
+        chunk_size = options['chunk_size'] or getattr(settings, 'TRIP_EXPORT_CHUNK_SIZE', 100)
+
+        if output == '-':
+            stream = sys.stdout.buffer
+        else:
+            # Drop a partly written trip after the last checkpoint, then append
+            stream = open(output, 'r+b' if offset else 'wb')
+            stream.truncate(offset)
+            stream.seek(offset)
+
+        trips_written = 0
+        try:
+            for line in iter_ndjson(iter_export_records(trips, chunk_size)):
+                stream.write(line)
+                if line.startswith(b'{"type":"end"'):
+                    trips_written = json.loads(line)['trips']
+        finally:
+            if stream is not sys.stdout.buffer:
+                stream.close()
+
+        if output != '-':
+            resumed = ' (resumed)' if offset else ''
+            self.stdout.write(self.style.SUCCESS(f"Wrote {trips_written} trips to {output}{resumed}"))
@@ -0,0 +1,105 @@
+"""Prometheus metrics for the API.
+
+Collectors are plain prometheus_client objects updated in-process. Under
+gunicorn, set PROMETHEUS_MULTIPROC_DIR: each worker then writes its values
+to memory-mapped files there and `/metrics` merges every worker's files, so
+a scrape sees the whole server rather than whichever worker answered
+(see gunicorn.conf.py for the startup/exit hooks).
+"""
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, REGISTRY, generate_latest, multiprocess,
+)
+
+# Request latencies, in seconds; the buckets bracket the create_trip and
+# PDF export SLOs
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+
+http_requests = Counter(
+    'eld_http_requests_total', 'HTTP requests by endpoint and status',
+    ['method', 'endpoint', 'status'],
+)
+http_request_duration = Histogram(
+    'eld_http_request_duration_seconds', 'HTTP request latency by endpoint',
+    ['method', 'endpoint'], buckets=LATENCY_BUCKETS,
+)
+request_phase_duration = Histogram(
+    'eld_request_phase_duration_seconds', 'Time spent in each request phase (geocode, route_plan, ...)',
+    ['phase'], buckets=LATENCY_BUCKETS,
+)
+db_queries_per_request = Histogram(
+    'eld_db_queries_per_request', 'SQL queries issued per request',
+    ['endpoint'], buckets=QUERY_BUCKETS,
+)
+geocoder_requests = Counter(
+    'eld_geocoder_requests_total', 'Geocoder lookups by outcome (found, not_found, error, timeout)',
+    ['outcome'],
+)
+geocoder_duration = Histogram(
+    'eld_geocoder_request_duration_seconds', 'Geocoder lookup latency',
+    buckets=LATENCY_BUCKETS,
+)
+pdf_render_duration = Histogram(
+    'eld_pdf_render_duration_seconds', 'PDF render time by document kind (log_sheet, log_sheets)',
+    ['kind'], buckets=LATENCY_BUCKETS,
+)
+cache_lookups = Counter(
+    'eld_cache_lookups_total', 'Cache lookups by cache and result (hit, miss)',
+    ['cache', 'result'],
+)
+
+
+def observe_request(method, endpoint, status, seconds, queries, phases):
+    """Record one finished request"""
+    http_requests.labels(method, endpoint, str(status)).inc()
+    http_request_duration.labels(method, endpoint).observe(seconds)
+    db_queries_per_request.labels(endpoint).observe(queries)
+    for phase, phase_seconds in phases.items():
+        request_phase_duration.labels(phase).observe(phase_seconds)
+
+
+def observe_cache(cache, hit):
+    cache_lookups.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+def observe_geocode(outcome, seconds=None):
+    geocoder_requests.labels(outcome).inc()
+    if seconds is not None:
+        geocoder_duration.observe(seconds)
+
+
+def timed_geocode(geocode, location):
+    """Call a blocking geocoder, recording its outcome and latency; errors are re-raised"""
+    start = time.perf_counter()
+    try:
+        result = geocode(location)
+    except Exception:
+        observe_geocode('error', time.perf_counter() - start)
+        raise
+    observe_geocode('found' if result else 'not_found', time.perf_counter() - start)
+    return result
+
+
+async def atimed_geocode(geocode, location):
+    """Async timed_geocode for awaitable geocoders"""
+    start = time.perf_counter()
+    try:
+        result = await geocode(location)
+    except Exception:
+        observe_geocode('error', time.perf_counter() - start)
+        raise
+    observe_geocode('found' if result else 'not_found', time.perf_counter() - start)
+    return result
+
+
+def render_metrics():
+    """Return (body, content type) of the Prometheus text exposition"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
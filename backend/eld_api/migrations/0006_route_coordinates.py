@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eld_api', '0005_exportjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='route',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='route',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
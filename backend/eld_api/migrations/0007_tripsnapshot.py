@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eld_api', '0006_route_coordinates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TripSnapshot',
+            fields=[
+                ('trip', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='snapshot', serialize=False, to='eld_api.trip')),
+                ('document', models.BinaryField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eld_api', '0007_tripsnapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tripsnapshot',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AlterField(
+            model_name='tripsnapshot',
+            name='document',
+            field=models.BinaryField(null=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eld_api', '0008_tripsnapshot_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='logsheet',
+            index=models.Index(fields=['driver_name', 'date', 'id'], name='logsheet_driver_date_idx'),
+        ),
+    ]
@@ -17,6 +17,12 @@ class Trip(models.Model):
     total_distance = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True)
     estimated_duration = models.DecimalField(max_digits=6, decimal_places=2, null=True, blank=True)
     
+    class Meta:
+        indexes = [
+            # Keyset pagination order for trip_list
+            models.Index(fields=['-created_at', '-id'], name='trip_created_id_idx'),
+        ]
+    
     def __str__(self):
         return f"Trip from {self.pickup_location} to {self.dropoff_location}"
 
@@ -34,6 +40,8 @@ class Route(models.Model):
         ('waypoint', 'Waypoint'),
     ])
     distance_from_previous = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
     estimated_arrival = models.DateTimeField(null=True, blank=True)
     duration_hours = models.DecimalField(max_digits=4, decimal_places=2, default=Decimal('0.00'))
     
@@ -66,6 +74,12 @@ class LogSheet(models.Model):
     fuel_stops = models.IntegerField(default=0)
     rest_stops = models.IntegerField(default=0)
     
+    class Meta:
+        indexes = [
+            # A driver's sheets over a date range, in (date, id) keyset order
+            models.Index(fields=['driver_name', 'date', 'id'], name='logsheet_driver_date_idx'),
+        ]
+    
     def __str__(self):
         return f"Log Sheet - {self.date} - {self.driver_name}"
 
@@ -88,3 +102,60 @@ class LogEntry(models.Model):
     
     def __str__(self):
         return f"{self.time} - {self.get_status_display()} - {self.location}"
+
+
+class TripSnapshot(models.Model):
+    """Model for storing the rendered JSON document and the version of a trip"""
+    trip = models.OneToOneField(Trip, on_delete=models.CASCADE, primary_key=True, related_name='snapshot')
+    # Bumped on every change to the trip or its rows; null document = being rebuilt
+    version = models.PositiveIntegerField(default=1)
+    document = models.BinaryField(null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Snapshot of trip {self.trip_id}"
+
+
+class GeocodeCacheEntry(models.Model):
+    """Model for caching geocoder results by normalized location string"""
+    query = models.CharField(max_length=255, unique=True)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    expires_at = models.DateTimeField(db_index=True)
+    
+    @property
+    def coordinates(self):
+        """(lat, lon) tuple, or None for a cached failed lookup"""
+        if self.latitude is None or self.longitude is None:
+            return None
+        return (self.latitude, self.longitude)
+    
+    def __str__(self):
+        return f"{self.query} -> {self.coordinates}"
+
+
+class ExportJob(models.Model):
+    """Model for tracking background log sheet ZIP exports"""
+    status = models.CharField(max_length=20, default='pending', choices=[
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ])
+    trip = models.ForeignKey(Trip, on_delete=models.CASCADE, null=True, blank=True, related_name='export_jobs')
+    driver_name = models.CharField(max_length=255, blank=True)
+    start_date = models.DateField(null=True, blank=True)
+    end_date = models.DateField(null=True, blank=True)
+    
+    # Progress
+    total = models.IntegerField(default=0)
+    completed = models.IntegerField(default=0)
+    file_path = models.CharField(max_length=500, blank=True)
+    error = models.TextField(blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)  # last progress write while running
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return f"Export {self.id} - {self.get_status_display()} ({self.completed}/{self.total})"
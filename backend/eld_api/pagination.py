@@ -0,0 +1,77 @@
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class TripCursorPagination(BasePagination):
+    """Keyset pagination over trips ordered by (-created_at, -id).
+
+    The cursor encodes the (created_at, id) of the last trip on a page, so
+    each page is one indexed range scan no matter how deep the client goes.
+    Pages hold Trip instances, or `(created_at, id, ...)` rows when given a
+    values_list() queryset.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'limit'
+    page_size = 20
+    max_page_size = 100
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            created_at, trip_id = self.decode_cursor(cursor)
+            queryset = queryset.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=trip_id)
+            )
+
+        # Fetch one extra row to know whether there is a next page
+        page = list(queryset.order_by('-created_at', '-id')[:self.page_size + 1])
+        self.has_next = len(page) > self.page_size
+        self.page = page[:self.page_size]
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        created_at, trip_id = self.get_position(self.page[-1])
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(created_at, trip_id))
+
+    def get_position(self, item):
+        if isinstance(item, tuple):
+            return item[0], item[1]
+        return item.created_at, item.id
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def encode_cursor(self, created_at, trip_id):
+        token = f"{created_at.isoformat()}|{trip_id}"
+        return base64.urlsafe_b64encode(token.encode('ascii')).decode('ascii')
+
+    def decode_cursor(self, cursor):
+        try:
+            token = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('ascii')
+            created_at, trip_id = token.split('|')
+            return datetime.fromisoformat(created_at), int(trip_id)
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
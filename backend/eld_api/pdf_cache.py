@@ -0,0 +1,133 @@
+import glob
+import hashlib
+import json
+import logging
+import os
+import threading
+
+from django.conf import settings
+
+from .metrics import observe_cache
+
+logger = logging.getLogger(__name__)
+
+# Bump when the PDF layout changes so previously rendered files are not served
+RENDER_VERSION = 1
+
+
+class PDFCache:
+    """Content-addressed on-disk cache of rendered log sheet PDFs.
+
+    Files are named after the sheet id and a hash of everything the PDF shows
+    (sheet fields, entries and trip endpoints), so a changed sheet can never
+    be served from a stale file. The directory is kept under a size limit by
+    evicting the least recently served files.
+
+    Each process keeps a running estimate of the directory size, so a write
+    only scans the directory when the estimate goes over the limit, or every
+    `rescan_interval` writes to pick up files written by other processes.
+    Eviction goes down to `low_water` of the limit, leaving room for a run
+    of writes before the next scan.
+    """
+    low_water = 0.9
+    rescan_interval = 100
+
+    def __init__(self, directory=None, max_bytes=None):
+        self.directory = str(directory or settings.PDF_CACHE_DIR)
+        self.max_bytes = max_bytes or getattr(settings, 'PDF_CACHE_MAX_BYTES', 256 * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._size = None  # bytes in the directory as of the last scan, plus writes since
+        self._puts_since_scan = 0
+
+    def content_hash(self, log_sheet, trip):
+        """Hash of the rendered content of a log sheet"""
+        sheet_fields = [(f.attname, getattr(log_sheet, f.attname)) for f in log_sheet._meta.concrete_fields]
+        entries = [
+            (entry.time, entry.status, entry.location, entry.remarks)
+            for entry in log_sheet.entries.all()
+        ]
+        content = [RENDER_VERSION, sheet_fields, entries, trip.id, trip.pickup_location, trip.dropoff_location]
+        payload = json.dumps(content, separators=(',', ':'), default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def path_for(self, log_sheet_id, digest):
+        return os.path.join(self.directory, f"sheet-{log_sheet_id}-{digest}.pdf")
+
+    def open(self, log_sheet_id, digest):
+        """Open a cached PDF for reading, or return None on a miss"""
+        path = self.path_for(log_sheet_id, digest)
+        try:
+            pdf_file = open(path, 'rb')
+        except FileNotFoundError:
+            observe_cache('pdf', False)
+            return None
+        observe_cache('pdf', True)
+        # The mtime doubles as the last-served time for LRU eviction
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return pdf_file
+
+    def put(self, log_sheet_id, digest, data):
+        """Store a rendered PDF, then evict old files if over the size limit"""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path_for(log_sheet_id, digest)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not cache PDF for log sheet {log_sheet_id}: {e}")
+            return
+        with self._lock:
+            self._puts_since_scan += 1
+            if self._size is not None:
+                self._size += len(data)
+            scan = (self._size is None or self._size > self.max_bytes
+                    or self._puts_since_scan >= self.rescan_interval)
+        if scan:
+            self.evict()
+
+    def invalidate(self, log_sheet_id):
+        """Remove every cached rendering of a log sheet"""
+        for path in glob.glob(os.path.join(self.directory, f"sheet-{log_sheet_id}-*.pdf")):
+            try:
+                size = os.stat(path).st_size
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            with self._lock:
+                if self._size is not None:
+                    self._size -= size
+
+    def evict(self):
+        """Delete least recently served files if the cache is over max_bytes, down to its low-water mark"""
+        files = []
+        total = 0
+        for path in glob.glob(os.path.join(self.directory, 'sheet-*.pdf')):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        files.sort()
+        target = self.max_bytes * self.low_water if total > self.max_bytes else total
+        for _, size, path in files:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+        with self._lock:
+            self._size = total
+            self._puts_since_scan = 0
+
+
+pdf_cache = PDFCache()
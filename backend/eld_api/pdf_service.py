@@ -1,11 +1,85 @@
 from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.lib import colors
 from io import BytesIO
 from datetime import datetime
 
+from .instrumentation import timed
+from .metrics import pdf_render_duration
+
+
+# Table templates shared by every page rendered in the process
+TRIP_INFO_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (0, -1), colors.grey),
+    ('TEXTCOLOR', (0, 0), (0, -1), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
+    ('BACKGROUND', (1, 0), (1, -1), colors.beige),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black)
+])
+
+HOURS_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black)
+])
+
+CYCLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black)
+])
+
+ENTRIES_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 8),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+])
+
+
+class StreamingDocTemplate(SimpleDocTemplate):
+    """SimpleDocTemplate that pulls flowables from an iterator of chunks.
+    
+    Only the chunk being laid out (and the next one) is held in the story,
+    so the flowables for a long run of sheets are never built all at once.
+    The output is still written as a whole when the build finishes.
+    """
+    
+    def build_chunks(self, chunks):
+        self._chunks = iter(chunks)
+        self._story = []
+        self.filterFlowables(self._story)
+        self.build(self._story)
+    
+    def filterFlowables(self, flowables):
+        # Called before each flowable is consumed (also for internal lists,
+        # which are left alone); keep at least two queued so the build loop
+        # never sees an empty story before the iterator ends
+        if flowables is not self._story:
+            return
+        while len(flowables) <= 1:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            flowables.extend(chunk)
+
 
 class ELDPDFService:
     """Service for generating PDF ELD log sheets"""
@@ -20,10 +94,42 @@ class ELDPDFService:
             alignment=1  # Center alignment
         )
     
+    @timed('pdf_render')
+    @pdf_render_duration.labels('log_sheet').time()
     def generate_log_sheet_pdf(self, log_sheet, trip):
         """Generate a PDF for a single log sheet"""
         buffer = BytesIO()
         doc = SimpleDocTemplate(buffer, pagesize=letter)
+        doc.build(self.build_log_sheet_story(log_sheet, trip, datetime.now()))
+        buffer.seek(0)
+        return buffer
+    
+    @timed('pdf_render')
+    @pdf_render_duration.labels('log_sheets').time()
+    def generate_log_sheets_pdf(self, log_sheets, output):
+        """Render several log sheets, one per page, into a single PDF.
+        
+        `log_sheets` may be any iterable (e.g. a chunked queryset iterator)
+        of sheets with their trip and entries preloaded. Sheets are laid out
+        as they are pulled from the iterable and the PDF is written to the
+        `output` file object.
+        """
+        doc = StreamingDocTemplate(output, pagesize=letter)
+        doc.build_chunks(self._iter_log_sheet_stories(log_sheets, datetime.now()))
+        return output
+    
+    def _iter_log_sheet_stories(self, log_sheets, generated_at):
+        empty = True
+        for log_sheet in log_sheets:
+            if not empty:
+                yield [PageBreak()]
+            empty = False
+            yield self.build_log_sheet_story(log_sheet, log_sheet.trip, generated_at)
+        if empty:
+            yield [Paragraph("No log sheets", self.title_style)]
+    
+    def build_log_sheet_story(self, log_sheet, trip, generated_at):
+        """Build the platypus flowables for one log sheet"""
         story = []
         
         # Title
@@ -41,16 +147,7 @@ class ELDPDFService:
         ]
         
         trip_table = Table(trip_info, colWidths=[2*inch, 4*inch])
-        trip_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (0, -1), colors.grey),
-            ('TEXTCOLOR', (0, 0), (0, -1), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-            ('BACKGROUND', (1, 0), (1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
+        trip_table.setStyle(TRIP_INFO_STYLE)
         story.append(trip_table)
         story.append(Spacer(1, 20))
         
@@ -65,15 +162,7 @@ class ELDPDFService:
         ]
         
         hours_table = Table(hours_data, colWidths=[3*inch, 1*inch])
-        hours_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
+        hours_table.setStyle(HOURS_STYLE)
         story.append(hours_table)
         story.append(Spacer(1, 20))
         
@@ -89,24 +178,17 @@ class ELDPDFService:
         ]
         
         cycle_table = Table(cycle_data, colWidths=[3*inch, 2*inch])
-        cycle_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
+        cycle_table.setStyle(CYCLE_STYLE)
         story.append(cycle_table)
         story.append(Spacer(1, 20))
         
         # Daily Log Entries
-        if log_sheet.entries.all():
+        entries = log_sheet.entries.all()
+        if entries:
             story.append(Paragraph("Daily Log Entries", self.styles['Heading2']))
             
             entries_data = [['Time', 'Status', 'Location', 'Remarks']]
-            for entry in log_sheet.entries.all():
+            for entry in entries:
                 entries_data.append([
                     str(entry.time),
                     entry.status.replace('_', ' ').title(),
@@ -115,23 +197,12 @@ class ELDPDFService:
                 ])
             
             entries_table = Table(entries_data, colWidths=[1*inch, 1.5*inch, 2*inch, 2.5*inch])
-            entries_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, -1), 8),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-            ]))
+            entries_table.setStyle(ENTRIES_STYLE)
             story.append(entries_table)
         
         # Footer
         story.append(Spacer(1, 30))
-        footer_text = f"Generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} by Trucking ELD System"
+        footer_text = f"Generated on {generated_at.strftime('%Y-%m-%d %H:%M:%S')} by Trucking ELD System"
         story.append(Paragraph(footer_text, self.styles['Normal']))
         
-        doc.build(story)
-        buffer.seek(0)
-        return buffer 
\ No newline at end of file
+        return story
@@ -0,0 +1,26 @@
+"""Process pool entry points for PDF rendering.
+
+Spawned workers import this module before Django is set up, so it must not
+import models at module level.
+"""
+import django
+
+_pdf_service = None
+
+
+def init_pdf_worker():
+    """Process pool initializer: load Django in a freshly spawned worker"""
+    global _pdf_service
+    django.setup()
+    from .pdf_service import ELDPDFService
+    _pdf_service = ELDPDFService()
+
+
+def render_log_sheet_pdf(log_sheet):
+    """Render one sheet (trip and entries preloaded) to (archive name, PDF bytes)"""
+    buffer = _pdf_service.generate_log_sheet_pdf(log_sheet, log_sheet.trip)
+    return log_sheet_archive_name(log_sheet), buffer.getvalue()
+
+
+def log_sheet_archive_name(log_sheet):
+    return f"eld_log_sheet_{log_sheet.date}_trip{log_sheet.trip_id}_{log_sheet.id}.pdf"
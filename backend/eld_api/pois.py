@@ -0,0 +1,192 @@
+"""Truck stops and other driver facilities, indexed for nearest-stop queries.
+
+`build_poi_index` packs a CSV of facilities into one compressed .npz file
+(coordinates, kind codes and a UTF-8 name blob). `POIIndex` loads it into a
+uniform lat/lon grid: points are sorted by cell so each cell is a slice of
+the arrays, and a query only measures the points in the cells around it.
+"""
+import csv
+import logging
+import math
+import os
+from functools import lru_cache
+
+import numpy as np
+from django.conf import settings
+
+from .distance import EARTH_RADIUS_MILES
+
+logger = logging.getLogger(__name__)
+
+POI_KINDS = ('truck_stop', 'fuel', 'rest_area')
+
+# Facilities a stop can be snapped to, by route point type
+SNAP_KINDS = {
+    'fuel': ('truck_stop', 'fuel'),
+    'rest': ('truck_stop', 'rest_area'),
+}
+
+MILES_PER_DEGREE_LATITUDE = 69.05
+
+
+def build_poi_index(source_path, output_path):
+    """Build the POI index file from a facilities CSV.
+
+    The source needs `name`, `latitude` and `longitude` columns, and may have
+    `kind` (one of POI_KINDS, default truck_stop), `city` and `state`. City
+    and state are folded into the stored name. Returns the number of POIs
+    written.
+    """
+    coords, kinds, names = [], [], []
+    with open(source_path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            try:
+                latitude, longitude = float(row['latitude']), float(row['longitude'])
+            except (KeyError, TypeError, ValueError):
+                continue
+            kind = (row.get('kind') or 'truck_stop').strip().lower()
+            if kind not in POI_KINDS:
+                continue
+            place = ', '.join(part.strip() for part in (row.get('city'), row.get('state')) if part and part.strip())
+            name = (row.get('name') or '').strip() or kind.replace('_', ' ').title()
+            coords.append((latitude, longitude))
+            kinds.append(POI_KINDS.index(kind))
+            names.append(f"{name}, {place}" if place else name)
+
+    encoded = [name.encode('utf-8') for name in names]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(name) for name in encoded], out=offsets[1:])
+
+    tmp_path = f"{output_path}.tmp.npz"
+    np.savez_compressed(
+        tmp_path,
+        coords=np.asarray(coords, dtype=np.float64).reshape(-1, 2),
+        kinds=np.asarray(kinds, dtype=np.int8),
+        name_offsets=offsets,
+        names=np.frombuffer(b''.join(encoded), dtype=np.uint8),
+    )
+    os.replace(tmp_path, output_path)
+    return len(coords)
+
+
+class POIIndex:
+    """In-memory grid index answering k-nearest and radius queries"""
+
+    def __init__(self, coords, kinds, name_offsets, names, cell_degrees=0.25):
+        self.cell_degrees = cell_degrees
+        coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+        cells = self._cell(coords[:, 0], coords[:, 1])
+        order = np.lexsort((cells[1], cells[0]))
+        self.coords = coords[order]
+        self.kinds = np.asarray(kinds, dtype=np.int8)[order]
+        self._order = order
+        self._name_offsets = np.asarray(name_offsets, dtype=np.int64)
+        self._names = np.asarray(names, dtype=np.uint8).tobytes()
+        self._radians = np.radians(self.coords)
+
+        # Each occupied cell maps to its slice of the sorted arrays
+        rows, cols = cells[0][order], cells[1][order]
+        self._cells = {}
+        if len(order):
+            boundaries = np.flatnonzero((np.diff(rows) != 0) | (np.diff(cols) != 0)) + 1
+            starts = np.concatenate(([0], boundaries))
+            ends = np.concatenate((boundaries, [len(order)]))
+            for start, end in zip(starts.tolist(), ends.tolist()):
+                self._cells[(int(rows[start]), int(cols[start]))] = (start, end)
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        with np.load(path) as data:
+            return cls(data['coords'], data['kinds'], data['name_offsets'], data['names'], **kwargs)
+
+    def __len__(self):
+        return len(self.coords)
+
+    def _cell(self, latitude, longitude):
+        return (np.floor(np.asarray(latitude) / self.cell_degrees).astype(np.int64),
+                np.floor(np.asarray(longitude) / self.cell_degrees).astype(np.int64))
+
+    def name(self, i):
+        """Name of the POI at a position in the sorted arrays"""
+        source = self._order[i]
+        start, end = self._name_offsets[source], self._name_offsets[source + 1]
+        return self._names[start:end].decode('utf-8')
+
+    def _candidates(self, latitude, longitude, radius_miles):
+        """Positions of the points in every cell overlapping the radius"""
+        lat_span = radius_miles / MILES_PER_DEGREE_LATITUDE
+        lon_span = lat_span / max(math.cos(math.radians(min(abs(latitude) + lat_span, 89.9))), 1e-6)
+        row_min, col_min = (int(v) for v in self._cell(latitude - lat_span, longitude - lon_span))
+        row_max, col_max = (int(v) for v in self._cell(latitude + lat_span, longitude + lon_span))
+        ranges = []
+        for row in range(row_min, row_max + 1):
+            for col in range(col_min, col_max + 1):
+                span = self._cells.get((row, col))
+                if span:
+                    ranges.append(np.arange(*span))
+        return np.concatenate(ranges) if ranges else np.empty(0, dtype=np.int64)
+
+    def _distances(self, latitude, longitude, positions):
+        lat1, lon1 = math.radians(latitude), math.radians(longitude)
+        lat2, lon2 = self._radians[positions, 0], self._radians[positions, 1]
+        h = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+        return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.clip(h, 0.0, 1.0)))
+
+    def _query(self, latitude, longitude, radius_miles, kinds=None):
+        """Positions and distances of the POIs within a radius, nearest first"""
+        positions = self._candidates(latitude, longitude, radius_miles)
+        if kinds is not None and len(positions):
+            codes = [POI_KINDS.index(kind) for kind in kinds]
+            positions = positions[np.isin(self.kinds[positions], codes)]
+        distances = self._distances(latitude, longitude, positions)
+        inside = distances <= radius_miles
+        positions, distances = positions[inside], distances[inside]
+        order = np.argsort(distances, kind='stable')
+        return positions[order], distances[order]
+
+    def within(self, latitude, longitude, radius_miles, kinds=None):
+        """POIs within a radius, nearest first, as dicts with a `distance_miles` key"""
+        positions, distances = self._query(latitude, longitude, radius_miles, kinds)
+        return [self._result(int(p), float(d)) for p, d in zip(positions, distances)]
+
+    def nearest(self, latitude, longitude, k=1, kinds=None, max_radius_miles=250):
+        """Up to k nearest POIs within `max_radius_miles`, nearest first.
+
+        The search radius starts at one grid cell and doubles until k points
+        fall inside it, so sparse areas cost a few more cells, not a scan.
+        """
+        radius = self.cell_degrees * MILES_PER_DEGREE_LATITUDE
+        while True:
+            radius = min(radius, max_radius_miles)
+            positions, distances = self._query(latitude, longitude, radius, kinds)
+            if len(positions) >= k or radius >= max_radius_miles:
+                return [self._result(int(p), float(d)) for p, d in zip(positions[:k], distances[:k])]
+            radius *= 2
+
+    def _result(self, position, distance):
+        latitude, longitude = self.coords[position]
+        return {
+            'name': self.name(position),
+            'kind': POI_KINDS[self.kinds[position]],
+            'latitude': float(latitude),
+            'longitude': float(longitude),
+            'distance_miles': distance,
+        }
+
+
+@lru_cache(maxsize=None)
+def load_poi_index(path):
+    """Load a POI index once per process"""
+    return POIIndex.load(path)
+
+
+def get_poi_index():
+    """The POI index at settings.POI_INDEX_PATH, or None when not built"""
+    path = getattr(settings, 'POI_INDEX_PATH', None)
+    if not path or not os.path.exists(str(path)):
+        return None
+    try:
+        return load_poi_index(str(path))
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"POI index at {path} could not be loaded: {e}")
+        return None
@@ -0,0 +1,464 @@
+"""Offline road-network routing.
+
+`build_road_graph` turns an OSM-derived extract into a directory of NumPy
+arrays: node coordinates, the edges in compressed sparse row (CSR) form with
+their length and travel time, and travel times to and from a set of
+landmarks. `RoadGraph` memory-maps those arrays and answers shortest-path
+queries with A* guided by the landmark (ALT) lower bound, which prunes the
+search to a narrow corridor around the route.
+
+Extract format (as written by common OSM tools, e.g. osmnx):
+
+    nodes CSV: id, lat, lon
+    edges CSV: u, v, length (meters), optional speed_mph and oneway
+
+Trip endpoints are snapped to the nearest node through a grid of square
+cells over the nodes (stored with the graph), so a snap only looks at the
+nodes in a few cells around the point. An endpoint more than
+ROAD_SNAP_MAX_MILES from the graph is outside the area it covers, and
+`route` returns None so that planning falls back to straight-line miles.
+
+Landmark preprocessing runs SciPy's compiled Dijkstra when SciPy is
+installed, and a pure-Python one otherwise. The A* search loop is plain
+Python, so query time grows with the number of nodes A* settles; the
+`road_route` benchmark case measures it on a synthetic grid, not on a full
+OSM extract.
+"""
+import csv
+import heapq
+import logging
+import math
+import os
+from functools import lru_cache
+
+import numpy as np
+from django.conf import settings
+
+from .distance import EARTH_RADIUS_MILES, distance_miles
+
+try:
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import dijkstra as csgraph_dijkstra
+except ImportError:  # pragma: no cover - optional speedup
+    csr_matrix = csgraph_dijkstra = None
+
+logger = logging.getLogger(__name__)
+
+METERS_PER_MILE = 1609.344
+MILES_PER_DEGREE_LATITUDE = 69.05
+TRUE_VALUES = ('1', 'true', 'yes', 't', 'y')
+GRAPH_ARRAYS = ('lat', 'lon', 'indptr', 'indices', 'length', 'minutes', 'landmark_from', 'landmark_to')
+GRID_ARRAYS = ('grid_keys', 'grid_nodes')
+
+# Snapping grid: nodes are bucketed into square cells of GRID_CELL_DEGREES,
+# keyed row * GRID_COLUMNS + column. A snap that finds nothing within
+# GRID_MAX_RINGS rings of cells falls back to scanning every node.
+GRID_CELL_DEGREES = 0.1
+GRID_COLUMNS = 1 << 20
+GRID_MAX_RINGS = 32
+
+
+class RoadRoute:
+    """Result of a road-network query"""
+
+    def __init__(self, distance_miles, duration_hours, coordinates, segment_miles=None):
+        self.distance_miles = distance_miles
+        self.duration_hours = duration_hours
+        self.coordinates = coordinates
+        self.segment_miles = segment_miles
+
+    @property
+    def polyline(self):
+        return RoutePolyline(self.coordinates, self.segment_miles)
+
+    def __repr__(self):
+        return f"RoadRoute({self.distance_miles:.1f} mi, {self.duration_hours:.2f} h, {len(self.coordinates)} points)"
+
+
+def _to_csr(count, sources, targets, *values):
+    """Sort edges by source into CSR arrays (indptr, indices, *values)"""
+    order = np.argsort(sources, kind='stable')
+    indptr = np.zeros(count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=count), out=indptr[1:])
+    return (indptr, targets[order]) + tuple(v[order] for v in values)
+
+
+def _dijkstra(indptr, indices, weights, source):
+    """Travel times from one node to every node over CSR lists"""
+    dist = [math.inf] * (len(indptr) - 1)
+    dist[source] = 0.0
+    heap = [(0.0, source)]
+    while heap:
+        d, u = heapq.heappop(heap)
+        if d > dist[u]:
+            continue
+        for i in range(indptr[u], indptr[u + 1]):
+            v = indices[i]
+            nd = d + weights[i]
+            if nd < dist[v]:
+                dist[v] = nd
+                heapq.heappush(heap, (nd, v))
+    return dist
+
+
+def _shortest_times(indptr, indices, weights):
+    """Function giving the travel times from one node to every node.
+
+    Uses SciPy's compiled Dijkstra when SciPy is installed, else the
+    pure-Python one over plain lists.
+    """
+    count = len(indptr) - 1
+    if csgraph_dijkstra is None:
+        # Plain lists are much faster than NumPy scalars in the Dijkstra loop
+        lists = (indptr.tolist(), indices.tolist(), weights.tolist())
+        return lambda source: np.asarray(_dijkstra(*lists, source))
+
+    sources = np.repeat(np.arange(count), np.diff(indptr))
+    # Keep only the fastest of parallel edges, rather than leave them to SciPy
+    order = np.lexsort((weights, indices, sources))
+    sources, targets, weights = sources[order], indices[order], weights[order].astype(np.float64)
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = (sources[1:] != sources[:-1]) | (targets[1:] != targets[:-1])
+    matrix = csr_matrix((weights[first], (sources[first], targets[first])), shape=(count, count))
+    return lambda source: csgraph_dijkstra(matrix, directed=True, indices=source)
+
+
+def _cell_keys(lat, lon):
+    rows = np.floor(np.asarray(lat, dtype=np.float64) / GRID_CELL_DEGREES).astype(np.int64)
+    cols = np.floor(np.asarray(lon, dtype=np.float64) / GRID_CELL_DEGREES).astype(np.int64)
+    return rows * GRID_COLUMNS + cols
+
+
+def _grid_index(lat, lon):
+    """Snapping grid arrays: cell keys in sorted order, and the node in each position"""
+    keys = _cell_keys(lat, lon)
+    order = np.argsort(keys, kind='stable')
+    return keys[order], order.astype(np.int32)
+
+
+def build_road_graph(nodes_path, edges_path, output_dir, landmarks=16, default_speed_mph=55):
+    """Build the memory-mappable graph arrays from a nodes/edges extract.
+
+    Landmarks are picked by farthest-point selection so they sit on the edge
+    of the network, where they give the tightest bounds. Returns
+    (node count, edge count).
+    """
+    node_index = {}
+    lats, lons = [], []
+    with open(nodes_path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            node_index[row['id']] = len(lats)
+            lats.append(float(row['lat']))
+            lons.append(float(row['lon']))
+
+    sources, targets, lengths, minutes = [], [], [], []
+    with open(edges_path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            u = node_index.get(row['u'])
+            v = node_index.get(row['v'])
+            if u is None or v is None or u == v:
+                continue
+            miles = float(row['length']) / METERS_PER_MILE
+            speed = float(row.get('speed_mph') or default_speed_mph)
+            travel = miles / speed * 60
+            pairs = [(u, v)]
+            if str(row.get('oneway', '')).strip().lower() not in TRUE_VALUES:
+                pairs.append((v, u))
+            for a, b in pairs:
+                sources.append(a)
+                targets.append(b)
+                lengths.append(miles)
+                minutes.append(travel)
+
+    count = len(lats)
+    sources = np.asarray(sources, dtype=np.int64)
+    targets = np.asarray(targets, dtype=np.int32)
+    lengths = np.asarray(lengths, dtype=np.float32)
+    minutes = np.asarray(minutes, dtype=np.float32)
+    indptr, indices, length, travel = _to_csr(count, sources, targets, lengths, minutes)
+    reverse = _to_csr(count, targets.astype(np.int64), sources.astype(np.int32), minutes)
+
+    times_from = _shortest_times(indptr, indices, travel)
+    times_to = _shortest_times(*reverse)
+    landmarks = min(landmarks, count)
+    landmark_from = np.empty((count, landmarks), dtype=np.float32)
+    landmark_to = np.empty((count, landmarks), dtype=np.float32)
+
+    def farthest(times):
+        # Unreachable nodes never become landmarks
+        return int(np.argmax(np.where(np.isinf(times), -1.0, times)))
+
+    # Start from the node farthest from an arbitrary one
+    candidate = farthest(times_from(0)) if count else 0
+    min_dist = np.full(count, math.inf)
+    for k in range(landmarks):
+        from_landmark = times_from(candidate)
+        landmark_from[:, k] = from_landmark
+        landmark_to[:, k] = times_to(candidate)
+        np.minimum(min_dist, from_landmark, out=min_dist)
+        candidate = farthest(min_dist)
+
+    grid_keys, grid_nodes = _grid_index(lats, lons)
+    os.makedirs(output_dir, exist_ok=True)
+    arrays = {
+        'lat': np.asarray(lats, dtype=np.float64),
+        'lon': np.asarray(lons, dtype=np.float64),
+        'indptr': indptr,
+        'indices': indices,
+        'length': length,
+        'minutes': travel,
+        'landmark_from': landmark_from,
+        'landmark_to': landmark_to,
+        'grid_keys': grid_keys,
+        'grid_nodes': grid_nodes,
+    }
+    for name, array in arrays.items():
+        np.save(os.path.join(output_dir, f"{name}.npy"), array)
+    return count, len(indices)
+
+
+class RoadGraph:
+    """Memory-mapped road graph answering ALT A* shortest-time queries"""
+
+    def __init__(self, path):
+        for name in GRAPH_ARRAYS:
+            setattr(self, name, np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r'))
+        self.node_count = len(self.lat)
+        if all(os.path.exists(os.path.join(path, f"{name}.npy")) for name in GRID_ARRAYS):
+            for name in GRID_ARRAYS:
+                setattr(self, name, np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r'))
+        else:
+            # Graphs built before the snapping grid was stored with them
+            self.grid_keys, self.grid_nodes = _grid_index(self.lat, self.lon)
+        if self.node_count:
+            # Grid cells spanned by the graph, bounding how far a snap searches
+            rows = np.floor(np.array([np.min(self.lat), np.max(self.lat)]) / GRID_CELL_DEGREES)
+            cols = np.floor(np.array([np.min(self.lon), np.max(self.lon)]) / GRID_CELL_DEGREES)
+            self._grid_rows = (int(rows[0]), int(rows[1]))
+            self._grid_cols = (int(cols[0]), int(cols[1]))
+
+    def _equirectangular(self, latitude, longitude, nodes):
+        # Equirectangular distance (in degrees) is plenty to rank nodes around one point
+        dlat = self.lat[nodes] - latitude
+        dlon = (self.lon[nodes] - longitude) * math.cos(math.radians(latitude))
+        return np.sqrt(dlat * dlat + dlon * dlon)
+
+    def _ring_nodes(self, row, col, ring):
+        """Nodes in the cells exactly `ring` cells away from (row, col)"""
+        if ring == 0:
+            rows, cols = np.array([row]), np.array([col])
+        else:
+            span = np.arange(-ring, ring + 1)
+            inner = span[1:-1]
+            rows = np.concatenate((np.full(len(span), row - ring), np.full(len(span), row + ring),
+                                   row + inner, row + inner))
+            cols = np.concatenate((col + span, col + span,
+                                   np.full(len(inner), col - ring), np.full(len(inner), col + ring)))
+        keys = rows * GRID_COLUMNS + cols
+        starts = np.searchsorted(self.grid_keys, keys, side='left')
+        ends = np.searchsorted(self.grid_keys, keys, side='right')
+        ranges = [self.grid_nodes[start:end] for start, end in zip(starts.tolist(), ends.tolist()) if end > start]
+        return np.concatenate(ranges) if ranges else None
+
+    def nearest_node(self, latitude, longitude, max_miles=None):
+        """Index of the graph node closest to a point.
+
+        Searches the snapping grid ring by ring outward from the point's cell
+        until no unsearched cell can hold a closer node. With `max_miles`,
+        cells beyond that radius are not searched and None is returned when
+        no node is inside it.
+        """
+        if not self.node_count:
+            return None
+        row = math.floor(latitude / GRID_CELL_DEGREES)
+        col = math.floor(longitude / GRID_CELL_DEGREES)
+        # Every node in ring r is at least (r - 1) cells away in latitude or longitude
+        cell = GRID_CELL_DEGREES * math.cos(math.radians(latitude))
+        reach = math.inf if max_miles is None else max_miles / MILES_PER_DEGREE_LATITUDE
+        last_ring = max(abs(row - self._grid_rows[0]), abs(row - self._grid_rows[1]),
+                        abs(col - self._grid_cols[0]), abs(col - self._grid_cols[1]))
+        best, best_distance = None, math.inf
+        for ring in range(last_ring + 1):
+            bound = max(ring - 1, 0) * cell
+            if bound > best_distance or bound > reach:
+                return best
+            if ring > GRID_MAX_RINGS and best is None:
+                break
+            nodes = self._ring_nodes(row, col, ring)
+            if nodes is None:
+                continue
+            distances = self._equirectangular(latitude, longitude, nodes)
+            i = int(np.argmin(distances))
+            if distances[i] < best_distance:
+                best, best_distance = int(nodes[i]), float(distances[i])
+        else:
+            return best
+
+        # Far outside the graph: scan every node
+        distances = self._equirectangular(latitude, longitude, slice(None))
+        node = int(np.argmin(distances))
+        return node if distances[node] <= reach else None
+
+    def snap(self, latitude, longitude, max_miles=None):
+        """Nearest node to a point, or None when it is farther than `max_miles`"""
+        node = self.nearest_node(latitude, longitude, max_miles)
+        if node is not None and max_miles is not None:
+            miles = distance_miles((latitude, longitude), (float(self.lat[node]), float(self.lon[node])), 'haversine')
+            if miles > max_miles:
+                return None
+        return node
+
+    def route(self, origin, destination, max_snap_miles=None):
+        """Fastest road route between two (lat, lon) points.
+
+        Returns None when the points cannot be connected, or when either one
+        is more than `max_snap_miles` (default ROAD_SNAP_MAX_MILES) from the
+        graph, i.e. outside the area it covers.
+        """
+        if max_snap_miles is None:
+            max_snap_miles = getattr(settings, 'ROAD_SNAP_MAX_MILES', 10)
+        source = self.snap(*origin, max_miles=max_snap_miles)
+        target = self.snap(*destination, max_miles=max_snap_miles)
+        if source is None or target is None:
+            return None
+        path = self.shortest_path(source, target)
+        if path is None:
+            return None
+
+        nodes, edges = path
+        segment_miles = [float(self.length[e]) for e in edges]
+        minutes = float(sum(self.minutes[e] for e in edges))
+        coordinates = [(float(self.lat[n]), float(self.lon[n])) for n in nodes]
+        return RoadRoute(sum(segment_miles), minutes / 60, coordinates, segment_miles)
+
+    def shortest_path(self, source, target):
+        """A* over travel time with the landmark lower bound.
+
+        Returns (nodes, edges) along the path, or None when the target
+        cannot be reached.
+        """
+        indptr, indices, minutes = self.indptr, self.indices, self.minutes
+        target_from = np.asarray(self.landmark_from[target])
+        target_to = np.asarray(self.landmark_to[target])
+
+        def heuristics(nodes):
+            # d(v, t) >= d(L, t) - d(L, v) and d(v, t) >= d(v, L) - d(t, L);
+            # one NumPy call per expanded node, for all of its neighbours
+            bounds = np.concatenate((target_from - self.landmark_from[nodes], self.landmark_to[nodes] - target_to), axis=1)
+            bounds = np.nan_to_num(bounds, nan=0.0, posinf=np.inf, neginf=0.0).max(axis=1)
+            return np.maximum(bounds, 0.0).tolist()
+
+        best = {source: 0.0}
+        parent = {source: (None, None)}
+        heap = [(heuristics([source])[0], 0.0, source)]
+        closed = set()
+        while heap:
+            _, cost, node = heapq.heappop(heap)
+            if node == target:
+                break
+            if node in closed:
+                continue
+            closed.add(node)
+            start, end = int(indptr[node]), int(indptr[node + 1])
+            neighbours = indices[start:end].tolist()
+            weights = minutes[start:end].tolist()
+            improved = []
+            for offset, (neighbour, weight) in enumerate(zip(neighbours, weights)):
+                new_cost = cost + weight
+                if new_cost < best.get(neighbour, math.inf):
+                    best[neighbour] = new_cost
+                    parent[neighbour] = (node, start + offset)
+                    improved.append((neighbour, new_cost))
+            if not improved:
+                continue
+            for (neighbour, new_cost), estimate in zip(improved, heuristics([n for n, _ in improved])):
+                if estimate < math.inf:
+                    heapq.heappush(heap, (new_cost + estimate, new_cost, neighbour))
+        else:
+            return None
+
+        nodes, edges = [target], []
+        node = target
+        while parent[node][0] is not None:
+            node, edge = parent[node]
+            nodes.append(node)
+            edges.append(edge)
+        nodes.reverse()
+        edges.reverse()
+        return nodes, edges
+
+
+class RoutePolyline:
+    """A route's geometry with the cumulative mileage at each vertex.
+
+    `point_at` maps route mileages to coordinates with a binary search over
+    the cumulative array, so placing k stops costs O(k log n).
+    """
+
+    def __init__(self, coordinates, segment_miles=None):
+        coords = np.asarray(coordinates, dtype=float).reshape(-1, 2)
+        if segment_miles is None:
+            lat = np.radians(coords[:, 0])
+            lon = np.radians(coords[:, 1])
+            h = (np.sin(np.diff(lat) / 2) ** 2
+                 + np.cos(lat[:-1]) * np.cos(lat[1:]) * np.sin(np.diff(lon) / 2) ** 2)
+            segment_miles = 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.clip(h, 0.0, 1.0)))
+        self.coordinates = coords
+        self.cumulative_miles = np.concatenate(([0.0], np.cumsum(segment_miles)))
+
+    @classmethod
+    def great_circle(cls, origin, destination, total_miles, step_miles=25):
+        """Straight-line route, densified along the great circle and scaled to `total_miles`"""
+        lat1, lon1, lat2, lon2 = np.radians([origin[0], origin[1], destination[0], destination[1]])
+        a = np.array([np.cos(lat1) * np.cos(lon1), np.cos(lat1) * np.sin(lon1), np.sin(lat1)])
+        b = np.array([np.cos(lat2) * np.cos(lon2), np.cos(lat2) * np.sin(lon2), np.sin(lat2)])
+        angle = np.arccos(np.clip(a @ b, -1.0, 1.0))
+        steps = max(1, int(math.ceil(total_miles / step_miles)))
+        t = np.linspace(0.0, 1.0, steps + 1)
+        if angle < 1e-12:
+            points = np.repeat(a[None, :], steps + 1, axis=0)
+        else:
+            # Spherical linear interpolation between the two unit vectors
+            points = (np.sin((1 - t) * angle)[:, None] * a + np.sin(t * angle)[:, None] * b) / np.sin(angle)
+        coordinates = np.column_stack((
+            np.degrees(np.arcsin(np.clip(points[:, 2], -1.0, 1.0))),
+            np.degrees(np.arctan2(points[:, 1], points[:, 0])),
+        ))
+        # Equal steps along the great circle; scale so the ends match the
+        # distance the route was planned with
+        return cls(coordinates, np.full(steps, total_miles / steps))
+
+    @property
+    def total_miles(self):
+        return float(self.cumulative_miles[-1])
+
+    def point_at(self, miles):
+        """(lat, lon) at each route mileage, interpolated within its segment"""
+        cumulative = self.cumulative_miles
+        miles = np.clip(np.asarray(miles, dtype=float), 0.0, cumulative[-1])
+        if len(cumulative) == 1:
+            return [tuple(self.coordinates[0])] * len(miles)
+        i = np.clip(np.searchsorted(cumulative, miles, side='right') - 1, 0, len(cumulative) - 2)
+        span = cumulative[i + 1] - cumulative[i]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            fraction = np.where(span > 0, (miles - cumulative[i]) / span, 0.0)
+        points = self.coordinates[i] + fraction[:, None] * (self.coordinates[i + 1] - self.coordinates[i])
+        return [(float(lat), float(lon)) for lat, lon in points]
+
+
+@lru_cache(maxsize=None)
+def load_road_graph(path):
+    """Map a road graph once per process"""
+    return RoadGraph(path)
+
+
+def get_road_graph():
+    """The road graph at settings.ROAD_GRAPH_PATH, or None when not built"""
+    path = getattr(settings, 'ROAD_GRAPH_PATH', None)
+    if not path or not os.path.exists(os.path.join(str(path), 'indptr.npy')):
+        return None
+    try:
+        return load_road_graph(str(path))
+    except (OSError, ValueError) as e:
+        logger.warning(f"Road graph at {path} could not be loaded: {e}")
+        return None
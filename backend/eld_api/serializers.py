@@ -1,5 +1,18 @@
 from rest_framework import serializers
-from .models import Trip, Route, LogSheet, LogEntry
+from django.conf import settings
+from .models import Trip, Route, LogSheet, LogEntry, ExportJob
+from .distance import DISTANCE_MODES
+
+
+class DynamicFieldsModelSerializer(serializers.ModelSerializer):
+    """ModelSerializer taking an optional `fields` argument that limits its output"""
+    
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
 
 
 class RouteSerializer(serializers.ModelSerializer):
@@ -22,9 +35,11 @@ class LogSheetSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class TripSerializer(serializers.ModelSerializer):
+class TripSerializer(DynamicFieldsModelSerializer):
     routes = RouteSerializer(many=True, read_only=True)
     log_sheets = LogSheetSerializer(many=True, read_only=True)
+    # Only present when the queryset is annotated with it (trip_list summaries)
+    log_sheet_count = serializers.IntegerField(read_only=True)
     
     class Meta:
         model = Trip
@@ -41,4 +56,63 @@ class TripCreateSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         # Set a default driver or make it optional
         validated_data['driver'] = None  # Make driver optional for now
-        return super().create(validated_data) 
\ No newline at end of file
+        return super().create(validated_data)
+
+
+class ExportJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ExportJob
+        fields = ['id', 'status', 'trip', 'driver_name', 'start_date', 'end_date',
+                  'total', 'completed', 'error', 'created_at', 'finished_at']
+        read_only_fields = ['status', 'total', 'completed', 'error', 'created_at', 'finished_at']
+    
+    def validate(self, data):
+        if not data.get('trip') and not data.get('driver_name'):
+            raise serializers.ValidationError('Either trip or driver_name is required')
+        if data.get('start_date') and data.get('end_date') and data['start_date'] > data['end_date']:
+            raise serializers.ValidationError('start_date must not be after end_date')
+        return data
+
+
+class LocationField(serializers.Field):
+    """A location given either as a string to geocode or as a [lat, lon] pair"""
+    
+    def to_internal_value(self, data):
+        if isinstance(data, str):
+            if not data.strip():
+                raise serializers.ValidationError('Location must not be blank')
+            return data
+        try:
+            latitude, longitude = (float(value) for value in data)
+        except (TypeError, ValueError):
+            raise serializers.ValidationError('Expected a location string or a [lat, lon] pair')
+        if not -90 <= latitude <= 90 or not -180 <= longitude <= 180:
+            raise serializers.ValidationError('Coordinates out of range')
+        return (latitude, longitude)
+    
+    def to_representation(self, value):
+        return value
+
+
+class DistanceMatrixSerializer(serializers.Serializer):
+    origins = serializers.ListField(child=LocationField(), allow_empty=False)
+    destinations = serializers.ListField(child=LocationField(), allow_empty=False)
+    mode = serializers.ChoiceField(choices=DISTANCE_MODES, default='lambert')
+    
+    def validate(self, data):
+        cells = len(data['origins']) * len(data['destinations'])
+        if cells > settings.DISTANCE_MATRIX_MAX_CELLS:
+            raise serializers.ValidationError(
+                f'At most {settings.DISTANCE_MATRIX_MAX_CELLS} origin/destination pairs per request'
+            )
+        if data['mode'] == 'geodesic' and cells > settings.DISTANCE_MATRIX_MAX_GEODESIC_CELLS:
+            raise serializers.ValidationError(
+                f'At most {settings.DISTANCE_MATRIX_MAX_GEODESIC_CELLS} pairs in geodesic mode'
+            )
+        names = {loc for loc in data['origins'] + data['destinations'] if isinstance(loc, str)}
+        if len(names) > settings.DISTANCE_MATRIX_MAX_GEOCODES:
+            raise serializers.ValidationError(
+                f'At most {settings.DISTANCE_MATRIX_MAX_GEOCODES} distinct location names per request; '
+                'give the others as [lat, lon] pairs'
+            )
+        return data
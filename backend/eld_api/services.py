@@ -1,106 +1,331 @@
-import requests
-from datetime import datetime, timedelta
-from decimal import Decimal
-from geopy.geocoders import Nominatim
-from geopy.distance import geodesic
-import math
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+
+from .distance import distance_matrix, distance_miles
+from .geocoding import geocode_cache, get_async_geocoder, get_geocoder
+from .instrumentation import timed
+from .metrics import atimed_geocode, observe_geocode, timed_geocode
+from .hos import (
+    KIND_BREAK, KIND_FUEL, KIND_REST, KIND_RESTART, HOSSimulator, daily_logs, route_locator,
+)
+from .pois import SNAP_KINDS, get_poi_index
+from .routing import RoutePolyline, get_road_graph
+
+logger = logging.getLogger(__name__)
+
+
+# Shared pool for geocoder network calls, bounded so a burst of trips
+# cannot open an unbounded number of outbound connections. A lookup that
+# outlives its caller's budget cannot be interrupted and keeps its worker
+# until the request returns or hits GEOCODE_REQUEST_TIMEOUT
+geocode_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'GEOCODE_MAX_WORKERS', 8),
+    thread_name_prefix='geocode',
+)
+
+# Route point type for each simulated stop
+STOP_TYPES = {
+    KIND_BREAK: 'rest',
+    KIND_REST: 'rest',
+    KIND_RESTART: 'rest',
+    KIND_FUEL: 'fuel',
+}
 
 
 class RouteService:
     """Service for calculating routes and stops"""
     
-    def __init__(self):
-        self.geolocator = Nominatim(user_agent="trucking_eld_app")
+    def __init__(self, cache=geocode_cache, geolocator=None, road_graph=None, poi_index=None, async_geolocator=None):
+        self.geolocator = geolocator or get_geocoder()
+        self.async_geolocator = async_geolocator
+        self.cache = cache
+        self.road_graph = road_graph if road_graph is not None else get_road_graph()
+        self.poi_index = poi_index if poi_index is not None else get_poi_index()
+        self.simulator = HOSSimulator()
     
     def get_coordinates(self, location):
         """Get coordinates for a location string"""
+        found, coords = self.cache.get(location)
+        if found:
+            return coords
+        
         try:
-            location_data = self.geolocator.geocode(location)
-            if location_data:
-                return (location_data.latitude, location_data.longitude)
-            return None
+            location_data = timed_geocode(self.geolocator.geocode, location)
         except Exception as e:
-            print(f"Error geocoding {location}: {e}")
+            # Transient geocoder errors are not cached
+            logger.warning(f"Error geocoding {location}: {e}")
             return None
+        
+        coords = (location_data.latitude, location_data.longitude) if location_data else None
+        self.cache.set(location, coords)
+        return coords
     
-    def calculate_distance(self, location1, location2):
+    @timed('geocode')
+    def get_coordinates_many(self, locations, timeout=None):
+        """Geocode several locations concurrently within one timeout budget.
+        
+        Cache lookups and writes stay on the calling thread; only geocoder
+        calls for cache misses run on the shared pool. Locations that are not
+        resolved before the budget runs out map to None; lookups already
+        running are not stopped and finish in the background, their results
+        discarded.
+        """
+        if timeout is None:
+            timeout = getattr(settings, 'GEOCODE_TIMEOUT', 10)
+        
+        results = {}
+        pending = {}
+        for location in locations:
+            if not location or location in results or location in pending.values():
+                continue
+            found, coords = self.cache.get(location)
+            if found:
+                results[location] = coords
+            else:
+                pending[geocode_executor.submit(timed_geocode, self.geolocator.geocode, location)] = location
+        
+        done, not_done = wait(pending, timeout=timeout)
+        for future in not_done:
+            future.cancel()
+            observe_geocode('timeout')
+            logger.warning(f"Geocoding {pending[future]} exceeded the {timeout}s budget")
+            results[pending[future]] = None
+        for future in done:
+            location = pending[future]
+            try:
+                location_data = future.result()
+            except Exception:
+                # Transient geocoder errors are not cached
+                logger.exception(f"Error geocoding {location}")
+                results[location] = None
+                continue
+            coords = (location_data.latitude, location_data.longitude) if location_data else None
+            self.cache.set(location, coords)
+            results[location] = coords
+        
+        return results
+    
+    async def aget_coordinates_many(self, locations, timeout=None):
+        """Async get_coordinates_many, using the async geocoder client.
+        
+        The cache is read and written in one thread hop each; lookups for
+        the misses run concurrently on the event loop.
+        """
+        if timeout is None:
+            timeout = getattr(settings, 'GEOCODE_TIMEOUT', 10)
+        
+        with timed('geocode'):
+            return await self._aget_coordinates_many(locations, timeout)
+    
+    async def _aget_coordinates_many(self, locations, timeout):
+        locations = [location for location in dict.fromkeys(locations) if location]
+        cached = await sync_to_async(lambda: {location: self.cache.get(location) for location in locations})()
+        results = {location: coords for location, (found, coords) in cached.items() if found}
+        misses = [location for location in locations if location not in results]
+        if not misses:
+            return results
+        
+        if self.async_geolocator is not None:
+            resolved = await self._ageocode_many(self.async_geolocator, misses, timeout)
+        else:
+            async with get_async_geocoder() as geolocator:
+                resolved = await self._ageocode_many(geolocator, misses, timeout)
+        
+        def store():
+            for location, coords in resolved.items():
+                self.cache.set(location, coords)
+        await sync_to_async(store)()
+        
+        results.update(resolved)
+        for location in misses:
+            results.setdefault(location, None)
+        return results
+    
+    async def _ageocode_many(self, geolocator, locations, timeout):
+        """Geocode locations concurrently; returns coordinates (or None) for the lookups that finished"""
+        tasks = {asyncio.ensure_future(atimed_geocode(geolocator.geocode, location)): location for location in locations}
+        done, not_done = await asyncio.wait(tasks, timeout=timeout)
+        for task in not_done:
+            task.cancel()
+            observe_geocode('timeout')
+            logger.warning(f"Geocoding {tasks[task]} exceeded the {timeout}s budget")
+        
+        resolved = {}
+        for task in done:
+            location = tasks[task]
+            try:
+                location_data = task.result()
+            except Exception:
+                # Transient geocoder errors are not cached
+                logger.exception(f"Error geocoding {location}")
+                continue
+            resolved[location] = (location_data.latitude, location_data.longitude) if location_data else None
+        return resolved
+    
+    def calculate_distance(self, location1, location2, coordinates=None):
         """Calculate distance between two locations"""
-        coords1 = self.get_coordinates(location1)
-        coords2 = self.get_coordinates(location2)
+        if coordinates is None:
+            coordinates = self.get_coordinates_many([location1, location2])
+        coords1 = coordinates.get(location1)
+        coords2 = coordinates.get(location2)
         
         if coords1 and coords2:
-            return geodesic(coords1, coords2).miles
+            return distance_miles(coords1, coords2, getattr(settings, 'ROUTE_DISTANCE_MODE', 'geodesic'))
         return None
     
-    def calculate_route(self, pickup_location, dropoff_location, current_cycle_hours):
-        """Calculate route with rest stops and fuel stops"""
-        total_distance = self.calculate_distance(pickup_location, dropoff_location)
-        if not total_distance:
-            return None
+    def distance_matrix(self, origins, destinations, mode='lambert'):
+        """N x M distances in miles between origins and destinations.
         
-        # Calculate estimated driving time (assuming 60 mph average)
-        estimated_driving_hours = total_distance / 60
+        Each location is either a (lat, lon) pair or a string to geocode; all
+        strings are geocoded concurrently. Returns the resolved coordinates of
+        both sides and the matrix as nested lists, with None wherever a
+        location could not be resolved.
+        """
+        names = [loc for loc in list(origins) + list(destinations) if isinstance(loc, str)]
+        resolved = self.get_coordinates_many(names) if names else {}
         
-        # Calculate required rest stops
-        # Property-carrying drivers: 11 hours driving max, 10 hours off-duty required
-        max_driving_hours = 11
-        required_rest_hours = 10
+        def coordinates(locations):
+            return [resolved.get(loc) if isinstance(loc, str) else tuple(loc) for loc in locations]
         
-        # Calculate how many rest periods needed
-        rest_periods_needed = math.ceil(estimated_driving_hours / max_driving_hours)
+        origin_coords = coordinates(origins)
+        destination_coords = coordinates(destinations)
+        nan = (float('nan'), float('nan'))
+        matrix = distance_matrix(
+            [c or nan for c in origin_coords],
+            [c or nan for c in destination_coords],
+            mode
+        )
+        distances = np.where(np.isnan(matrix), None, np.round(matrix, 2)).tolist()
+        return origin_coords, destination_coords, distances
+    
+    def road_route(self, coords1, coords2):
+        """Road route between two points, or None without a usable road graph"""
+        if self.road_graph is None or not (coords1 and coords2):
+            return None
+        road = self.road_graph.route(coords1, coords2)
+        if road is None or road.distance_miles <= 0:
+            return None
+        return road
+    
+    def nearest_facility(self, position, location_type):
+        """Closest truck stop that can serve a rest or fuel stop, if one is near enough"""
+        if self.poi_index is None or not position:
+            return None
+        matches = self.poi_index.nearest(
+            position[0], position[1],
+            kinds=SNAP_KINDS[location_type],
+            max_radius_miles=getattr(settings, 'POI_SNAP_RADIUS_MILES', 25)
+        )
+        return matches[0] if matches else None
+    
+    def calculate_route(self, pickup_location, dropoff_location, current_cycle_hours, current_location=None):
+        """Calculate route with rest stops and fuel stops"""
+        # Resolve every endpoint at once so the slowest lookup bounds the latency
+        coordinates = self.get_coordinates_many([current_location, pickup_location, dropoff_location])
+        return self.plan_route(coordinates, pickup_location, dropoff_location, current_cycle_hours, current_location)
+    
+    async def acalculate_route(self, pickup_location, dropoff_location, current_cycle_hours, current_location=None):
+        """Async calculate_route: geocoding awaits the network instead of blocking a thread"""
+        coordinates = await self.aget_coordinates_many([current_location, pickup_location, dropoff_location])
+        # Road search and the HOS simulation are CPU work; keep them off the event loop
+        return await sync_to_async(self.plan_route, thread_sensitive=False)(
+            coordinates, pickup_location, dropoff_location, current_cycle_hours, current_location
+        )
+    
+    @timed('route_plan')
+    def plan_route(self, coordinates, pickup_location, dropoff_location, current_cycle_hours, current_location=None):
+        """Build the route plan from already geocoded locations"""
+        road = self.road_route(coordinates.get(pickup_location), coordinates.get(dropoff_location))
+        if road:
+            total_distance = road.distance_miles
+            # Drive time from the road speeds rather than a flat average
+            estimated_driving_hours = road.duration_hours
+        else:
+            total_distance = self.calculate_distance(pickup_location, dropoff_location, coordinates)
+            if not total_distance:
+                return None
+            # Calculate estimated driving time (assuming 60 mph average)
+            estimated_driving_hours = total_distance / 60
         
-        # Calculate fuel stops (every 1000 miles)
-        fuel_stops_needed = math.ceil(total_distance / 1000)
+        # Deadhead leg from the driver's current location to the pickup
+        deadhead_distance = None
+        if current_location:
+            deadhead_road = self.road_route(coordinates.get(current_location), coordinates.get(pickup_location))
+            if deadhead_road:
+                deadhead_distance = deadhead_road.distance_miles
+            else:
+                deadhead_distance = self.calculate_distance(current_location, pickup_location, coordinates)
         
-        # Generate route waypoints
-        route_points = []
+        average_speed_mph = total_distance / estimated_driving_hours if estimated_driving_hours else 60
         
-        # Add pickup location
-        route_points.append({
-            'sequence': 1,
-            'location': pickup_location,
-            'location_type': 'pickup',
-            'distance_from_previous': 0,
-            'duration_hours': 1  # 1 hour for pickup
-        })
-        
-        # Add rest stops
-        for i in range(rest_periods_needed):
-            # Calculate rest stop location (approximately 1/3, 2/3 of the way)
-            progress = (i + 1) / (rest_periods_needed + 1)
-            route_points.append({
-                'sequence': len(route_points) + 1,
-                'location': f"Rest Stop {i+1}",
-                'location_type': 'rest',
-                'distance_from_previous': total_distance * progress / (rest_periods_needed + 1),
-                'duration_hours': required_rest_hours
-            })
+        # Route geometry: the road path when there is one, otherwise the great
+        # circle between the endpoints
+        pickup_coords = coordinates.get(pickup_location)
+        dropoff_coords = coordinates.get(dropoff_location)
+        if road:
+            polyline = road.polyline
+        else:
+            polyline = RoutePolyline.great_circle(pickup_coords, dropoff_coords, total_distance)
+        
+        # Stops fall where the HOS simulation hits a rest or fuel limit
+        # Property-carrying drivers: 11 hours driving max, 10 hours off-duty required
+        timeline = self.simulator.simulate(
+            total_distance,
+            prior_cycle_hours=current_cycle_hours,
+            average_speed_mph=average_speed_mph
+        )
+        stops = [
+            (timeline.miles[i], STOP_TYPES[timeline.kinds[i]], timeline.durations[i] / 60)
+            for i in range(len(timeline))
+            if timeline.kinds[i] in STOP_TYPES
+        ]
+        positions = polyline.point_at([mile * polyline.total_miles / total_distance for mile, _, _ in stops])
+        
+        points = [(0.0, 'pickup', pickup_location, pickup_coords, 1)]  # 1 hour for pickup
+        counts = {'rest': 0, 'fuel': 0}
+        for (mile, location_type, duration_hours), position in zip(stops, positions):
+            counts[location_type] += 1
+            facility = self.nearest_facility(position, location_type)
+            if facility:
+                location = facility['name']
+                position = (facility['latitude'], facility['longitude'])
+            else:
+                label = 'Rest Stop' if location_type == 'rest' else 'Fuel Stop'
+                location = f"{label} {counts[location_type]}"
+            points.append((mile, location_type, location, position, duration_hours))
+        points.append((total_distance, 'dropoff', dropoff_location, dropoff_coords, 1))  # 1 hour for dropoff
         
-        # Add fuel stops
-        for i in range(fuel_stops_needed):
-            fuel_progress = (i + 1) / (fuel_stops_needed + 1)
+        # Distances are differences of rounded mileages, so they add up to
+        # the rounded total exactly
+        route_points = []
+        previous_mile = 0.0
+        for mile, location_type, location, position, duration_hours in points:
+            mile = round(mile, 2)
             route_points.append({
                 'sequence': len(route_points) + 1,
-                'location': f"Fuel Stop {i+1}",
-                'location_type': 'fuel',
-                'distance_from_previous': total_distance * fuel_progress / (fuel_stops_needed + 1),
-                'duration_hours': 0.5  # 30 minutes for fueling
+                'location': location,
+                'location_type': location_type,
+                'distance_from_previous': round(mile - previous_mile, 2),
+                'duration_hours': round(duration_hours, 2),
+                'latitude': position[0] if position else None,
+                'longitude': position[1] if position else None,
             })
-        
-        # Add dropoff location
-        route_points.append({
-            'sequence': len(route_points) + 1,
-            'location': dropoff_location,
-            'location_type': 'dropoff',
-            'distance_from_previous': total_distance / (len(route_points) + 1),
-            'duration_hours': 1  # 1 hour for dropoff
-        })
+            previous_mile = mile
         
         return {
             'total_distance': total_distance,
+            'deadhead_distance': deadhead_distance,
             'estimated_driving_hours': estimated_driving_hours,
-            'rest_periods_needed': rest_periods_needed,
-            'fuel_stops_needed': fuel_stops_needed,
+            'average_speed_mph': average_speed_mph,
+            'routing': 'road' if road else 'straight_line',
+            'rest_periods_needed': sum(1 for kind in timeline.kinds if kind in (KIND_REST, KIND_RESTART)),
+            'fuel_stops_needed': counts['fuel'],
             'route_points': route_points
         }
 
@@ -112,58 +337,49 @@ class ELDService:
         self.max_cycle_hours = 70  # 70 hours in 8 days
         self.max_driving_hours = 11  # 11 hours max driving
         self.required_rest_hours = 10  # 10 hours off-duty required
+        self.simulator = HOSSimulator(
+            max_driving_hours=self.max_driving_hours,
+            required_rest_hours=self.required_rest_hours,
+            max_cycle_hours=self.max_cycle_hours,
+        )
     
-    def generate_log_sheets(self, trip, route_data):
-        """Generate ELD log sheets for the trip"""
-        total_distance = route_data['total_distance']
-        estimated_hours = route_data['estimated_driving_hours']
+    @timed('hos')
+    def generate_log_sheets(self, trip, route_data, start_date=None):
+        """Generate ELD log sheets for the trip, one per calendar day.
         
-        # Calculate how many days this trip will take
-        days_needed = math.ceil(estimated_hours / self.max_driving_hours)
+        The trip is simulated under the HOS rules starting at 6 AM on
+        `start_date` (the trip's creation date by default).
+        """
+        if start_date is None:
+            start_date = (trip.created_at or timezone.now()).date()
         
-        log_sheets = []
-        current_date = datetime.now().date()
+        timeline = self.simulator.simulate(
+            route_data['total_distance'],
+            start_minute=6 * 60,  # Start at 6 AM
+            prior_cycle_hours=trip.current_cycle_hours,
+            average_speed_mph=route_data.get('average_speed_mph')
+        )
+        route_points = route_data['route_points']
+        locate = route_locator(timeline.total_miles, route_points[0]['location'], route_points[-1]['location'])
         
-        for day in range(days_needed):
-            log_sheet = {
-                'date': current_date + timedelta(days=day),
+        log_sheets = []
+        for day in daily_logs(timeline, start_date, locate):
+            off_duty, sleeper, driving, on_duty = (round(minutes / 60, 2) for minutes in day['minutes'])
+            cycle_hours_used = round(day['cycle_minutes'] / 60, 2)
+            log_sheets.append({
+                'date': day['date'],
                 'driver_name': 'John Driver',  # Default name
                 'vehicle_id': 'Truck-001',
-                'driving_hours': min(self.max_driving_hours, estimated_hours - (day * self.max_driving_hours)),
-                'on_duty_hours': min(self.max_driving_hours + 2, estimated_hours - (day * self.max_driving_hours) + 2),
-                'off_duty_hours': self.required_rest_hours,
-                'sleeper_hours': 0,
-                'cycle_hours_used': trip.current_cycle_hours + (day * self.max_driving_hours),
-                'cycle_hours_remaining': self.max_cycle_hours - (trip.current_cycle_hours + (day * self.max_driving_hours)),
-                'total_distance': total_distance / days_needed if day < days_needed - 1 else total_distance - (total_distance / days_needed * (days_needed - 1)),
-                'fuel_stops': 1 if day % 2 == 0 else 0,  # Fuel every other day
-                'rest_stops': 1,
-                'entries': self.generate_log_entries(day, route_data)
-            }
-            log_sheets.append(log_sheet)
+                'driving_hours': driving,
+                'on_duty_hours': on_duty,
+                'off_duty_hours': off_duty,
+                'sleeper_hours': sleeper,
+                'cycle_hours_used': cycle_hours_used,
+                'cycle_hours_remaining': max(0, round(self.max_cycle_hours - cycle_hours_used, 2)),
+                'total_distance': round(day['miles'], 2),
+                'fuel_stops': day['fuel_stops'],
+                'rest_stops': day['rest_stops'],
+                'entries': day['entries']
+            })
         
         return log_sheets
-    
-    def generate_log_entries(self, day, route_data):
-        """Generate individual log entries for a day"""
-        entries = []
-        base_time = datetime.now().replace(hour=6, minute=0, second=0, microsecond=0)  # Start at 6 AM
-        
-        # Add driving entry
-        entries.append({
-            'time': (base_time + timedelta(hours=1)).time(),
-            'status': 'driving',
-            'location': route_data['route_points'][0]['location'],
-            'remarks': f'Day {day + 1} - Start driving'
-        })
-        
-        # Add rest entry
-        rest_time = base_time + timedelta(hours=self.max_driving_hours + 1)
-        entries.append({
-            'time': rest_time.time(),
-            'status': 'off_duty',
-            'location': 'Rest Stop',
-            'remarks': f'Day {day + 1} - Required rest period'
-        })
-        
-        return entries 
\ No newline at end of file
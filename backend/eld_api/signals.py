@@ -0,0 +1,62 @@
+from django.db.backends.signals import connection_created
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .instrumentation import install_query_counter
+from .models import LogEntry, LogSheet, Route, Trip
+from .pdf_cache import pdf_cache
+from .snapshots import invalidate_trip_snapshot
+from .transactions import first_in_transaction
+from .view_cache import view_cache
+
+# Per-request SQL counts for PerformanceMiddleware
+connection_created.connect(install_query_counter, dispatch_uid='eld_api_query_counter')
+
+
+@receiver([post_save, post_delete], sender=LogSheet)
+def invalidate_log_sheet_pdf(sender, instance, **kwargs):
+    pdf_cache.invalidate(instance.pk)
+
+
+@receiver(post_save, sender=Trip)
+def invalidate_trip_snapshot_on_save(sender, instance, created, using, **kwargs):
+    # A new trip has no rows yet; save_trip_plan stores its first snapshot
+    if not created:
+        invalidate_trip_snapshot(instance.pk, using)
+    view_cache.invalidate_trip(instance.pk, using)
+
+
+@receiver(post_delete, sender=Trip)
+def invalidate_trip_views_on_delete(sender, instance, using, **kwargs):
+    view_cache.invalidate_trip(instance.pk, using)
+
+
+@receiver([post_save, post_delete], sender=Route)
+@receiver([post_save, post_delete], sender=LogSheet)
+def invalidate_trip_snapshot_on_child_change(sender, instance, using, **kwargs):
+    invalidate_trip_snapshot(instance.trip_id, using)
+    view_cache.invalidate_trip(instance.trip_id, using)
+
+
+def is_cascade_from(origin, models):
+    """Whether a post_delete was caused by deleting one of `models` (an instance or a queryset)"""
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return model in models
+
+
+@receiver([post_save, post_delete], sender=LogEntry)
+def invalidate_on_entry_change(sender, instance, using, origin=None, **kwargs):
+    # Deleting a sheet or trip deletes its entries too; the sheet and trip receivers cover them
+    if origin is not None and is_cascade_from(origin, (LogSheet, Trip)):
+        return
+    # Entries change in batches; their sheet and trip are invalidated once per transaction
+    if not first_in_transaction(('log_entry_sheet', instance.log_sheet_id), using):
+        return
+    pdf_cache.invalidate(instance.log_sheet_id)
+    if LogEntry.log_sheet.is_cached(instance):
+        trip_id = instance.log_sheet.trip_id
+    else:
+        trip_id = LogSheet.objects.using(using).filter(id=instance.log_sheet_id).values_list('trip_id', flat=True).first()
+    invalidate_trip_snapshot(trip_id, using)
+    view_cache.invalidate_trip(trip_id, using)
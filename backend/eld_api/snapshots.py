@@ -0,0 +1,83 @@
+"""Materialized trip documents and trip versions.
+
+A trip hardly ever changes after create_trip, so its full JSON document
+(the trip with its routes, log sheets and entries, as TripSerializer
+renders it) is stored in TripSnapshot when the trip is written. trip_detail
+then serves those bytes with a single primary-key lookup.
+
+The snapshot also carries the trip's version. Every change to the trip or
+one of its rows bumps the version and clears the document in the same
+transaction; the document is rebuilt once the transaction commits, or by
+the next read, whichever comes first. The version and its timestamp are
+the validators (ETag, Last-Modified) of the trip and log sheet endpoints.
+"""
+import logging
+from functools import partial
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .fast_serializers import TripRowSerializer
+from .models import Trip, TripSnapshot
+from .renderers import FastJSONRenderer
+from .transactions import first_in_transaction
+
+logger = logging.getLogger(__name__)
+
+
+def render_trip_document(trip_id):
+    """(data, JSON bytes) of a trip as trip_detail returns it, or None if there is no such trip"""
+    serializer = TripRowSerializer()
+    trips = serializer.serialize(serializer.values_list(Trip.objects.filter(id=trip_id)))
+    if not trips:
+        return None
+    return trips[0], FastJSONRenderer().render(trips[0])
+
+
+def rebuild_trip_snapshot(trip_id):
+    """Re-render a trip's document and store it; returns the document, or None if the trip is gone.
+
+    The document is only stored if the version it was rendered at is still
+    current, so a change committed during the render is never masked.
+    """
+    version = TripSnapshot.objects.filter(trip_id=trip_id).values_list('version', flat=True).first()
+    rendered = render_trip_document(trip_id)
+    if rendered is None:
+        return None
+    _, document = rendered
+    if version is None:
+        TripSnapshot.objects.get_or_create(trip_id=trip_id, defaults={'document': document})
+    else:
+        TripSnapshot.objects.filter(trip_id=trip_id, version=version).update(document=document)
+    return document
+
+
+def get_trip_document(trip_id):
+    """Stored JSON document of a trip, rebuilt when missing; None if no such trip"""
+    document = TripSnapshot.objects.filter(trip_id=trip_id).values_list('document', flat=True).first()
+    if document is None:
+        document = rebuild_trip_snapshot(trip_id)
+    return document
+
+
+def get_trip_version(trip_id):
+    """(version, last modified) of a trip, creating its snapshot if it has none; None if no such trip"""
+    row = TripSnapshot.objects.filter(trip_id=trip_id).values_list('version', 'updated_at').first()
+    if row is None and rebuild_trip_snapshot(trip_id) is not None:
+        row = TripSnapshot.objects.filter(trip_id=trip_id).values_list('version', 'updated_at').first()
+    return row
+
+
+def invalidate_trip_snapshot(trip_id, using=None):
+    """Bump a trip's version and drop its document; it is rebuilt after the transaction commits.
+
+    Saving a log sheet with its entries fires a signal per row; the version
+    is only bumped, and the rebuild queued, once per trip and transaction.
+    """
+    if trip_id is None or not first_in_transaction(('snapshot', trip_id), using):
+        return
+    TripSnapshot.objects.using(using).filter(trip_id=trip_id).update(
+        version=F('version') + 1, document=None, updated_at=timezone.now()
+    )
+    transaction.on_commit(partial(rebuild_trip_snapshot, trip_id), using=using)
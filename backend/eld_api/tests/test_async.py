@@ -0,0 +1,89 @@
+import asyncio
+import json
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.test import AsyncRequestFactory, TestCase, override_settings
+
+from .. import views
+from ..benchmarks import FixedGeocoder
+from ..geocoding import GeocodeCache, ThreadedAsyncGeocoder
+from ..models import LogSheet, Trip
+from ..services import RouteService
+from .utils import TEST_CACHES, TripAPITestMixin
+
+
+class SlowAsyncGeocoder(ThreadedAsyncGeocoder):
+    """Never answers for 'Slow'"""
+
+    async def geocode(self, query):
+        if query == 'Slow':
+            await asyncio.sleep(60)
+        return await super().geocode(query)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class AsyncViewTests(TripAPITestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.factory = AsyncRequestFactory()
+        patcher = mock.patch('eld_api.services.get_async_geocoder',
+                             side_effect=lambda: ThreadedAsyncGeocoder(FixedGeocoder()))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_create_trip_async(self):
+        request = self.factory.post('/api/trips/create/', self.trip_payload(1500), content_type='application/json')
+        response = await views.create_trip_async(request)
+        self.assertEqual(response.status_code, 201, response.content)
+        body = json.loads(response.content)
+        trip_id = body['trip']['id']
+        self.assertEqual(set(body), {'trip', 'route_data', 'message'})
+        self.assertEqual(await Trip.objects.filter(id=trip_id).acount(), 1)
+        self.assertEqual(len(body['trip']['log_sheets']), await LogSheet.objects.filter(trip_id=trip_id).acount())
+
+    async def test_create_trip_async_matches_sync(self):
+        request = self.factory.post('/api/trips/create/', self.trip_payload(900), content_type='application/json')
+        async_body = json.loads((await views.create_trip_async(request)).content)
+        sync_response = await sync_to_async(self.client.post)(
+            '/api/trips/create/', self.trip_payload(900), content_type='application/json'
+        )
+        sync_body = sync_response.json()
+        self.assertEqual(async_body['route_data'], sync_body['route_data'])
+        self.assertEqual(async_body['trip']['total_distance'], sync_body['trip']['total_distance'])
+        self.assertEqual(len(async_body['trip']['log_sheets']), len(sync_body['trip']['log_sheets']))
+
+    async def test_create_trip_async_rejects_bad_requests(self):
+        response = await views.create_trip_async(self.factory.get('/api/trips/create/'))
+        self.assertEqual(response.status_code, 405)
+        request = self.factory.post('/api/trips/create/', b'{not json', content_type='application/json')
+        self.assertEqual((await views.create_trip_async(request)).status_code, 400)
+        request = self.factory.post('/api/trips/create/', {'pickup_location': 'Origin'},
+                                    content_type='application/json')
+        response = await views.create_trip_async(request)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('dropoff_location', json.loads(response.content))
+
+    async def test_calculate_route_async_shares_the_plan_cache(self):
+        params = {'pickup_location': 'Origin', 'dropoff_location': 'Destination 700', 'current_cycle_hours': '5'}
+        sync_response = await sync_to_async(self.client.get)('/api/calculate-route/', params)
+        response = await views.calculate_route_only_async(self.factory.get('/api/calculate-route/', params))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], sync_response['ETag'])
+        self.assertEqual(json.loads(response.content), sync_response.json())
+
+        request = self.factory.get('/api/calculate-route/', params, headers={'If-None-Match': response['ETag']})
+        self.assertEqual((await views.calculate_route_only_async(request)).status_code, 304)
+        request = self.factory.get('/api/calculate-route/', {'pickup_location': 'Origin'})
+        self.assertEqual((await views.calculate_route_only_async(request)).status_code, 400)
+
+    async def test_geocode_budget(self):
+        cache = GeocodeCache()
+        service = RouteService(cache=cache, geolocator=FixedGeocoder(),
+                               async_geolocator=SlowAsyncGeocoder(FixedGeocoder()))
+        with self.assertLogs('eld_api.services', 'WARNING'):
+            results = await service.aget_coordinates_many(['Origin', 'Slow', None], timeout=0.2)
+        self.assertEqual(results, {'Origin': FixedGeocoder.origin, 'Slow': None})
+        self.assertEqual(await sync_to_async(cache.get)('Slow'), (False, None))
+        self.assertEqual(await sync_to_async(cache.get)('Origin'), (True, FixedGeocoder.origin))
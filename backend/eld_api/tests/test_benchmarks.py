@@ -0,0 +1,59 @@
+import os
+import tempfile
+
+from django.test import TestCase, override_settings
+
+from ..benchmarks import MILES_PER_DEGREE_LATITUDE, FixedGeocoder, compare, load_baseline, run_benchmarks, save_baseline
+from .utils import TEST_CACHES
+
+RESULT_FIELDS = {'ops_per_sec', 'mean_ms', 'p95_ms', 'peak_kib', 'allocated_blocks', 'queries', 'inserts'}
+
+
+class FixedGeocoderTests(TestCase):
+
+    def test_destination_is_due_north(self):
+        geocoder = FixedGeocoder()
+        origin = geocoder.geocode('Origin')
+        destination = geocoder.geocode('Destination 690.5')
+        self.assertEqual((origin.latitude, origin.longitude), FixedGeocoder.origin)
+        self.assertAlmostEqual(destination.latitude - origin.latitude, 690.5 / MILES_PER_DEGREE_LATITUDE)
+        self.assertEqual(destination.longitude, origin.longitude)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class BenchmarkSuiteTests(TestCase):
+
+    def test_run_benchmarks(self):
+        results = run_benchmarks([100, 1500], runs=2, cases=('calculate_route', 'generate_log_sheets', 'create_trip'))
+        self.assertEqual(set(results), {
+            f'{case}/{miles}' for case in ('calculate_route', 'generate_log_sheets', 'create_trip')
+            for miles in (100, 1500)
+        })
+        for name, result in results.items():
+            self.assertEqual(set(result), RESULT_FIELDS, name)
+            self.assertGreater(result['ops_per_sec'], 0)
+            self.assertLessEqual(result['mean_ms'], result['p95_ms'] * 2)
+        # create_trip writes with a fixed number of INSERTs whatever the trip length
+        self.assertEqual(results['create_trip/100']['inserts'], results['create_trip/1500']['inserts'])
+        self.assertEqual(results['calculate_route/100']['inserts'], 0)
+
+    def test_road_route_case(self):
+        results = run_benchmarks([100, 300], runs=2, cases=('road_route',))
+        self.assertEqual(set(results), {'road_route/100', 'road_route/300'})
+        self.assertEqual(results['road_route/300']['queries'], 0)
+
+    def test_baseline_round_trip_and_compare(self):
+        base = {'case/100': {'ops_per_sec': 100.0, 'peak_kib': 100.0, 'queries': 5}}
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'baseline.json')
+            save_baseline(path, base)
+            loaded, machine = load_baseline(path)
+        self.assertEqual(loaded, base)
+        self.assertIn('python', machine)
+
+        within = {'case/100': {'ops_per_sec': 80.0, 'peak_kib': 120.0, 'queries': 5}}
+        self.assertEqual(compare(within, loaded, threshold=0.25), [])
+        worse = {'case/100': {'ops_per_sec': 70.0, 'peak_kib': 130.0, 'queries': 6}, 'new/1': {'queries': 1}}
+        regressions = compare(worse, loaded, threshold=0.25)
+        self.assertEqual(len(regressions), 3)
+        self.assertTrue(all(regression.startswith('case/100') for regression in regressions))
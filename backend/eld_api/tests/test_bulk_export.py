@@ -0,0 +1,96 @@
+import json
+from datetime import timedelta
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from ..bulk_export import decode_export_cursor, encode_export_cursor, export_trips_queryset, iter_export_records
+from ..models import LogEntry, LogSheet, Route, Trip
+from ..serializers import TripSerializer
+from .utils import TEST_CACHES, TripAPITestMixin
+
+
+@override_settings(CACHES=TEST_CACHES)
+class TripExportTests(TripAPITestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.trips = [self.create_trip(miles) for miles in (150, 900, 2500, 400)]
+
+    def export(self, **params):
+        response = self.client.get('/api/exports/trips.ndjson', params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        return [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+
+    def test_records_match_the_api(self):
+        records = self.export()
+        self.assertEqual(records[-1], {'type': 'end', 'trips': 4, 'cursor': encode_export_cursor(self.trips[-1].id)})
+        self.assertEqual([r['data']['id'] for r in records if r['type'] == 'trip'], [t.id for t in self.trips])
+        counts = {kind: sum(r['type'] == kind for r in records) for kind in ('route', 'log_sheet', 'log_entry')}
+        self.assertEqual(counts, {
+            'route': Route.objects.count(), 'log_sheet': LogSheet.objects.count(), 'log_entry': LogEntry.objects.count(),
+        })
+
+        # Rebuild the first trip's nested document from its records
+        expected = json.loads(json.dumps(TripSerializer(Trip.objects.get(id=self.trips[0].id)).data))
+        trip = None
+        for record in records:
+            if record['type'] == 'trip':
+                trip = dict(record['data'], routes=[], log_sheets=[])
+            elif record['type'] == 'route':
+                trip['routes'].append(record['data'])
+            elif record['type'] == 'log_sheet':
+                trip['log_sheets'].append(dict(record['data'], entries=[]))
+            elif record['type'] == 'log_entry':
+                trip['log_sheets'][-1]['entries'].append(record['data'])
+            elif record['type'] == 'checkpoint':
+                break
+        self.assertEqual(trip, expected)
+
+    def test_resume_from_checkpoint(self):
+        records = self.export()
+        checkpoints = [r['cursor'] for r in records if r['type'] == 'checkpoint']
+        self.assertEqual(len(checkpoints), 4)
+
+        resumed = self.export(cursor=checkpoints[1])
+        self.assertEqual([r['data']['id'] for r in resumed if r['type'] == 'trip'], [t.id for t in self.trips[2:]])
+        self.assertEqual(resumed, records[records.index({'type': 'checkpoint', 'cursor': checkpoints[1]}) + 1:][:-1]
+                         + [{'type': 'end', 'trips': 2, 'cursor': checkpoints[-1]}])
+
+        # The end cursor picks up trips created later, and nothing before them
+        self.assertEqual(self.export(cursor=records[-1]['cursor']), [{'type': 'end', 'trips': 0}])
+        trip = self.create_trip(300)
+        self.assertEqual([r['data']['id'] for r in self.export(cursor=records[-1]['cursor']) if r['type'] == 'trip'],
+                         [trip.id])
+
+    def test_filters(self):
+        LogSheet.objects.filter(trip=self.trips[1]).update(driver_name='Jane Driver')
+        self.assertEqual(list(export_trips_queryset(driver_name='Jane Driver')), [self.trips[1]])
+
+        Trip.objects.filter(id=self.trips[0].id).update(created_at=timezone.now() - timedelta(days=3))
+        today = timezone.localdate()
+        self.assertEqual(list(export_trips_queryset(start_date=today)), self.trips[1:])
+        self.assertEqual(list(export_trips_queryset(end_date=today - timedelta(days=1))), self.trips[:1])
+
+        self.assertEqual(self.export(start_date=today.isoformat())[-1]['trips'], 3)
+        self.assertEqual(self.client.get('/api/exports/trips.ndjson', {'start_date': 'soon'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/exports/trips.ndjson', {'end_date': '2026-02-30'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/exports/trips.ndjson', {'cursor': 'not-a-cursor'}).status_code, 400)
+
+    def test_cursor_round_trip(self):
+        self.assertEqual(decode_export_cursor(encode_export_cursor(42)), 42)
+        for cursor in ('', 'not-a-cursor', encode_export_cursor('x'), 'cGFnZToz'):
+            with self.assertRaises(ValueError):
+                decode_export_cursor(cursor)
+
+    def test_queries_per_chunk(self):
+        def count_queries(chunk_size):
+            with CaptureQueriesContext(connection) as queries:
+                list(iter_export_records(export_trips_queryset(), chunk_size=chunk_size))
+            return len(queries)
+
+        # One trip query plus one per child table for each chunk
+        self.assertEqual(count_queries(4) * 2 - 1, count_queries(2))
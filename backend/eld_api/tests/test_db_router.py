@@ -0,0 +1,136 @@
+import asyncio
+
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from ..db_router import PIN_COOKIE, ReplicaRouter, ReplicaRoutingMiddleware, primary_reads, replica_reads
+from ..models import Trip
+
+
+class ReplicaRoutingTests(SimpleTestCase):
+    """Reads of replica_reads views go to a replica unless the request or client wrote"""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.router = ReplicaRouter()
+
+    def run_request(self, view, request):
+        return ReplicaRoutingMiddleware(lambda req: view(req))(request)
+
+    @override_settings(DATABASE_REPLICAS=['replica1'])
+    def test_replica_reads_view_reads_from_replica(self):
+        seen = []
+
+        @replica_reads
+        def view(request):
+            seen.append(self.router.db_for_read(Trip))
+            return HttpResponse()
+
+        response = self.run_request(view, self.factory.get('/'))
+        self.assertEqual(seen, ['replica1'])
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    @override_settings(DATABASE_REPLICAS=['replica1'])
+    def test_undecorated_view_reads_from_primary(self):
+        seen = []
+
+        def view(request):
+            seen.append(self.router.db_for_read(Trip))
+            return HttpResponse()
+
+        self.run_request(view, self.factory.get('/'))
+        self.assertEqual(seen, ['default'])
+
+    @override_settings(DATABASE_REPLICAS=['replica1'])
+    def test_outside_a_request_reads_from_primary(self):
+        self.assertEqual(self.router.db_for_read(Trip), 'default')
+        self.assertEqual(replica_reads(lambda: self.router.db_for_read(Trip))(), 'default')
+
+    @override_settings(DATABASE_REPLICAS=['replica1'], DATABASE_REPLICA_STICKY_SECONDS=7)
+    def test_write_pins_request_and_client_to_primary(self):
+        seen = []
+
+        @replica_reads
+        def view(request):
+            seen.append(self.router.db_for_read(Trip))
+            self.assertEqual(self.router.db_for_write(Trip), 'default')
+            seen.append(self.router.db_for_read(Trip))
+            return HttpResponse()
+
+        response = self.run_request(view, self.factory.get('/'))
+        self.assertEqual(seen, ['replica1', 'default'])
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], 7)
+        self.assertTrue(response.cookies[PIN_COOKIE]['httponly'])
+
+        # The client's next read stays on the primary while the cookie lasts
+        seen.clear()
+        request = self.factory.get('/')
+        request.COOKIES[PIN_COOKIE] = '1'
+        self.run_request(view, request)
+        self.assertEqual(seen[0], 'default')
+
+    @override_settings(DATABASE_REPLICAS=['replica1'])
+    def test_unsafe_methods_and_primary_reads_use_primary(self):
+        seen = []
+
+        @replica_reads
+        def view(request):
+            seen.append(self.router.db_for_read(Trip))
+            with primary_reads():
+                seen.append(self.router.db_for_read(Trip))
+            seen.append(self.router.db_for_read(Trip))
+            return HttpResponse()
+
+        self.run_request(view, self.factory.post('/'))
+        self.run_request(view, self.factory.get('/'))
+        self.assertEqual(seen, ['default', 'default', 'default', 'replica1', 'default', 'replica1'])
+
+    @override_settings(DATABASE_REPLICAS=['replica1', 'replica2', 'replica3'])
+    def test_one_replica_per_request(self):
+        seen = []
+
+        @replica_reads
+        def view(request):
+            seen.append({self.router.db_for_read(Trip) for _ in range(20)})
+            return HttpResponse()
+
+        for _ in range(20):
+            self.run_request(view, self.factory.get('/'))
+        self.assertTrue(all(len(aliases) == 1 for aliases in seen))
+        self.assertLessEqual(set().union(*seen), {'replica1', 'replica2', 'replica3'})
+
+    @override_settings(DATABASE_REPLICAS=['replica1'])
+    def test_async_views(self):
+        seen = []
+
+        @replica_reads
+        async def view(request):
+            seen.append(self.router.db_for_read(Trip))
+            self.router.db_for_write(Trip)
+            seen.append(self.router.db_for_read(Trip))
+            return HttpResponse()
+
+        response = asyncio.run(ReplicaRoutingMiddleware(view)(self.factory.get('/')))
+        self.assertEqual(seen, ['replica1', 'default'])
+        self.assertIn(PIN_COOKIE, response.cookies)
+        # The routing state does not outlive the request
+        self.assertEqual(self.router.db_for_read(Trip), 'default')
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas(self):
+        seen = []
+
+        @replica_reads
+        def view(request):
+            seen.append(self.router.db_for_read(Trip))
+            self.router.db_for_write(Trip)
+            return HttpResponse()
+
+        response = self.run_request(view, self.factory.get('/'))
+        self.assertEqual(seen, ['default'])
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    @override_settings(DATABASE_REPLICAS=['replica1'])
+    def test_migrations_skip_replicas(self):
+        self.assertFalse(self.router.allow_migrate('replica1', 'eld_api'))
+        self.assertIsNone(self.router.allow_migrate('default', 'eld_api'))
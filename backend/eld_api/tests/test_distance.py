@@ -0,0 +1,82 @@
+import math
+
+import numpy as np
+from django.test import SimpleTestCase, TestCase, override_settings
+from geopy.distance import geodesic
+
+from ..distance import distance_matrix, distance_miles
+from .utils import TEST_CACHES, TripAPITestMixin
+
+
+class DistanceMatrixTests(SimpleTestCase):
+
+    def setUp(self):
+        # Random points inside the continental US
+        rng = np.random.default_rng(7)
+        self.origins = np.column_stack([rng.uniform(25, 49, 20), rng.uniform(-124, -67, 20)])
+        self.destinations = np.column_stack([rng.uniform(25, 49, 15), rng.uniform(-124, -67, 15)])
+        self.exact = distance_matrix(self.origins, self.destinations, 'geodesic')
+
+    def test_fast_modes_stay_within_their_documented_error(self):
+        self.assertEqual(self.exact.shape, (20, 15))
+        lambert = distance_matrix(self.origins, self.destinations, 'lambert')
+        haversine = distance_matrix(self.origins, self.destinations, 'haversine')
+        self.assertLess(np.max(np.abs(lambert - self.exact) / self.exact), 0.000002)
+        self.assertLess(np.max(np.abs(haversine - self.exact) / self.exact), 0.004)
+
+    def test_geodesic_matches_geopy(self):
+        origin, destination = tuple(self.origins[3]), tuple(self.destinations[4])
+        self.assertAlmostEqual(self.exact[3, 4], geodesic(origin, destination).miles)
+        self.assertAlmostEqual(distance_miles(origin, destination), geodesic(origin, destination).miles)
+
+    def test_coincident_and_missing_points(self):
+        nan = (math.nan, math.nan)
+        for mode in ('geodesic', 'lambert', 'haversine'):
+            matrix = distance_matrix([(35.0, -100.0), nan], [(35.0, -100.0)], mode)
+            self.assertEqual(matrix[0, 0], 0.0)
+            self.assertTrue(np.isnan(matrix[1, 0]))
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            distance_matrix([(35.0, -100.0)], [(36.0, -100.0)], 'manhattan')
+
+
+@override_settings(CACHES=TEST_CACHES)
+class DistanceMatrixAPITests(TripAPITestMixin, TestCase):
+    url = '/api/distance-matrix/'
+
+    def post(self, **data):
+        return self.client.post(self.url, data, content_type='application/json')
+
+    def test_names_and_coordinate_pairs(self):
+        response = self.post(origins=['Origin'], destinations=['Destination 69.05', [30.0, -97.0]])
+        self.assertEqual(response.status_code, 200, response.content)
+        body = response.json()
+        self.assertEqual(body['mode'], 'lambert')
+        self.assertEqual(body['origins'], [[30.0, -97.0]])
+        self.assertEqual(body['destinations'], [[31.0, -97.0], [30.0, -97.0]])
+        self.assertAlmostEqual(body['distances'][0][0], 69.05, delta=0.5)
+        self.assertEqual(body['distances'][0][1], 0.0)
+
+    def test_modes_agree(self):
+        distances = {
+            mode: self.post(origins=['Origin'], destinations=['Destination 1000'], mode=mode).json()['distances'][0][0]
+            for mode in ('geodesic', 'lambert', 'haversine')
+        }
+        self.assertAlmostEqual(distances['lambert'], distances['geodesic'], delta=0.02)
+        self.assertAlmostEqual(distances['haversine'], distances['geodesic'], delta=distances['geodesic'] * 0.004)
+
+    @override_settings(DISTANCE_MATRIX_MAX_GEOCODES=3)
+    def test_geocode_cap(self):
+        response = self.post(origins=['Origin', 'Destination 100'], destinations=['Destination 200', [31.0, -97.0]])
+        self.assertEqual(response.status_code, 200)
+        response = self.post(origins=['Origin', 'Destination 100'], destinations=['Destination 200', 'Destination 300'])
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(DISTANCE_MATRIX_MAX_CELLS=4, DISTANCE_MATRIX_MAX_GEODESIC_CELLS=2)
+    def test_cell_caps(self):
+        pairs = [[30.0, -97.0], [31.0, -97.0]]
+        self.assertEqual(self.post(origins=pairs, destinations=pairs).status_code, 200)
+        self.assertEqual(self.post(origins=pairs, destinations=pairs + [[32.0, -97.0]]).status_code, 400)
+        self.assertEqual(self.post(origins=pairs, destinations=pairs, mode='geodesic').status_code, 400)
+        self.assertEqual(self.post(origins=[], destinations=pairs).status_code, 400)
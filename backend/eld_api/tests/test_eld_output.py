@@ -0,0 +1,123 @@
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from ..eld_output import (
+    ELDOutputFile, clean_field, eld_username, event_check_value, file_check_value, line_check_value,
+    split_driver_name,
+)
+from ..models import LogEntry, LogSheet
+from .utils import TEST_CACHES, TripAPITestMixin
+
+
+class ELDCheckValueTests(SimpleTestCase):
+    """Data check values of the ELD output file (appendix A, section 4.4.5)"""
+
+    def test_line_check_value(self):
+        # '1' and '2' count 1 and 2, ',' counts 0: 3 rotated left by 3 is 0x18, ^ 0x96
+        self.assertEqual(line_check_value('1,2'), '8E')
+        # Lower case letters count their ASCII value - 48 as well
+        self.assertEqual(line_check_value('a'), f'{((49 << 3) & 0xFF | 49 >> 5) ^ 0x96:02X}')
+        self.assertEqual(line_check_value(''), '96')
+
+    def test_line_check_value_wraps_to_a_byte(self):
+        # 'z' counts 74; 74 * 4 = 296 & 0xFF = 40, rotated left by 3 is 0x41
+        self.assertEqual(line_check_value('zzzz'), f'{0x41 ^ 0x96:02X}')
+
+    def test_event_check_value(self):
+        self.assertEqual(event_check_value('1', '2'), f'{0x18 ^ 0xC3:02X}')
+
+    def test_file_check_value(self):
+        # 0x1234 rotated left by 3 in 16 bits is 0x91A0, ^ 0x969C
+        self.assertEqual(file_check_value(0x1234), '073C')
+        self.assertEqual(file_check_value(0x10000), '969C')
+
+    def test_fields(self):
+        self.assertEqual(clean_field('Fuel, then\r\nrest – São Paulo'), 'Fuel then rest ? S?o Paulo')
+        self.assertEqual(clean_field(None), '')
+        self.assertEqual(len(clean_field('x' * 100)), 60)
+        self.assertEqual(split_driver_name('Mary Ann Driver'), ('Driver', 'Mary Ann'))
+        self.assertEqual(eld_username('John Driver, Jr.'), 'johndriverjr')
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ELDOutputFileTests(TripAPITestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.trips = [self.create_trip(miles) for miles in (150, 900, 2500)]
+        self.log_sheets = LogSheet.objects.filter(trip=self.trips[-1]).order_by('date')
+        self.driver_name = self.log_sheets[0].driver_name
+        self.params = {
+            'driver_name': self.driver_name,
+            'start_date': self.log_sheets.first().date.isoformat(),
+            'end_date': self.log_sheets.last().date.isoformat(),
+        }
+
+    def download(self, **params):
+        response = self.client.get('/api/log-sheets/eld-output/', dict(self.params, **params))
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode('ascii').split('\r\n')
+
+    def output_file(self, chunk_size):
+        return ELDOutputFile(self.driver_name, self.log_sheets.first().date, self.log_sheets.last().date,
+                             chunk_size=chunk_size)
+
+    def test_eld_output_file_check_values(self):
+        lines = self.download()
+        self.assertEqual(lines.pop(), '')
+        self.assertEqual(lines[-2], 'End of File:')
+
+        total = 0
+        events = 0
+        section = None
+        for line in lines[:-2]:
+            if line.endswith(':'):
+                section = line
+                continue
+            text, _, check = line.rpartition(',')
+            self.assertEqual(check, line_check_value(text), line)
+            total += int(check, 16)
+            events += section == 'ELD Event List:'
+        self.assertEqual(lines[-1], file_check_value(total))
+        # Every sheet of the driver in the range, the other trips' included
+        self.assertEqual(events, LogEntry.objects.filter(
+            log_sheet__driver_name=self.driver_name,
+            log_sheet__date__range=(self.log_sheets.first().date, self.log_sheets.last().date),
+        ).count())
+
+    def test_annotations_for_remarks(self):
+        entry = LogEntry.objects.filter(log_sheet=self.log_sheets[0]).order_by('time', 'id').first()
+        LogEntry.objects.exclude(id=entry.id).update(remarks='')
+        LogEntry.objects.filter(id=entry.id).update(remarks='Pre-trip, inspection')
+
+        lines = self.download(comment='Roadside, audit')
+        annotations = lines[lines.index('ELD Event Annotations or Comments:') + 1:
+                            lines.index("Driver's Certification/Recertification Actions:")]
+        self.assertEqual(len(annotations), 1)
+        fields = annotations[0].split(',')
+        self.assertEqual(fields[:3], [f'{entry.id & 0xFFFF:X}', eld_username(self.driver_name), 'Pre-trip inspection'])
+        self.assertIn('Roadside audit', lines[7])
+
+    def test_chunk_size_does_not_change_the_output(self):
+        self.assertGreater(self.log_sheets.count(), 2)
+        # The header holds the current time; compare the rest
+        self.assertEqual(list(self.output_file(2).lines())[7:], list(self.output_file(100).lines())[7:])
+
+    def test_queries_per_chunk(self):
+        def count_queries(chunk_size):
+            with CaptureQueriesContext(connection) as queries:
+                list(self.output_file(chunk_size).lines())
+            return len(queries)
+
+        sheets = LogSheet.objects.filter(driver_name=self.driver_name, date__range=(
+            self.log_sheets.first().date, self.log_sheets.last().date)).count()
+        # Events and annotations each read sheets, entries (and stops for events) per chunk
+        self.assertEqual(count_queries(sheets) + 5 * (sheets - 1), count_queries(1))
+
+    def test_invalid_parameters(self):
+        url = '/api/log-sheets/eld-output/'
+        self.assertEqual(self.client.get(url, {'driver_name': self.driver_name}).status_code, 400)
+        self.assertEqual(self.client.get(url, dict(self.params, start_date='2026-13-01')).status_code, 400)
+        self.assertEqual(self.client.get(url, dict(self.params, start_date=self.params['end_date'],
+                                                   end_date=self.params['start_date'])).status_code, 400)
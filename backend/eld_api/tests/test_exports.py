@@ -0,0 +1,91 @@
+import io
+import os
+import tempfile
+import zipfile
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from ..exports import export_job_log_sheets, run_export_job, write_log_sheets_zip
+from ..models import ExportJob, LogSheet
+from ..pdf_workers import log_sheet_archive_name
+from .utils import TEST_CACHES, TripAPITestMixin
+
+
+@override_settings(CACHES=TEST_CACHES, EXPORT_JOB_STALE_SECONDS=600)
+class ExportJobTests(TripAPITestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        export_dir = override_settings(EXPORT_DIR=tmp.name)
+        export_dir.enable()
+        self.addCleanup(export_dir.disable)
+        self.trip = self.create_trip(1500)
+        self.log_sheets = list(LogSheet.objects.filter(trip=self.trip).order_by('date', 'id'))
+
+    def job(self, status, created_ago=0, heartbeat_ago=None):
+        job = ExportJob.objects.create(trip=self.trip, status=status)
+        now = timezone.now()
+        ExportJob.objects.filter(pk=job.pk).update(
+            created_at=now - timedelta(seconds=created_ago),
+            heartbeat_at=now - timedelta(seconds=heartbeat_ago) if heartbeat_ago is not None else None,
+        )
+        return job
+
+    def status_of(self, job):
+        return self.client.get(f'/api/exports/{job.id}/').json()['status']
+
+    def test_stale_jobs_are_failed(self):
+        self.assertEqual(self.status_of(self.job('pending', created_ago=60)), 'pending')
+        self.assertEqual(self.status_of(self.job('pending', created_ago=3600)), 'failed')
+        self.assertEqual(self.status_of(self.job('running', created_ago=3600, heartbeat_ago=60)), 'running')
+        self.assertEqual(self.status_of(self.job('running', created_ago=3600, heartbeat_ago=3600)), 'failed')
+        # A running job without a heartbeat falls back to its creation time
+        self.assertEqual(self.status_of(self.job('running', created_ago=3600)), 'failed')
+
+    def test_stale_pending_job_is_not_run_later(self):
+        job = self.job('pending', created_ago=3600)
+        self.assertEqual(self.status_of(job), 'failed')
+        with self.assertLogs('eld_api.exports', 'WARNING'):
+            run_export_job(job.id)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(job.file_path, '')
+
+    def test_download_states(self):
+        running = self.job('running', heartbeat_ago=60)
+        self.assertEqual(self.client.get(f'/api/exports/{running.id}/download/').status_code, 409)
+
+        gone = ExportJob.objects.create(trip=self.trip, status='completed', file_path='/nonexistent/export.zip')
+        self.assertEqual(self.client.get(f'/api/exports/{gone.id}/download/').status_code, 410)
+
+    def test_run_export_job(self):
+        response = self.client.post('/api/exports/', {'trip': self.trip.id}, content_type='application/json')
+        self.assertEqual(response.status_code, 202, response.content)
+        job_id = response.json()['id']
+        # TestCase never commits, so the job is run here rather than on the export pool
+        run_export_job(job_id)
+
+        job = ExportJob.objects.get(pk=job_id)
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual((job.completed, job.total), (len(self.log_sheets), len(self.log_sheets)))
+        response = self.client.get(f'/api/exports/{job_id}/download/')
+        self.assertEqual(response.status_code, 200)
+        with zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content))) as archive:
+            self.assertEqual(sorted(archive.namelist()),
+                             sorted(log_sheet_archive_name(sheet) for sheet in self.log_sheets))
+        os.remove(job.file_path)
+
+    def test_write_log_sheets_zip_across_workers(self):
+        job = ExportJob(trip=self.trip)
+        progress = []
+        output = io.BytesIO()
+        written = write_log_sheets_zip(iter(export_job_log_sheets(job)), output, workers=2, progress=progress.append)
+        self.assertEqual(written, len(self.log_sheets))
+        self.assertEqual(progress[-1], written)
+        with zipfile.ZipFile(output) as archive:
+            for sheet in self.log_sheets:
+                self.assertTrue(archive.read(log_sheet_archive_name(sheet)).startswith(b'%PDF'))
@@ -0,0 +1,187 @@
+import os
+import tempfile
+import threading
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from ..benchmarks import FixedGeocoder
+from ..geocoding import (
+    GazetteerGeocoder, GazetteerIndex, GeocodeCache, build_gazetteer_index, normalize_location,
+)
+from ..models import GeocodeCacheEntry
+from ..services import RouteService
+
+
+class CountingGeocoder(FixedGeocoder):
+    def __init__(self):
+        self.queries = []
+
+    def geocode(self, query):
+        self.queries.append(query)
+        if query == 'Nowhere':
+            return None
+        return super().geocode(query)
+
+
+class GeocodeCacheTests(TestCase):
+
+    def test_normalize_location(self):
+        self.assertEqual(normalize_location('  Dallas ,TX  '), 'dallas, tx')
+        self.assertEqual(normalize_location('New   York,  NY,'), 'new york, ny')
+
+    def test_memory_tier_then_database_tier(self):
+        cache = GeocodeCache(max_size=10)
+        self.assertEqual(cache.get('Dallas, TX'), (False, None))
+        cache.set('Dallas, TX', (32.78, -96.8))
+        self.assertEqual(cache.get('dallas,tx'), (True, (32.78, -96.8)))
+        self.assertEqual(cache.stats()['memory_hits'], 1)
+
+        # Another process only has the database tier
+        other = GeocodeCache(max_size=10)
+        self.assertEqual(other.get('DALLAS, TX'), (True, (32.78, -96.8)))
+        self.assertEqual(other.stats()['db_hits'], 1)
+        self.assertEqual(other.get('Dallas, TX'), (True, (32.78, -96.8)))
+        self.assertEqual(other.stats()['memory_hits'], 1)
+
+    def test_lru_evicts_least_recently_used(self):
+        cache = GeocodeCache(max_size=2)
+        cache.set('a', (1.0, 1.0))
+        cache.set('b', (2.0, 2.0))
+        cache.get('a')
+        cache.set('c', (3.0, 3.0))
+        self.assertEqual(cache.stats()['size'], 2)
+        with mock.patch.object(GeocodeCacheEntry.objects, 'filter', wraps=GeocodeCacheEntry.objects.filter) as db:
+            cache.get('a')
+            cache.get('c')
+            self.assertFalse(db.called)
+            self.assertEqual(cache.get('b'), (True, (2.0, 2.0)))
+            self.assertTrue(db.called)
+
+    def test_negative_entries_expire_sooner(self):
+        cache = GeocodeCache(ttl=3600, negative_ttl=60)
+        cache.set('Nowhere', None)
+        cache.set('Somewhere', (1.0, 2.0))
+        self.assertEqual(cache.get('Nowhere'), (True, None))
+        entries = dict(GeocodeCacheEntry.objects.values_list('query', 'expires_at'))
+        self.assertLess(entries['nowhere'], timezone.now() + timedelta(seconds=61))
+        self.assertGreater(entries['somewhere'], timezone.now() + timedelta(seconds=3500))
+
+        # Expired in both tiers: a miss
+        GeocodeCacheEntry.objects.filter(query='nowhere').update(expires_at=timezone.now() - timedelta(seconds=1))
+        with mock.patch('eld_api.geocoding.time.time', return_value=timezone.now().timestamp() + 61):
+            self.assertEqual(cache.get('Nowhere'), (False, None))
+
+    def test_get_coordinates_geocodes_once(self):
+        geocoder = CountingGeocoder()
+        cache = GeocodeCache()
+        service = RouteService(cache=cache, geolocator=geocoder)
+        self.assertEqual(service.get_coordinates('Origin'), FixedGeocoder.origin)
+        self.assertEqual(service.get_coordinates(' origin '), FixedGeocoder.origin)
+        self.assertIsNone(service.get_coordinates('Nowhere'))
+        self.assertIsNone(service.get_coordinates('Nowhere'))
+        self.assertEqual(geocoder.queries, ['Origin', 'Nowhere'])
+
+    def test_geocoder_errors_are_not_cached(self):
+        geocoder = mock.Mock()
+        geocoder.geocode.side_effect = [OSError('timed out'), FixedGeocoder().geocode('Origin')]
+        service = RouteService(cache=GeocodeCache(), geolocator=geocoder)
+        with self.assertLogs('eld_api.services', 'WARNING'):
+            self.assertIsNone(service.get_coordinates('Origin'))
+        self.assertEqual(service.get_coordinates('Origin'), FixedGeocoder.origin)
+
+
+class SlowGeocoder(CountingGeocoder):
+    """Blocks lookups of 'Slow' until released"""
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    def geocode(self, query):
+        if query == 'Slow':
+            self.release.wait(5)
+        return super().geocode(query)
+
+
+class ConcurrentGeocodeTests(TestCase):
+
+    def setUp(self):
+        self.geocoder = SlowGeocoder()
+        self.addCleanup(self.geocoder.release.set)
+        self.cache = GeocodeCache()
+        self.service = RouteService(cache=self.cache, geolocator=self.geocoder)
+
+    def test_resolves_each_distinct_location_once(self):
+        results = self.service.get_coordinates_many(['Origin', 'Destination 69.05', 'Origin', ''])
+        self.assertEqual(results, {'Origin': FixedGeocoder.origin, 'Destination 69.05': (31.0, -97.0)})
+        self.assertEqual(sorted(self.geocoder.queries), ['Destination 69.05', 'Origin'])
+
+        self.service.get_coordinates_many(['Origin'])
+        self.assertEqual(len(self.geocoder.queries), 2)
+
+    def test_slow_lookups_time_out_within_the_budget(self):
+        with self.assertLogs('eld_api.services', 'WARNING') as logs:
+            results = self.service.get_coordinates_many(['Origin', 'Slow'], timeout=0.2)
+        self.assertEqual(results, {'Origin': FixedGeocoder.origin, 'Slow': None})
+        self.assertIn('exceeded the 0.2s budget', logs.output[0])
+        # The timed-out lookup is not cached as a miss
+        self.assertEqual(self.cache.get('Slow'), (False, None))
+
+
+GAZETTEER_CSV = """city,state,zip,latitude,longitude
+New York,NY,10001,40.75,-73.99
+New York Mills,MN,56567,46.5,-95.37
+Springfield,IL,62701,39.8,-89.65
+Springfield,MO,65801,37.2,-93.29
+Amarillo,TX,79101,35.22,-101.83
+Broken,TX,,not-a-number,-100.0
+"""
+
+
+class GazetteerTests(TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        source = os.path.join(tmp.name, 'places.csv')
+        with open(source, 'w', encoding='utf-8') as f:
+            f.write(GAZETTEER_CSV)
+        path = os.path.join(tmp.name, 'gazetteer.idx')
+        # 5 places with "city, st", "city, state" and zip keys; the bad row is skipped
+        self.assertEqual(build_gazetteer_index(source, path), 15)
+        self.index = GazetteerIndex(path)
+
+    def test_exact_matches(self):
+        self.assertEqual(self.index.lookup('Springfield, MO'), ('springfield, mo', (37.2, -93.29)))
+        self.assertEqual(self.index.lookup('springfield, missouri, USA')[1], (37.2, -93.29))
+        self.assertEqual(self.index.lookup('62701'), ('62701', (39.8, -89.65)))
+
+    def test_city_name_matches_only_when_unambiguous(self):
+        self.assertEqual(self.index.lookup('Amarillo')[1], (35.22, -101.83))
+        self.assertEqual(self.index.lookup('New York')[1], (40.75, -73.99))
+        self.assertIsNone(self.index.lookup('Springfield'))
+        self.assertIsNone(self.index.lookup('Amar'))
+        self.assertIsNone(self.index.lookup('627'))
+        self.assertIsNone(self.index.lookup(''))
+
+    def test_search_lists_prefix_matches_in_order(self):
+        self.assertEqual(
+            [key for key, _ in self.index.search('new york')],
+            ['new york mills, minnesota', 'new york mills, mn', 'new york, new york', 'new york, ny'],
+        )
+        self.assertEqual(len(self.index.search('spring', limit=3)), 3)
+        self.assertEqual(self.index.search('zzz'), [])
+
+    def test_geocoder_falls_back_on_misses(self):
+        fallback = CountingGeocoder()
+        geocoder = GazetteerGeocoder(self.index, fallback=fallback)
+        location = geocoder.geocode('Amarillo, TX')
+        self.assertEqual((location.latitude, location.longitude), (35.22, -101.83))
+        self.assertEqual(fallback.queries, [])
+
+        self.assertEqual(geocoder.geocode('Origin').latitude, 30.0)
+        self.assertEqual(fallback.queries, ['Origin'])
+        self.assertIsNone(GazetteerGeocoder(self.index).geocode('Springfield'))
@@ -0,0 +1,95 @@
+from datetime import date, timedelta
+
+from django.test import SimpleTestCase
+
+from ..hos import (
+    DRIVING, KIND_BREAK, KIND_FUEL, KIND_REST, KIND_RESTART, MINUTES_PER_DAY, OFF_DUTY, ON_DUTY,
+    HOSSimulator, daily_logs,
+)
+
+
+class HOSSimulatorTests(SimpleTestCase):
+    """The simulated timeline never breaks the property-carrying HOS limits"""
+
+    def setUp(self):
+        self.simulator = HOSSimulator()
+
+    def segments(self, timeline):
+        for i in range(len(timeline)):
+            yield timeline.starts[i], timeline.durations[i], timeline.statuses[i], timeline.kinds[i]
+
+    def test_eleven_hour_driving_limit(self):
+        timeline = self.simulator.simulate(3000)
+        driven = 0
+        for _, minutes, status, kind in self.segments(timeline):
+            if kind in (KIND_REST, KIND_RESTART):
+                driven = 0
+            elif status == DRIVING:
+                driven += minutes
+                self.assertLessEqual(driven, 11 * 60)
+
+    def test_fourteen_hour_window(self):
+        timeline = self.simulator.simulate(3000)
+        window_start = None
+        for start, minutes, status, kind in self.segments(timeline):
+            if kind in (KIND_REST, KIND_RESTART):
+                window_start = None
+            elif status in (DRIVING, ON_DUTY) and window_start is None:
+                window_start = start
+            if status == DRIVING:
+                self.assertLessEqual(start + minutes - window_start, 14 * 60)
+
+    def test_break_after_eight_hours_of_driving(self):
+        timeline = self.simulator.simulate(2000)
+        driven = 0
+        for _, minutes, status, kind in self.segments(timeline):
+            if kind in (KIND_BREAK, KIND_REST, KIND_RESTART) or (kind == KIND_FUEL and minutes >= 30):
+                driven = 0
+            elif status == DRIVING:
+                driven += minutes
+                self.assertLessEqual(driven, 8 * 60)
+
+    def test_rests_last_ten_hours(self):
+        timeline = self.simulator.simulate(3000)
+        rests = [minutes for _, minutes, _, kind in self.segments(timeline) if kind == KIND_REST]
+        self.assertTrue(rests)
+        self.assertTrue(all(minutes >= 10 * 60 for minutes in rests))
+
+    def test_seventy_hour_cycle(self):
+        prior_hours = 40
+        timeline = self.simulator.simulate(5000, prior_cycle_hours=prior_hours)
+        # Prior hours are spread over the 7 days before the trip, as the simulator assumes
+        on_duty_by_day = [prior_hours * 60 / 7] * 7 + [0] * timeline.days
+        restart_day = None
+        for start, minutes, status, kind in self.segments(timeline):
+            if kind == KIND_RESTART:
+                self.assertGreaterEqual(minutes, 34 * 60)
+                restart_day = 7 + (start + minutes) // MINUTES_PER_DAY
+            if status in (DRIVING, ON_DUTY):
+                for minute in range(start, start + minutes):
+                    on_duty_by_day[7 + minute // MINUTES_PER_DAY] += 1
+            if status == DRIVING:
+                day = 7 + (start + minutes - 1) // MINUTES_PER_DAY
+                first = max(day - 7, restart_day or 0)
+                self.assertLessEqual(sum(on_duty_by_day[first:day + 1]), 70 * 60 + 1)
+
+    def test_fuel_stop_every_thousand_miles(self):
+        for miles, stops in ((900, 0), (2500, 2), (3500, 3)):
+            timeline = self.simulator.simulate(miles)
+            self.assertEqual(list(timeline.kinds).count(KIND_FUEL), stops, miles)
+
+    def test_restart_before_driving_when_cycle_is_used_up(self):
+        timeline = self.simulator.simulate(500, prior_cycle_hours=70)
+        first_drive = list(timeline.statuses).index(DRIVING)
+        self.assertIn(KIND_RESTART, list(timeline.kinds[:first_drive]))
+
+    def test_daily_logs_cover_every_day(self):
+        timeline = self.simulator.simulate(2500, prior_cycle_hours=12)
+        logs = daily_logs(timeline, date(2026, 1, 5))
+        self.assertEqual(len(logs), timeline.days)
+        for day, log in enumerate(logs):
+            self.assertEqual(log['date'], date(2026, 1, 5) + timedelta(days=day))
+            self.assertEqual(sum(log['minutes']), MINUTES_PER_DAY)
+        self.assertAlmostEqual(sum(log['miles'] for log in logs), 2500, places=6)
+        self.assertEqual(logs[0]['entries'][0]['status'], 'off_duty')
+        self.assertEqual(timeline.statuses[0], OFF_DUTY)
@@ -0,0 +1,100 @@
+import json
+import os
+import re
+import tempfile
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from ..instrumentation import RequestTimer, _current_timer, server_timing_header, timed
+from .utils import TEST_CACHES, TripAPITestMixin
+
+
+def parse_server_timing(header):
+    """{metric: milliseconds} from a Server-Timing header"""
+    return {name: float(duration) for name, duration in re.findall(r'(\w+);dur=([\d.]+)', header)}
+
+
+class RequestTimerTests(SimpleTestCase):
+
+    def test_nested_phases_are_reported_net(self):
+        timer = RequestTimer()
+        timer.enter()        # route_plan
+        timer.enter()        # geocode inside it
+        timer.exit('geocode', 0.3)
+        timer.exit('route_plan', 1.0)
+        timer.enter()
+        timer.exit('geocode', 0.2)
+        self.assertAlmostEqual(timer.phases['route_plan'], 0.7)
+        self.assertAlmostEqual(timer.phases['geocode'], 0.5)
+
+        timer.queries, timer.db_seconds, timer.total_seconds = 3, 0.05, 2.0
+        self.assertEqual(parse_server_timing(server_timing_header(timer)),
+                         {'route_plan': 700.0, 'geocode': 500.0, 'db': 50.0, 'total': 2000.0})
+        self.assertIn('desc="3 queries"', server_timing_header(timer))
+
+    def test_timed_uses_the_current_request_only(self):
+        with timed('serialize'):
+            pass  # no request: nothing to record
+
+        timer = RequestTimer()
+        token = _current_timer.set(timer)
+        try:
+            @timed('hos')
+            def simulate():
+                with timed('serialize'):
+                    pass
+            simulate()
+            simulate()
+        finally:
+            _current_timer.reset(token)
+        self.assertEqual(set(timer.phases), {'hos', 'serialize'})
+
+
+@override_settings(CACHES=TEST_CACHES, PROFILE_TOKEN='secret', PROFILE_REQUESTS=False)
+class PerformanceMiddlewareTests(TripAPITestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.profile_dir = tmp.name
+        profile_dir = override_settings(PROFILE_DIR=tmp.name)
+        profile_dir.enable()
+        self.addCleanup(profile_dir.disable)
+
+    def test_server_timing_and_log_line(self):
+        with self.assertLogs('eld_api.performance', 'INFO') as logs:
+            response = self.client.post('/api/trips/create/', self.trip_payload(1500),
+                                        content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        timing = parse_server_timing(response['Server-Timing'])
+        for phase in ('geocode', 'route_plan', 'db', 'total'):
+            self.assertIn(phase, timing)
+        self.assertLessEqual(sum(v for k, v in timing.items() if k not in ('db', 'total')), timing['total'] + 1)
+
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual((record['method'], record['path'], record['status']), ('POST', '/api/trips/create/', 201))
+        self.assertGreater(record['queries'], 0)
+        self.assertIn(f'desc="{record["queries"]} queries"', response['Server-Timing'])
+        self.assertNotIn('profile', record)
+
+    @override_settings(SERVER_TIMING=False)
+    def test_server_timing_can_be_turned_off(self):
+        self.assertFalse(self.client.get('/api/trips/').has_header('Server-Timing'))
+
+    def test_profiling_on_request(self):
+        self.client.get('/api/trips/', HTTP_X_PROFILE='wrong')
+        self.assertEqual(os.listdir(self.profile_dir), [])
+
+        with self.assertLogs('eld_api.performance', 'INFO') as logs:
+            self.client.get('/api/trips/', HTTP_X_PROFILE='secret')
+        profiles = os.listdir(self.profile_dir)
+        self.assertEqual(len(profiles), 1)
+        self.assertTrue(profiles[0].endswith('-GET-api-trips.prof'))
+        self.assertEqual(json.loads(logs.records[-1].getMessage())['profile'],
+                         os.path.join(self.profile_dir, profiles[0]))
+
+    async def test_async_requests(self):
+        response = await self.async_client.get('/api/trips/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('total', parse_server_timing(response['Server-Timing']))
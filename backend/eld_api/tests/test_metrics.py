@@ -0,0 +1,56 @@
+from prometheus_client import REGISTRY
+from django.test import TestCase, override_settings
+
+from .utils import TEST_CACHES, TripAPITestMixin
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+@override_settings(CACHES=TEST_CACHES, METRICS_TOKEN='')
+class MetricsTests(TripAPITestMixin, TestCase):
+
+    def test_requests_are_counted_by_endpoint(self):
+        labels = {'method': 'GET', 'endpoint': 'trip_list', 'status': '200'}
+        requests = sample('eld_http_requests_total', **labels)
+        latencies = sample('eld_http_request_duration_seconds_count', method='GET', endpoint='trip_list')
+        self.client.get('/api/trips/')
+        self.client.get('/api/trips/')
+        self.assertEqual(sample('eld_http_requests_total', **labels), requests + 2)
+        self.assertEqual(sample('eld_http_request_duration_seconds_count', method='GET', endpoint='trip_list'),
+                         latencies + 2)
+
+        unmatched = {'method': 'GET', 'endpoint': 'unmatched', 'status': '404'}
+        requests = sample('eld_http_requests_total', **unmatched)
+        self.assertEqual(self.client.get('/no-such-page/').status_code, 404)
+        self.assertEqual(sample('eld_http_requests_total', **unmatched), requests + 1)
+
+    def test_phases_geocoder_and_cache_hits(self):
+        phases = sample('eld_request_phase_duration_seconds_count', phase='route_plan')
+        found = sample('eld_geocoder_requests_total', outcome='found')
+        hits = sample('eld_cache_lookups_total', cache='route_plan', result='hit')
+        misses = sample('eld_cache_lookups_total', cache='route_plan', result='miss')
+        params = {'pickup_location': 'Origin', 'dropoff_location': 'Destination 400'}
+        self.client.get('/api/calculate-route/', params)
+        self.client.get('/api/calculate-route/', params)
+
+        self.assertEqual(sample('eld_request_phase_duration_seconds_count', phase='route_plan'), phases + 1)
+        self.assertEqual(sample('eld_geocoder_requests_total', outcome='found'), found + 2)
+        self.assertEqual(sample('eld_cache_lookups_total', cache='route_plan', result='miss'), misses + 1)
+        self.assertEqual(sample('eld_cache_lookups_total', cache='route_plan', result='hit'), hits + 1)
+
+    def test_metrics_endpoint(self):
+        self.client.get('/api/trips/')
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        body = response.content.decode()
+        self.assertIn('eld_http_requests_total{endpoint="trip_list",method="GET",status="200"}', body)
+        self.assertIn('eld_http_request_duration_seconds_bucket', body)
+
+    @override_settings(METRICS_TOKEN='scraper')
+    def test_metrics_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 401)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scraper').status_code, 200)
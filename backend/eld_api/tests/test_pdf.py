@@ -0,0 +1,169 @@
+import os
+import re
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from ..models import LogEntry, LogSheet
+from ..pdf_cache import PDFCache
+from ..pdf_service import ELDPDFService
+from .utils import TEST_CACHES, TripAPITestMixin
+
+
+def count_pages(pdf):
+    return len(re.findall(rb'/Type /Page[^s]', pdf))
+
+
+class PDFCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = tmp.name
+        self.cache = PDFCache(directory=self.directory, max_bytes=1000)
+
+    def cached_files(self):
+        return sorted(os.listdir(self.directory))
+
+    def test_put_and_open(self):
+        self.assertIsNone(self.cache.open(1, 'abc'))
+        self.cache.put(1, 'abc', b'%PDF-1')
+        with self.cache.open(1, 'abc') as pdf_file:
+            self.assertEqual(pdf_file.read(), b'%PDF-1')
+        self.assertIsNone(self.cache.open(1, 'def'))
+
+    def test_evicts_least_recently_served_down_to_low_water(self):
+        self.cache.put(1, 'a', b'x' * 400)
+        self.cache.put(2, 'b', b'x' * 400)
+        os.utime(self.cache.path_for(1, 'a'), (100, 100))
+        os.utime(self.cache.path_for(2, 'b'), (200, 200))
+        # Serving sheet 1 makes sheet 2 the least recently used
+        self.cache.open(1, 'a').close()
+
+        self.cache.put(3, 'c', b'x' * 400)
+        self.assertEqual(self.cached_files(), ['sheet-1-a.pdf', 'sheet-3-c.pdf'])
+
+    def test_running_size_notices_other_writers_on_rescan(self):
+        self.cache.put(1, 'a', b'x' * 100)
+        other = PDFCache(directory=self.directory, max_bytes=1000)
+        other.put(2, 'b', b'x' * 850)
+        # This process's estimate (200 bytes) misses the other writer's file
+        self.cache.put(3, 'c', b'x' * 100)
+        self.assertEqual(len(self.cached_files()), 3)
+
+        self.cache.rescan_interval = 1
+        self.cache.put(4, 'd', b'x' * 100)
+        self.assertLessEqual(sum(os.path.getsize(os.path.join(self.directory, name))
+                                 for name in self.cached_files()), 900)
+
+    def test_invalidate_removes_every_rendering(self):
+        self.cache.put(1, 'a', b'x')
+        self.cache.put(1, 'b', b'x')
+        self.cache.put(2, 'a', b'x')
+        self.cache.invalidate(1)
+        self.assertEqual(self.cached_files(), ['sheet-2-a.pdf'])
+
+
+@override_settings(CACHES=TEST_CACHES)
+class LogSheetPDFTests(TripAPITestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        cache = PDFCache(directory=tmp.name)
+        for target in ('eld_api.views.pdf_cache', 'eld_api.signals.pdf_cache'):
+            patcher = mock.patch(target, cache)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        render = mock.patch.object(ELDPDFService, 'generate_log_sheet_pdf', autospec=True,
+                                   side_effect=ELDPDFService.generate_log_sheet_pdf)
+        self.render = render.start()
+        self.addCleanup(render.stop)
+        self.log_sheet = LogSheet.objects.filter(trip=self.create_trip(300)).first()
+        self.url = f'/api/log-sheets/{self.log_sheet.id}/pdf/'
+
+    def download(self, **headers):
+        response = self.client.get(self.url, **headers)
+        content = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, content
+
+    def test_rendered_once_then_served_from_disk(self):
+        first, pdf = self.download()
+        self.assertEqual(first.status_code, 200)
+        self.assertTrue(pdf.startswith(b'%PDF'))
+        second, cached_pdf = self.download()
+        self.assertEqual(cached_pdf, pdf)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertEqual(self.render.call_count, 1)
+
+        self.assertEqual(self.download(HTTP_IF_NONE_MATCH=first['ETag'])[0].status_code, 304)
+
+    def test_changed_entries_change_the_hash(self):
+        etag = self.download()[0]['ETag']
+        entry = LogEntry.objects.filter(log_sheet=self.log_sheet).first()
+        entry.remarks = 'Corrected'
+        entry.save()
+
+        response, _ = self.download(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(self.render.call_count, 2)
+
+
+@override_settings(CACHES=TEST_CACHES, PDF_EXPORT_CHUNK_SIZE=2, PDF_SPOOL_MAX_BYTES=4096)
+class MultiSheetPDFTests(TripAPITestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.trip = self.create_trip(2500)
+        self.log_sheets = LogSheet.objects.filter(trip=self.trip).order_by('date')
+        self.assertGreater(len(self.log_sheets), 3)
+        # Pages each sheet takes when rendered on its own
+        self.sheet_pages = [
+            count_pages(ELDPDFService().generate_log_sheet_pdf(sheet, self.trip).getvalue())
+            for sheet in self.log_sheets
+        ]
+
+    def assertPages(self, response, pages):
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        pdf = b''.join(response.streaming_content)
+        self.assertEqual(int(response['Content-Length']), len(pdf))
+        self.assertTrue(pdf.startswith(b'%PDF'))
+        self.assertEqual(count_pages(pdf), pages)
+
+    def test_date_range_pdf_holds_every_sheet(self):
+        response = self.client.get('/api/log-sheets/pdf/', {
+            'driver_name': self.log_sheets[0].driver_name,
+            'start_date': self.log_sheets[0].date,
+            'end_date': self.log_sheets[len(self.log_sheets) - 1].date,
+        })
+        self.assertPages(response, sum(self.sheet_pages))
+
+        response = self.client.get('/api/log-sheets/pdf/', {
+            'driver_name': self.log_sheets[0].driver_name,
+            'start_date': self.log_sheets[1].date,
+            'end_date': self.log_sheets[2].date,
+        })
+        self.assertPages(response, sum(self.sheet_pages[1:3]))
+
+    def test_trip_pdf_holds_every_sheet(self):
+        self.assertPages(self.client.get(f'/api/trips/{self.trip.id}/pdf/'), sum(self.sheet_pages))
+
+    def test_bad_ranges(self):
+        driver_name = self.log_sheets[0].driver_name
+        self.assertEqual(self.client.get('/api/log-sheets/pdf/', {'driver_name': driver_name}).status_code, 400)
+        response = self.client.get('/api/log-sheets/pdf/', {
+            'driver_name': driver_name, 'start_date': '2030-01-02', 'end_date': '2030-01-01',
+        })
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/api/log-sheets/pdf/', {
+            'driver_name': driver_name, 'start_date': '2030-02-30', 'end_date': '2030-03-01',
+        })
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/api/log-sheets/pdf/', {
+            'driver_name': 'Nobody', 'start_date': '2000-01-01', 'end_date': '2100-01-01',
+        })
+        self.assertEqual(response.status_code, 404)
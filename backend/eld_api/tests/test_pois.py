@@ -0,0 +1,101 @@
+import os
+import tempfile
+
+import numpy as np
+from django.test import SimpleTestCase, override_settings
+
+from ..benchmarks import FixedGeocoder
+from ..distance import haversine_matrix
+from ..geocoding import GeocodeCache
+from ..pois import POI_KINDS, POIIndex, build_poi_index
+from ..services import RouteService
+
+POI_CSV = """name,kind,city,state,latitude,longitude
+Big Rig Plaza,truck_stop,Amarillo,TX,35.19,-101.84
+Quick Fuel,fuel,,,35.30,-101.60
+Panhandle Rest Area,rest_area,Groom,TX,35.20,-101.10
+Not A Stop,car_wash,,,35.00,-101.00
+Broken,truck_stop,,,north,-101.00
+,fuel,Vega,TX,35.24,-102.43
+"""
+
+
+class POIIndexBuildTests(SimpleTestCase):
+
+    def test_build_and_load(self):
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, 'pois.csv')
+            with open(source, 'w', encoding='utf-8') as f:
+                f.write(POI_CSV)
+            path = os.path.join(directory, 'pois.npz')
+            # Unknown kinds and bad coordinates are skipped
+            self.assertEqual(build_poi_index(source, path), 4)
+            index = POIIndex.load(path)
+
+        self.assertEqual(len(index), 4)
+        nearest = index.nearest(35.2, -101.85)[0]
+        self.assertEqual(nearest['name'], 'Big Rig Plaza, Amarillo, TX')
+        self.assertEqual(nearest['kind'], 'truck_stop')
+        self.assertEqual(index.nearest(35.24, -102.43)[0]['name'], 'Fuel, Vega, TX')
+        self.assertEqual(index.nearest(35.2, -101.1, kinds=('rest_area',))[0]['name'], 'Panhandle Rest Area, Groom, TX')
+
+
+class POIIndexQueryTests(SimpleTestCase):
+    """Grid queries against a brute-force scan over random points"""
+
+    def setUp(self):
+        rng = np.random.default_rng(11)
+        self.coords = np.column_stack([rng.uniform(30, 36, 2000), rng.uniform(-104, -96, 2000)])
+        self.kinds = rng.integers(0, len(POI_KINDS), 2000)
+        names = [f'POI {i}'.encode('utf-8') for i in range(2000)]
+        offsets = np.concatenate(([0], np.cumsum([len(name) for name in names])))
+        self.index = POIIndex(self.coords, self.kinds, offsets, np.frombuffer(b''.join(names), dtype=np.uint8))
+        self.queries = np.column_stack([rng.uniform(29, 37, 30), rng.uniform(-105, -95, 30)])
+
+    def brute_force(self, latitude, longitude, kinds=None):
+        distances = haversine_matrix([(latitude, longitude)], self.coords)[0]
+        if kinds is not None:
+            distances = np.where(np.isin(self.kinds, [POI_KINDS.index(kind) for kind in kinds]), distances, np.inf)
+        order = np.argsort(distances, kind='stable')
+        return [(f'POI {i}', distances[i]) for i in order if distances[i] < np.inf]
+
+    def test_nearest_matches_brute_force(self):
+        for latitude, longitude in self.queries:
+            expected = self.brute_force(latitude, longitude)[:5]
+            results = self.index.nearest(latitude, longitude, k=5)
+            self.assertEqual([r['name'] for r in results], [name for name, _ in expected])
+            np.testing.assert_allclose([r['distance_miles'] for r in results], [d for _, d in expected])
+
+    def test_nearest_with_kinds(self):
+        for latitude, longitude in self.queries:
+            expected = self.brute_force(latitude, longitude, kinds=('rest_area',))[0]
+            result = self.index.nearest(latitude, longitude, kinds=('rest_area',))[0]
+            self.assertEqual(result['name'], expected[0])
+            self.assertEqual(result['kind'], 'rest_area')
+
+    def test_within_matches_brute_force(self):
+        for latitude, longitude in self.queries[:10]:
+            expected = [(name, d) for name, d in self.brute_force(latitude, longitude) if d <= 20]
+            results = self.index.within(latitude, longitude, 20)
+            self.assertEqual([r['name'] for r in results], [name for name, _ in expected])
+
+    def test_search_radius_is_capped(self):
+        self.assertEqual(self.index.nearest(45.0, -100.0, max_radius_miles=100), [])
+        self.assertEqual(len(self.index.nearest(45.0, -100.0, max_radius_miles=1000)), 1)
+
+    def test_empty_index(self):
+        index = POIIndex(np.empty((0, 2)), [], [0], [])
+        self.assertEqual(index.nearest(35.0, -100.0), [])
+        self.assertEqual(index.within(35.0, -100.0, 50), [])
+
+    @override_settings(ROAD_GRAPH_PATH='', POI_SNAP_RADIUS_MILES=25)
+    def test_stops_snap_to_nearby_facilities(self):
+        service = RouteService(cache=GeocodeCache(), geolocator=FixedGeocoder(), poi_index=self.index)
+        coordinates = {'Origin': (30.2, -103.8), 'Destination': (35.8, -96.2)}
+        plan = service.plan_route(coordinates, 'Origin', 'Destination', 10)
+        stops = [point for point in plan['route_points'] if point['location_type'] in ('rest', 'fuel')]
+        self.assertTrue(stops)
+        for stop in stops:
+            self.assertTrue(stop['location'].startswith('POI '), stop)
+            position = self.coords[int(stop['location'].split()[1])]
+            self.assertEqual((stop['latitude'], stop['longitude']), tuple(position))
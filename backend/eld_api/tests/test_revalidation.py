@@ -0,0 +1,103 @@
+import gzip
+from datetime import timedelta
+from unittest import skipIf
+
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils.http import http_date
+
+from ..compression import brotli
+from ..models import LogSheet, Trip, TripSnapshot
+from .utils import TEST_CACHES, TripAPITestMixin
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ConditionalReadTests(TripAPITestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.trips = [self.create_trip(miles) for miles in (150, 900, 2500)]
+        self.trip = self.trips[0]
+        self.log_sheet = LogSheet.objects.filter(trip=self.trip).first()
+
+    def test_etag_and_not_modified(self):
+        for url in (f'/api/trips/{self.trip.id}/', f'/api/log-sheets/{self.log_sheet.id}/', '/api/trips/?limit=2'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Cache-Control'], 'private, no-cache')
+            etag = response['ETag']
+            not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(not_modified.status_code, 304, url)
+            self.assertEqual(not_modified.content, b'')
+            self.assertEqual(not_modified['ETag'], etag)
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='"other"').status_code, 200)
+
+    def test_if_modified_since(self):
+        url = f'/api/trips/{self.trip.id}/'
+        last_modified = self.client.get(url)['Last-Modified']
+        updated_at = TripSnapshot.objects.get(trip=self.trip).updated_at
+        self.assertEqual(last_modified, http_date(updated_at.timestamp()))
+
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+        earlier = http_date((updated_at - timedelta(seconds=5)).timestamp())
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=earlier).status_code, 200)
+
+    def test_list_pages_have_no_last_modified(self):
+        response = self.client.get('/api/trips/?limit=2')
+        self.assertIn('ETag', response)
+        self.assertNotIn('Last-Modified', response)
+        # If-Modified-Since alone can never turn a list page into a 304
+        later = http_date(TripSnapshot.objects.latest('updated_at').updated_at.timestamp() + 60)
+        self.assertEqual(self.client.get('/api/trips/?limit=2', HTTP_IF_MODIFIED_SINCE=later).status_code, 200)
+
+    def test_list_pages_have_distinct_etags(self):
+        first = self.client.get('/api/trips/?limit=2')
+        second = self.client.get(first.json()['next'])
+        self.assertNotEqual(first['ETag'], second['ETag'])
+
+    def test_missing_trip(self):
+        self.assertEqual(self.client.get('/api/trips/999999/').status_code, 404)
+        self.assertEqual(self.client.get('/api/log-sheets/999999/').status_code, 404)
+
+    @skipIf(brotli is None, 'brotli is not installed')
+    def test_brotli_response(self):
+        url = f'/api/trips/{self.trip.id}/'
+        plain = self.client.get(url)
+
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(response.content), plain.content)
+        self.assertEqual(response['ETag'], 'W/' + plain['ETag'])
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_gzip_response(self):
+        url = f'/api/trips/{self.trip.id}/'
+        plain = self.client.get(url)
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ListRevalidationTests(TripAPITestMixin, TransactionTestCase):
+    """List ETags follow committed changes that leave the page's newest timestamp alone"""
+
+    def setUp(self):
+        super().setUp()
+        self.trips = [self.create_trip(miles) for miles in (150, 900, 2500)]
+
+    def test_deleting_an_older_trip_changes_the_etag(self):
+        etag = self.client.get('/api/trips/')['ETag']
+        self.trips[0].delete()
+        response = self.client.get('/api/trips/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(self.trips[0].id, [trip['id'] for trip in response.json()['results']])
+
+    def test_page_shift_changes_the_etag(self):
+        first = self.client.get('/api/trips/?limit=2')
+        second_url = first.json()['next']
+        etag = self.client.get(second_url)['ETag']
+        Trip.objects.get(id=self.trips[1].id).delete()
+        self.assertEqual(self.client.get('/api/trips/?limit=2', HTTP_IF_NONE_MATCH=first['ETag']).status_code, 200)
+        # Keyset pages after the deleted trip still hold the same trips
+        self.assertEqual(self.client.get(second_url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
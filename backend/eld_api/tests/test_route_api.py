@@ -0,0 +1,51 @@
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from ..services import RouteService
+from .utils import TEST_CACHES, TripAPITestMixin
+
+
+@override_settings(CACHES=TEST_CACHES)
+class RoutePlanCacheTests(TripAPITestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(RouteService, 'calculate_route', autospec=True,
+                                    side_effect=RouteService.calculate_route)
+        self.calculate_route = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get_plan(self, pickup='Origin', dropoff='Destination 700', cycle_hours='10', **headers):
+        return self.client.get('/api/calculate-route/', {
+            'pickup_location': pickup, 'dropoff_location': dropoff, 'current_cycle_hours': cycle_hours,
+        }, **headers)
+
+    def test_plans_are_cached_by_normalized_endpoints_and_cycle_bucket(self):
+        first = self.get_plan()
+        self.assertEqual(first.status_code, 200)
+        self.assertTrue(first.json()['route_points'])
+
+        again = self.get_plan(pickup='  origin', dropoff='DESTINATION 700', cycle_hours='10.6')
+        self.assertEqual(again.content, first.content)
+        self.assertEqual(again['ETag'], first['ETag'])
+        self.assertEqual(self.calculate_route.call_count, 1)
+
+        self.get_plan(cycle_hours='11')
+        self.assertEqual(self.calculate_route.call_count, 2)
+
+    def test_if_none_match_gets_not_modified(self):
+        etag = self.get_plan()['ETag']
+        not_modified = self.get_plan(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.content, b'')
+        self.assertEqual(not_modified['ETag'], etag)
+        # The compressed variant's weak ETag matches too
+        self.assertEqual(self.get_plan(HTTP_IF_NONE_MATCH=f'W/{etag}').status_code, 304)
+        self.assertEqual(self.get_plan(HTTP_IF_NONE_MATCH='"other"').status_code, 200)
+        self.assertEqual(self.calculate_route.call_count, 1)
+
+    def test_missing_endpoints(self):
+        response = self.client.get('/api/calculate-route/', {'pickup_location': 'Origin'})
+        self.assertEqual(response.status_code, 400)
+        self.calculate_route.assert_not_called()
@@ -0,0 +1,192 @@
+import math
+import os
+import tempfile
+from unittest import mock
+
+import numpy as np
+from django.test import SimpleTestCase, override_settings
+
+from .. import routing
+from ..benchmarks import FixedGeocoder, write_grid_extract
+from ..geocoding import GeocodeCache
+from ..routing import RoadGraph, RoutePolyline, _dijkstra, build_road_graph
+from ..services import RouteService
+
+GRID_CORNER = (35.0, -101.0)
+
+
+class RoadGraphTests(SimpleTestCase):
+    """ALT A* and grid snapping on a 40 x 40 synthetic grid with one-way edges"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.nodes_path, cls.edges_path = write_grid_extract(cls.tmp.name, GRID_CORNER, 40, 40)
+        cls.path = os.path.join(cls.tmp.name, 'graph')
+        cls.counts = build_road_graph(cls.nodes_path, cls.edges_path, cls.path, landmarks=8)
+        cls.graph = RoadGraph(cls.path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.rng = np.random.default_rng(3)
+
+    def random_point(self, margin=0.0):
+        return (self.rng.uniform(GRID_CORNER[0] - margin, GRID_CORNER[0] + 3.9 + margin),
+                self.rng.uniform(GRID_CORNER[1] - margin, GRID_CORNER[1] + 3.9 + margin))
+
+    def brute_force_nearest(self, graph, latitude, longitude):
+        dlat = np.asarray(graph.lat) - latitude
+        dlon = (np.asarray(graph.lon) - longitude) * math.cos(math.radians(latitude))
+        return float(np.min(np.hypot(dlat, dlon)))
+
+    def test_build_counts(self):
+        nodes, edges = self.counts
+        self.assertEqual(nodes, 1600)
+        # 3120 neighbour pairs, one in ten of them one-way
+        self.assertGreater(edges, 3120)
+        self.assertLess(edges, 2 * 3120)
+
+    def test_a_star_matches_dijkstra(self):
+        graph = self.graph
+        lists = (np.asarray(graph.indptr).tolist(), np.asarray(graph.indices).tolist(),
+                 np.asarray(graph.minutes).tolist())
+        for _ in range(25):
+            source, target = (int(n) for n in self.rng.integers(0, graph.node_count, 2))
+            expected = _dijkstra(*lists, source)[target]
+            path = graph.shortest_path(source, target)
+            if expected == math.inf:
+                self.assertIsNone(path)
+                continue
+            nodes, edges = path
+            self.assertEqual((nodes[0], nodes[-1]), (source, target))
+            for u, v, edge in zip(nodes, nodes[1:], edges):
+                self.assertEqual(int(graph.indices[edge]), v)
+                self.assertTrue(graph.indptr[u] <= edge < graph.indptr[u + 1])
+            self.assertAlmostEqual(float(sum(graph.minutes[e] for e in edges)), expected, places=3)
+
+    def test_landmark_bounds_are_admissible(self):
+        target = 1234
+        lists = (np.asarray(self.graph.indptr).tolist(), np.asarray(self.graph.indices).tolist(),
+                 np.asarray(self.graph.minutes).tolist())
+        for source in self.rng.integers(0, self.graph.node_count, 25).tolist():
+            exact = _dijkstra(*lists, source)[target]
+            bound = np.max(np.concatenate((
+                self.graph.landmark_from[target] - self.graph.landmark_from[source],
+                self.graph.landmark_to[source] - self.graph.landmark_to[target],
+            )))
+            self.assertLessEqual(bound, exact + 1e-3)
+
+    def test_python_and_scipy_preprocessing_agree(self):
+        if routing.csgraph_dijkstra is None:
+            self.skipTest('SciPy is not installed')
+        path = os.path.join(self.tmp.name, 'python-graph')
+        with mock.patch.object(routing, 'csgraph_dijkstra', None):
+            build_road_graph(self.nodes_path, self.edges_path, path, landmarks=8)
+        for name in ('landmark_from', 'landmark_to'):
+            np.testing.assert_allclose(np.load(os.path.join(path, f'{name}.npy')),
+                                       np.load(os.path.join(self.path, f'{name}.npy')), rtol=1e-5)
+
+    def test_grid_snap_matches_brute_force(self):
+        for _ in range(200):
+            latitude, longitude = self.random_point(margin=0.5)
+            node = self.graph.nearest_node(latitude, longitude)
+            dlat = self.graph.lat[node] - latitude
+            dlon = (self.graph.lon[node] - longitude) * math.cos(math.radians(latitude))
+            self.assertAlmostEqual(math.hypot(dlat, dlon), self.brute_force_nearest(self.graph, latitude, longitude))
+
+    def test_snap_limit(self):
+        self.assertIsNotNone(self.graph.snap(GRID_CORNER[0] + 1.03, GRID_CORNER[1] + 1.04, max_miles=10))
+        # 1 degree of latitude south of the grid is ~69 miles from it
+        self.assertIsNone(self.graph.snap(GRID_CORNER[0] - 1, GRID_CORNER[1] + 1, max_miles=10))
+        self.assertIsNotNone(self.graph.snap(GRID_CORNER[0] - 1, GRID_CORNER[1] + 1, max_miles=100))
+        # Far away points fall back to a full scan
+        self.assertEqual(self.graph.nearest_node(60.0, -101.0), self.graph.nearest_node(GRID_CORNER[0] + 3.9, -101.0))
+
+    def test_graphs_without_a_stored_grid(self):
+        path = os.path.join(self.tmp.name, 'old-graph')
+        os.makedirs(path)
+        for name in routing.GRAPH_ARRAYS:
+            os.link(os.path.join(self.path, f'{name}.npy'), os.path.join(path, f'{name}.npy'))
+        graph = RoadGraph(path)
+        for _ in range(20):
+            point = self.random_point()
+            self.assertEqual(graph.nearest_node(*point), self.graph.nearest_node(*point))
+
+    @override_settings(ROAD_SNAP_MAX_MILES=10)
+    def test_route(self):
+        origin = (GRID_CORNER[0] + 0.21, GRID_CORNER[1] + 0.31)
+        destination = (GRID_CORNER[0] + 3.52, GRID_CORNER[1] + 2.87)
+        road = self.graph.route(origin, destination)
+        self.assertEqual(road.coordinates[0], (GRID_CORNER[0] + 0.2, GRID_CORNER[1] + 0.3))
+        self.assertAlmostEqual(road.coordinates[-1][0], GRID_CORNER[0] + 3.5)
+        self.assertAlmostEqual(road.distance_miles, sum(road.segment_miles), places=3)
+        # Longer than the straight line, but not by more than the detours the grid allows
+        straight = routing.distance_miles(origin, destination)
+        self.assertGreater(road.distance_miles, straight)
+        self.assertLess(road.distance_miles, straight * 2)
+        self.assertIsNone(self.graph.route(origin, (GRID_CORNER[0] - 2, GRID_CORNER[1])))
+
+    @override_settings(ROAD_SNAP_MAX_MILES=10, POI_INDEX_PATH='')
+    def test_stops_lie_on_the_road(self):
+        service = RouteService(cache=GeocodeCache(), geolocator=FixedGeocoder(), road_graph=self.graph)
+        coordinates = {'Pickup': GRID_CORNER, 'Dropoff': (GRID_CORNER[0] + 3.9, GRID_CORNER[1] + 3.9)}
+        plan = service.plan_route(coordinates, 'Pickup', 'Dropoff', 65)
+        stops = [point for point in plan['route_points'] if point['location_type'] in ('rest', 'fuel')]
+        self.assertTrue(stops)
+        for stop in stops:
+            # Grid roads run along whole multiples of 0.1 degrees
+            rows = (stop['latitude'] - GRID_CORNER[0]) / 0.1
+            cols = (stop['longitude'] - GRID_CORNER[1]) / 0.1
+            self.assertTrue(abs(rows - round(rows)) < 1e-6 or abs(cols - round(cols)) < 1e-6, stop)
+
+
+class RoutePolylineTests(SimpleTestCase):
+
+    def test_point_at_interpolates_by_segment_miles(self):
+        polyline = RoutePolyline([(0.0, 0.0), (1.0, 0.0), (1.0, 2.0)], segment_miles=[10.0, 30.0])
+        self.assertEqual(polyline.total_miles, 40.0)
+        self.assertEqual(polyline.point_at([0, 5, 10, 25, 40]),
+                         [(0.0, 0.0), (0.5, 0.0), (1.0, 0.0), (1.0, 1.0), (1.0, 2.0)])
+        # Mileages past either end are clamped
+        self.assertEqual(polyline.point_at([-5, 50]), [(0.0, 0.0), (1.0, 2.0)])
+        self.assertEqual(polyline.point_at([]), [])
+
+    def test_zero_length_segments_and_single_points(self):
+        polyline = RoutePolyline([(0.0, 0.0), (0.0, 0.0), (2.0, 0.0)], segment_miles=[0.0, 10.0])
+        self.assertEqual(polyline.point_at([0, 5]), [(0.0, 0.0), (1.0, 0.0)])
+        self.assertEqual(RoutePolyline([(3.0, 4.0)]).point_at([0, 7]), [(3.0, 4.0), (3.0, 4.0)])
+
+    def test_segment_miles_default_to_great_circle(self):
+        polyline = RoutePolyline([(30.0, -97.0), (31.0, -97.0), (31.0, -96.0)])
+        expected = routing.distance_miles((30.0, -97.0), (31.0, -97.0), 'haversine') \
+            + routing.distance_miles((31.0, -97.0), (31.0, -96.0), 'haversine')
+        self.assertAlmostEqual(polyline.total_miles, expected, places=6)
+
+    def test_great_circle(self):
+        polyline = RoutePolyline.great_circle((0.0, 0.0), (0.0, 90.0), total_miles=1000, step_miles=100)
+        self.assertEqual(len(polyline.coordinates), 11)
+        self.assertEqual(polyline.total_miles, 1000)
+        start, middle, end = polyline.point_at([0, 500, 1000])
+        self.assertAlmostEqual(start[1], 0.0)
+        self.assertAlmostEqual(middle[0], 0.0)
+        self.assertAlmostEqual(middle[1], 45.0)
+        self.assertAlmostEqual(end[1], 90.0)
+        same = RoutePolyline.great_circle((30.0, -97.0), (30.0, -97.0), total_miles=0)
+        np.testing.assert_allclose(same.point_at([0, 10]), [(30.0, -97.0)] * 2)
+
+    @override_settings(ROAD_GRAPH_PATH='', POI_INDEX_PATH='')
+    def test_stops_are_placed_along_the_great_circle(self):
+        service = RouteService(cache=GeocodeCache(), geolocator=FixedGeocoder())
+        coordinates = {'Origin': FixedGeocoder.origin, 'Destination 2000': (FixedGeocoder.origin[0] + 20, -97.0)}
+        plan = service.plan_route(coordinates, 'Origin', 'Destination 2000', 10)
+        points = plan['route_points']
+        miles = np.cumsum([point['distance_from_previous'] for point in points])
+        for point, mile in zip(points, miles):
+            # Due north: longitude is fixed and latitude grows with the mileage
+            self.assertAlmostEqual(point['longitude'], -97.0)
+            self.assertAlmostEqual(point['latitude'], FixedGeocoder.origin[0] + 20 * mile / miles[-1], places=2)
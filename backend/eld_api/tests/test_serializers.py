@@ -0,0 +1,88 @@
+import uuid
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
+
+from django.db.models import Count
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.renderers import JSONRenderer
+
+from .. import renderers
+from ..fast_serializers import LogSheetRowSerializer, TripRowSerializer
+from ..models import LogSheet, Trip
+from ..renderers import FastJSONRenderer
+from ..serializers import LogSheetSerializer, TripSerializer
+from .utils import TEST_CACHES, TripAPITestMixin
+
+RENDER_CASES = [
+    {'id': 1, 'name': 'Amarillo, TX', 'active': True, 'note': None},
+    [Decimal('12.50'), Decimal('0.00'), 1.5, 0.1, -2.25, 10 ** 20],
+    [1e-05, 0.00001234, 1e16, 1.5e300, 123456.789],
+    {'when': datetime(2026, 1, 5, 6, 30, tzinfo=dt_timezone.utc), 'date': date(2026, 1, 5),
+     'time': time(6, 30), 'duration': timedelta(hours=1), 'uuid': uuid.UUID(int=1)},
+    {'unicode': 'Köln – São Paulo ✓', 'separators': 'a b c', 'quote': '"\\/'},
+    {1: 'int key', 'nested': {'list': [[], {}, ''], 'empty': ''}},
+    [2 ** 70],
+]
+
+
+class FastJSONRendererTests(SimpleTestCase):
+
+    def test_same_bytes_as_json_renderer(self):
+        for data in RENDER_CASES:
+            self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data), data)
+
+    def test_same_bytes_without_orjson(self):
+        with mock.patch.object(renderers, 'orjson', None):
+            for data in RENDER_CASES:
+                self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data), data)
+
+    def test_float_mismatch_detection(self):
+        self.assertTrue(renderers.float_mismatch(b'[1e16]'))
+        self.assertTrue(renderers.float_mismatch(b'[0.00001]'))
+        self.assertFalse(renderers.float_mismatch(b'[0.5,12.25,"x"]'))
+
+    def test_indented_and_empty_output(self):
+        context = {'indent': 2}
+        self.assertEqual(FastJSONRenderer().render({'a': [1]}, renderer_context=context),
+                         JSONRenderer().render({'a': [1]}, renderer_context=context))
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+
+@override_settings(CACHES=TEST_CACHES)
+class RowSerializerTests(TripAPITestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.trips = [self.create_trip(miles) for miles in (150, 900, 2500)]
+
+    def test_trip_detail_matches_drf(self):
+        for trip in self.trips:
+            expected = JSONRenderer().render(TripSerializer(Trip.objects.get(id=trip.id)).data)
+            self.assertEqual(self.client.get(f'/api/trips/{trip.id}/').content, expected)
+
+    def test_log_sheet_detail_matches_drf(self):
+        for log_sheet in LogSheet.objects.filter(trip__in=self.trips):
+            expected = JSONRenderer().render(LogSheetSerializer(log_sheet).data)
+            self.assertEqual(self.client.get(f'/api/log-sheets/{log_sheet.id}/').content, expected)
+
+    def test_row_serializers_match_drf(self):
+        all_fields = set(TripSerializer().fields)
+        for fields in (all_fields, all_fields - {'routes'}, {'id', 'log_sheet_count', 'created_at'}):
+            trips = Trip.objects.annotate(log_sheet_count=Count('log_sheets')).order_by('-created_at', '-id')
+            expected = JSONRenderer().render(TripSerializer(trips, many=True, fields=fields).data)
+            serializer = TripRowSerializer(fields=fields)
+            actual = JSONRenderer().render(serializer.serialize(serializer.values_list(trips)))
+            self.assertEqual(actual, expected, fields)
+
+        log_sheets = LogSheet.objects.order_by('date', 'id')
+        self.assertEqual(
+            JSONRenderer().render(LogSheetRowSerializer().serialize(log_sheets)),
+            JSONRenderer().render(LogSheetSerializer(log_sheets, many=True).data),
+        )
+
+    def test_trip_list_matches_drf(self):
+        trips = Trip.objects.order_by('-created_at', '-id')
+        expected = JSONRenderer().render(TripSerializer(trips, many=True).data)
+        results = self.client.get('/api/trips/').json()['results']
+        self.assertEqual(JSONRenderer().render(results), expected)
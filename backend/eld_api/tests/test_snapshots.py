@@ -0,0 +1,112 @@
+from unittest import mock
+
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+
+from .. import snapshots
+from ..models import LogEntry, LogSheet, Trip, TripSnapshot
+from ..serializers import TripSerializer
+from ..snapshots import get_trip_document, get_trip_version, rebuild_trip_snapshot
+from .utils import TEST_CACHES, TripAPITestMixin
+
+
+def drf_document(trip_id):
+    return JSONRenderer().render(TripSerializer(Trip.objects.get(id=trip_id)).data)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class TripSnapshotTests(TripAPITestMixin, TestCase):
+
+    def test_created_with_the_trip(self):
+        trip = self.create_trip(1500)
+        snapshot = TripSnapshot.objects.get(trip=trip)
+        self.assertEqual(snapshot.version, 1)
+        self.assertEqual(bytes(snapshot.document), drf_document(trip.id))
+
+    def test_trip_detail_reads_the_snapshot_in_constant_queries(self):
+        counts = []
+        for miles in (200, 3000):
+            trip = self.create_trip(miles)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(f'/api/trips/{trip.id}/')
+            self.assertEqual(response.content, drf_document(trip.id))
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+        self.assertLessEqual(counts[0], 2)
+
+    def test_missing_snapshots_are_rebuilt_on_read(self):
+        trip = self.create_trip(500)
+        TripSnapshot.objects.filter(trip=trip).delete()
+        self.assertEqual(get_trip_version(trip.id)[0], 1)
+        self.assertEqual(bytes(get_trip_document(trip.id)), drf_document(trip.id))
+
+        TripSnapshot.objects.filter(trip=trip).update(document=None)
+        self.assertEqual(bytes(get_trip_document(trip.id)), drf_document(trip.id))
+        self.assertIsNotNone(TripSnapshot.objects.get(trip=trip).document)
+        self.assertIsNone(get_trip_version(999999))
+        self.assertIsNone(get_trip_document(999999))
+
+    def test_rebuild_never_masks_a_newer_version(self):
+        trip = self.create_trip(500)
+        TripSnapshot.objects.filter(trip=trip).update(document=None)
+        render = snapshots.render_trip_document
+
+        def render_during_a_change(trip_id):
+            rendered = render(trip_id)
+            TripSnapshot.objects.filter(trip_id=trip_id).update(version=2)
+            return rendered
+
+        with mock.patch.object(snapshots, 'render_trip_document', render_during_a_change):
+            self.assertIsNotNone(rebuild_trip_snapshot(trip.id))
+        self.assertIsNone(TripSnapshot.objects.get(trip=trip).document)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class TripVersionTests(TripAPITestMixin, TransactionTestCase):
+    """Version bumps and rebuilds that only happen once a transaction commits"""
+
+    def setUp(self):
+        super().setUp()
+        self.trip = self.create_trip(1200)
+        self.log_sheet = LogSheet.objects.filter(trip=self.trip).first()
+
+    def snapshot(self):
+        return TripSnapshot.objects.get(trip=self.trip)
+
+    def test_one_bump_per_transaction_and_rebuild_on_commit(self):
+        with transaction.atomic():
+            for entry in LogEntry.objects.filter(log_sheet__trip=self.trip):
+                entry.remarks = 'Checked'
+                entry.save()
+            self.assertIsNone(self.snapshot().document)
+        snapshot = self.snapshot()
+        self.assertEqual(snapshot.version, 2)
+        self.assertEqual(bytes(snapshot.document), drf_document(self.trip.id))
+        self.assertIn(b'"Checked"', bytes(snapshot.document))
+
+        # Each later transaction bumps it again
+        self.log_sheet.save()
+        self.assertEqual(self.snapshot().version, 3)
+
+    def test_rolled_back_changes_keep_the_version(self):
+        document = self.snapshot().document
+        with self.assertRaises(ValueError), transaction.atomic():
+            entry = LogEntry.objects.filter(log_sheet=self.log_sheet).first()
+            entry.remarks = 'Rolled back'
+            entry.save()
+            raise ValueError
+        self.assertEqual(self.snapshot().version, 1)
+        self.assertEqual(self.snapshot().document, document)
+
+    def test_trip_changes_and_deletes(self):
+        trip = Trip.objects.get(id=self.trip.id)
+        trip.pickup_location = 'Depot'
+        trip.save()
+        self.assertEqual(self.snapshot().version, 2)
+        self.assertIn(b'"Depot"', bytes(self.snapshot().document))
+
+        trip.delete()
+        self.assertFalse(TripSnapshot.objects.filter(trip_id=self.trip.id).exists())
+        self.assertIsNone(get_trip_document(self.trip.id))
@@ -0,0 +1,78 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from ..models import LogEntry, LogSheet, Route, Trip, TripSnapshot
+from .utils import TEST_CACHES, TripAPITestMixin
+
+
+@override_settings(CACHES=TEST_CACHES)
+class CreateTripTests(TripAPITestMixin, TestCase):
+
+    def test_persists_the_plan(self):
+        trip = self.create_trip(1500)
+        self.assertTrue(Route.objects.filter(trip=trip).exists())
+        self.assertGreater(LogSheet.objects.filter(trip=trip).count(), 1)
+        self.assertTrue(LogEntry.objects.filter(log_sheet__trip=trip).exists())
+        self.assertTrue(TripSnapshot.objects.filter(trip=trip).exists())
+
+    def test_query_count_does_not_grow_with_trip_length(self):
+        counts = []
+        for miles in (100, 2500):
+            # Warm the geocode cache so both trips resolve their endpoints alike
+            self.create_trip(miles)
+            with CaptureQueriesContext(connection) as queries:
+                self.create_trip(miles)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_invalid_payload(self):
+        with self.assertLogs('eld_api.views', 'DEBUG') as logs:
+            response = self.client.post('/api/trips/create/', {'pickup_location': 'Origin'},
+                                        content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('dropoff_location', response.json())
+        self.assertTrue(any('Serializer errors' in line for line in logs.output))
+        self.assertFalse(Trip.objects.exists())
+
+
+@override_settings(CACHES=TEST_CACHES)
+class TripListTests(TripAPITestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.trips = [self.create_trip(miles) for miles in (150, 900, 2500)]
+
+    def test_cursor_pagination_walks_every_trip_once(self):
+        # Trips created in the same instant are ordered by id
+        Trip.objects.filter(id=self.trips[0].id).update(created_at=self.trips[1].created_at)
+        expected = list(Trip.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        seen = []
+        url = '/api/trips/?limit=2&include='
+        while url:
+            page = self.client.get(url).json()
+            self.assertLessEqual(len(page['results']), 2)
+            seen.extend(trip['id'] for trip in page['results'])
+            url = page['next']
+        self.assertEqual(seen, expected)
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get('/api/trips/?cursor=not-a-cursor').status_code, 404)
+
+    def test_fields_and_include(self):
+        trip = self.client.get('/api/trips/?limit=1&fields=id,total_distance,routes,log_sheets&include=routes').json()['results'][0]
+        self.assertEqual(set(trip), {'id', 'total_distance', 'routes'})
+        self.assertTrue(trip['routes'])
+
+        trip = self.client.get('/api/trips/?limit=1&include=').json()['results'][0]
+        self.assertNotIn('routes', trip)
+        self.assertNotIn('log_sheets', trip)
+        self.assertEqual(trip['log_sheet_count'], LogSheet.objects.filter(trip_id=trip['id']).count())
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        counts = []
+        for limit in (1, 3):
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.client.get(f'/api/trips/?limit={limit}').status_code, 200)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
@@ -0,0 +1,168 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.core.cache import caches
+from django.db import transaction
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+
+from ..models import LogEntry, LogSheet, Trip
+from ..view_cache import LOG_SHEET_TRIP_TIMEOUT, ViewCache, view_cache
+from .utils import TEST_CACHES, TripAPITestMixin
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ViewCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        caches['views'].clear()
+        self.view_cache = ViewCache(timeout=60, grace=60)
+        self.renders = 0
+
+    def slow_render(self, value='fresh', started=None):
+        def render():
+            self.renders += 1
+            if started is not None:
+                started.set()
+            time.sleep(0.2)
+            return value
+        return render
+
+    def make_stale(self, key, value='stale'):
+        caches['views'].set(key, (time.time() - 1, value), 60)
+
+    def test_concurrent_misses_render_once(self):
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(
+                lambda _: self.view_cache.get_or_render('entry', self.slow_render()), range(8)
+            ))
+        self.assertEqual(results, ['fresh'] * 8)
+        self.assertEqual(self.renders, 1)
+        self.assertEqual(self.view_cache._local_locks, {})
+
+    def test_stale_entry_refreshed_once_while_served(self):
+        self.make_stale('entry')
+        started = threading.Event()
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            refresh = executor.submit(self.view_cache.get_or_render, 'entry', self.slow_render(started=started))
+            started.wait(1)
+            # Served the stale copy without waiting for the refresh
+            self.assertEqual(self.view_cache.get_or_render('entry', self.slow_render('other')), 'stale')
+            self.assertEqual(refresh.result(), 'fresh')
+        self.assertEqual(self.renders, 1)
+        self.assertEqual(self.view_cache.get_or_render('entry', self.slow_render('other')), 'fresh')
+
+    def test_locks_are_per_key(self):
+        started = threading.Event()
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            first = executor.submit(self.view_cache.get_or_render, 'first', self.slow_render(started=started))
+            started.wait(1)
+            with self.view_cache.local_lock('second', blocking=False) as acquired:
+                self.assertTrue(acquired)
+            self.assertEqual(first.result(), 'fresh')
+
+    def test_shared_locks_only_with_atomic_add(self):
+        self.assertFalse(self.view_cache.shared_locks)
+        with override_settings(CACHES={'views': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                                                 'LOCATION': '/tmp/eld-view-cache-test'}}):
+            self.assertFalse(ViewCache().shared_locks)
+
+        # Without shared locks a lock key left by another process is ignored
+        self.make_stale('entry')
+        caches['views'].set('entry:lock', 1, 60)
+        self.assertEqual(self.view_cache.get_or_render('entry', lambda: 'fresh'), 'fresh')
+
+        self.make_stale('entry')
+        with mock.patch.object(ViewCache, 'shared_locks', True):
+            self.assertEqual(self.view_cache.get_or_render('entry', lambda: 'fresh'), 'stale')
+            caches['views'].delete('entry:lock')
+            self.assertEqual(self.view_cache.get_or_render('entry', lambda: 'fresh'), 'fresh')
+        self.assertIsNone(caches['views'].get('entry:lock'))
+
+    def test_missing_values_are_not_cached(self):
+        self.assertIsNone(self.view_cache.get_or_render('entry', lambda: None))
+        self.assertEqual(self.view_cache.get_or_render('entry', lambda: 'fresh'), 'fresh')
+
+    def test_zero_timeout_disables_the_cache(self):
+        disabled = ViewCache(timeout=0)
+        disabled.get_or_render('entry', self.slow_render())
+        disabled.get_or_render('entry', self.slow_render())
+        self.assertEqual(self.renders, 2)
+        self.assertIsNone(caches['views'].get('entry'))
+
+    def test_tokens_change_on_replace(self):
+        key = self.view_cache.trip_key(1)
+        list_key = self.view_cache.list_key('http://testserver/api/trips/')
+        self.assertEqual(self.view_cache.trip_key(1), key)
+        self.view_cache.replace_tokens(1)
+        self.assertNotEqual(self.view_cache.trip_key(1), key)
+        self.assertNotEqual(self.view_cache.list_key('http://testserver/api/trips/'), list_key)
+        self.assertNotEqual(self.view_cache.trip_key(2), self.view_cache.trip_key(1))
+
+
+@override_settings(CACHES=TEST_CACHES)
+class CachedViewInvalidationTests(TripAPITestMixin, TransactionTestCase):
+    """Changes committed to a trip's rows show up in its cached views"""
+
+    def setUp(self):
+        super().setUp()
+        self.trip = self.create_trip(1200)
+        self.log_sheet = LogSheet.objects.filter(trip=self.trip).first()
+        self.trip_url = f'/api/trips/{self.trip.id}/'
+        self.log_sheet_url = f'/api/log-sheets/{self.log_sheet.id}/'
+
+    def test_entry_changes_invalidate_views(self):
+        trip_etag = self.client.get(self.trip_url)['ETag']
+        sheet_etag = self.client.get(self.log_sheet_url)['ETag']
+        list_etag = self.client.get('/api/trips/')['ETag']
+
+        with transaction.atomic():
+            for entry in LogEntry.objects.filter(log_sheet__trip=self.trip):
+                entry.remarks = 'Checked'
+                entry.save()
+
+        response = self.client.get(self.trip_url, HTTP_IF_NONE_MATCH=trip_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'"Checked"', response.content)
+        response = self.client.get(self.log_sheet_url, HTTP_IF_NONE_MATCH=sheet_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'"Checked"', response.content)
+        self.assertEqual(self.client.get('/api/trips/', HTTP_IF_NONE_MATCH=list_etag).status_code, 200)
+
+    def test_rolled_back_changes_keep_views(self):
+        trip_etag = self.client.get(self.trip_url)['ETag']
+        with self.assertRaises(ValueError), transaction.atomic():
+            entry = LogEntry.objects.filter(log_sheet=self.log_sheet).first()
+            entry.remarks = 'Rolled back'
+            entry.save()
+            raise ValueError
+        self.assertEqual(self.client.get(self.trip_url, HTTP_IF_NONE_MATCH=trip_etag).status_code, 304)
+
+        # The next transaction invalidates again
+        entry.save()
+        self.assertEqual(self.client.get(self.trip_url, HTTP_IF_NONE_MATCH=trip_etag).status_code, 200)
+
+    def test_trip_change_and_delete(self):
+        list_etag = self.client.get('/api/trips/')['ETag']
+        trip = Trip.objects.get(id=self.trip.id)
+        trip.pickup_location = 'Depot'
+        trip.save()
+        self.assertIn(b'"Depot"', self.client.get(self.trip_url).content)
+        self.assertEqual(self.client.get('/api/trips/', HTTP_IF_NONE_MATCH=list_etag).status_code, 200)
+
+        trip.delete()
+        self.assertEqual(self.client.get(self.trip_url).status_code, 404)
+        self.assertEqual(self.client.get(self.log_sheet_url).status_code, 404)
+        self.assertEqual(self.client.get('/api/trips/').json()['results'], [])
+
+    def test_cached_reads_skip_rendering(self):
+        self.client.get(self.trip_url)
+        with mock.patch('eld_api.views.render_trip_detail') as render:
+            self.assertEqual(self.client.get(self.trip_url).status_code, 200)
+        render.assert_not_called()
+
+    def test_log_sheet_trip_mapping_expires(self):
+        with mock.patch.object(caches['views'], 'set', wraps=caches['views'].set) as cache_set:
+            view_cache.log_sheet_key(self.log_sheet.id)
+        cache_set.assert_called_once_with(f'view:sheet:{self.log_sheet.id}:trip', self.trip.id, LOG_SHEET_TRIP_TIMEOUT)
@@ -0,0 +1,41 @@
+from unittest import mock
+
+from django.core.cache import caches
+
+from ..benchmarks import FixedGeocoder
+from ..geocoding import geocode_cache
+from ..models import Trip
+
+# Local memory caches, so tests neither read nor leave files under cache/
+TEST_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'test-default'},
+    'views': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'test-views'},
+}
+
+
+class TripAPITestMixin:
+    """Creates trips through the API with an offline geocoder; use with override_settings(CACHES=TEST_CACHES)"""
+
+    def setUp(self):
+        super().setUp()
+        for alias in TEST_CACHES:
+            caches[alias].clear()
+        # The in-process geocode tier would outlive the rolled-back database tier
+        geocode_cache.clear()
+        patcher = mock.patch('eld_api.services.get_geocoder', return_value=FixedGeocoder())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def create_trip(self, miles, cycle_hours='10.00'):
+        response = self.client.post('/api/trips/create/', self.trip_payload(miles, cycle_hours),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 201, response.content)
+        return Trip.objects.get(id=response.json()['trip']['id'])
+
+    def trip_payload(self, miles, cycle_hours='10.00'):
+        return {
+            'current_location': 'Origin',
+            'pickup_location': 'Origin',
+            'dropoff_location': f'Destination {miles}',
+            'current_cycle_hours': cycle_hours,
+        }
@@ -0,0 +1,29 @@
+"""Work done once per transaction, however many rows it touches."""
+from django.db import transaction
+
+
+def first_in_transaction(key, using=None):
+    """Whether `key` is new to the current transaction, recording it if so; always True outside one.
+
+    Keys are kept in a set on the connection, next to the list of commit
+    hooks they belong to. Django starts a new list on commit and on
+    rollback, and the set is started afresh with it, so each check is a set
+    lookup however many rows the transaction saves.
+    """
+    connection = transaction.get_connection(using)
+    if not connection.in_atomic_block:
+        return True
+    hooks, keys = getattr(connection, 'eld_transaction_keys', (None, None))
+    if hooks is not connection.run_on_commit:
+        keys = set()
+        connection.eld_transaction_keys = (connection.run_on_commit, keys)
+    if key in keys:
+        return False
+    keys.add(key)
+    return True
+
+
+def on_commit_once(key, callback, using=None):
+    """Run `callback` when the current transaction commits, unless a hook with the same key is already registered"""
+    if first_in_transaction(key, using):
+        transaction.on_commit(callback, using=using)
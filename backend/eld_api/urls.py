@@ -1,12 +1,30 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
+# Under an ASGI server the route-planning endpoints can be served by their
+# async versions, which do not hold a worker while geocoding
+if settings.ASYNC_VIEWS:
+    create_trip_view = views.create_trip_async
+    calculate_route_view = views.calculate_route_only_async
+else:
+    create_trip_view = views.create_trip
+    calculate_route_view = views.calculate_route_only
+
 urlpatterns = [
     path('test/', views.test_api, name='test_api'),
     path('trips/', views.trip_list, name='trip_list'),
-    path('trips/create/', views.create_trip, name='create_trip'),
+    path('trips/create/', create_trip_view, name='create_trip'),
     path('trips/<int:trip_id>/', views.trip_detail, name='trip_detail'),
+    path('trips/<int:trip_id>/pdf/', views.download_trip_pdf, name='download_trip_pdf'),
+    path('log-sheets/pdf/', views.download_log_sheets_pdf, name='download_log_sheets_pdf'),
+    path('log-sheets/eld-output/', views.download_eld_output_file, name='download_eld_output_file'),
     path('log-sheets/<int:log_sheet_id>/', views.log_sheet_detail, name='log_sheet_detail'),
     path('log-sheets/<int:log_sheet_id>/pdf/', views.download_log_sheet_pdf, name='download_log_sheet_pdf'),
-    path('calculate-route/', views.calculate_route_only, name='calculate_route_only'),
+    path('exports/trips.ndjson', views.export_trips, name='export_trips'),
+    path('exports/', views.create_export, name='create_export'),
+    path('exports/<int:job_id>/', views.export_detail, name='export_detail'),
+    path('exports/<int:job_id>/download/', views.download_export, name='download_export'),
+    path('calculate-route/', calculate_route_view, name='calculate_route_only'),
+    path('distance-matrix/', views.distance_matrix, name='distance_matrix'),
 ] 
\ No newline at end of file
@@ -0,0 +1,193 @@
+"""Versioned cache of rendered trip and log sheet responses.
+
+trip_detail, log_sheet_detail and trip_list pages are cached as rendered
+JSON plus their validators in the 'views' cache alias, which can be a
+local-memory, file or Redis backend. Each trip has a version token, and
+its entry keys include that token. List pages share one list token, since
+a page can hold any trip. Once a transaction that changed a trip or one of
+its rows commits, signals replace that trip's token and the list token.
+Stale entries are then never read again and simply expire. A token also
+records when its write happened. Within DATABASE_REPLICA_STICKY_SECONDS of
+that write, entries are rendered from the primary, as a replica may not
+have the write yet.
+
+Stampede protection: entries are kept VIEW_CACHE_GRACE seconds past their
+freshness. Requests in one process take a lock per key, so each process
+renders a missing entry once while its other requests wait for it. A stale
+entry is refreshed by one request while the others serve the stale copy.
+With a backend whose add() is atomic across processes (Redis, Memcached,
+database), that request also takes a short lock in the cache, so only one
+process refreshes it. File and local-memory caches have no such add(), so
+there each process refreshes on its own. Requests never poll for another
+process's render; a process with no copy renders one itself.
+"""
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .db_router import primary_reads
+from .metrics import observe_cache
+from .models import LogSheet
+from .transactions import on_commit_once
+
+LIST_TOKEN_KEY = 'view:trips:token'
+
+# Backends whose add() is atomic across processes, so a lock key in the cache excludes other processes
+ATOMIC_ADD_BACKENDS = ('RedisCache', 'PyMemcacheCache', 'PyLibMCCache', 'DatabaseCache')
+
+# Seconds a log sheet's trip id stays cached; sheets never move to another trip
+LOG_SHEET_TRIP_TIMEOUT = 24 * 60 * 60
+
+
+def trip_token_key(trip_id):
+    return f'view:trip:{trip_id}:token'
+
+
+def new_token(written_at=0):
+    return f'{uuid.uuid4().hex[:8]}-{int(written_at)}'
+
+
+def token_written_at(key):
+    """Time of the write that set the token ending an entry key (0 when unknown)"""
+    try:
+        return int(key.rpartition('-')[2])
+    except ValueError:
+        return 0
+
+
+class ViewCache:
+    """Rendered responses keyed by trip and list version tokens"""
+
+    def __init__(self, alias='views', timeout=None, grace=None, lock_timeout=None):
+        self.alias = alias
+        self.timeout = getattr(settings, 'VIEW_CACHE_TIMEOUT', 300) if timeout is None else timeout
+        self.grace = getattr(settings, 'VIEW_CACHE_GRACE', 60) if grace is None else grace
+        self.lock_timeout = lock_timeout or getattr(settings, 'VIEW_CACHE_LOCK_TIMEOUT', 10)
+        # Per-key locks with the number of requests holding or waiting for each
+        self._local_locks = {}
+        self._local_locks_lock = threading.Lock()
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    @property
+    def shared_locks(self):
+        """True when lock keys in the cache exclude other processes"""
+        return type(self.cache).__name__ in ATOMIC_ADD_BACKENDS
+
+    def tokens(self, *token_keys):
+        """Current version tokens for the given keys, created when missing (or evicted)"""
+        tokens = self.cache.get_many(token_keys)
+        for key in token_keys:
+            if key not in tokens:
+                token = new_token()
+                tokens[key] = token if self.cache.add(key, token, None) else self.cache.get(key, token)
+        return [tokens[key] for key in token_keys]
+
+    def trip_key(self, trip_id):
+        token, = self.tokens(trip_token_key(trip_id))
+        return f'view:trip:{trip_id}:{token}'
+
+    def log_sheet_key(self, log_sheet_id):
+        """Key of a log sheet's entry under its trip's token; None if there is no such sheet"""
+        mapping_key = f'view:sheet:{log_sheet_id}:trip'
+        trip_id = self.cache.get(mapping_key)
+        if trip_id is None:
+            trip_id = LogSheet.objects.filter(id=log_sheet_id).values_list('trip_id', flat=True).first()
+            if trip_id is None:
+                return None
+            self.cache.set(mapping_key, trip_id, LOG_SHEET_TRIP_TIMEOUT)
+        token, = self.tokens(trip_token_key(trip_id))
+        return f'view:sheet:{log_sheet_id}:{token}'
+
+    def list_key(self, url):
+        """Key of a trip list page; the absolute URL covers the query and the host in its links"""
+        token, = self.tokens(LIST_TOKEN_KEY)
+        return f'view:trips:{uuid.uuid5(uuid.NAMESPACE_URL, url).hex}:{token}'
+
+    @contextmanager
+    def local_lock(self, key, blocking=True):
+        """Hold this process's lock for `key`; yields whether it was acquired"""
+        with self._local_locks_lock:
+            lock, users = self._local_locks.get(key, (None, 0))
+            lock = lock or threading.Lock()
+            self._local_locks[key] = (lock, users + 1)
+        acquired = lock.acquire(blocking)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                lock.release()
+            with self._local_locks_lock:
+                users = self._local_locks[key][1] - 1
+                if users:
+                    self._local_locks[key] = (lock, users)
+                else:
+                    del self._local_locks[key]
+
+    def get_or_render(self, key, render):
+        """Cached value of `key`, rendering and storing it when stale or missing.
+
+        `render` returns the value, or None for something that does not
+        exist, which is not cached.
+        """
+        if not self.timeout:
+            return render()
+        entry = self.cache.get(key)
+        observe_cache('views', entry is not None)
+        if entry is not None and entry[0] > time.time():
+            return entry[1]
+
+        if entry is not None:
+            # Past its freshness, one request refreshes it while the others serve it as is
+            with self.local_lock(key, blocking=False) as acquired:
+                if not acquired:
+                    return entry[1]
+                lock_key = f'{key}:lock' if self.shared_locks else None
+                if lock_key is not None and not self.cache.add(lock_key, 1, self.lock_timeout):
+                    return entry[1]
+                return self._render(key, lock_key, render)
+
+        # Missing: the first request in this process renders it, the others wait for that render
+        with self.local_lock(key):
+            entry = self.cache.get(key)
+            if entry is not None:
+                return entry[1]
+            return self._render(key, None, render)
+
+    def _render(self, key, lock_key, render):
+        try:
+            if time.time() - token_written_at(key) < getattr(settings, 'DATABASE_REPLICA_STICKY_SECONDS', 5):
+                with primary_reads():
+                    value = render()
+            else:
+                value = render()
+            if value is not None:
+                self.cache.set(key, (time.time() + self.timeout, value), self.timeout + self.grace)
+            return value
+        finally:
+            if lock_key is not None:
+                self.cache.delete(lock_key)
+
+    def invalidate_trip(self, trip_id, using=None):
+        """Replace a trip's token and the list token once the current transaction commits"""
+        if trip_id is None:
+            return
+        on_commit_once((self.alias, trip_id), partial(self.replace_tokens, trip_id), using)
+
+    def replace_tokens(self, trip_id):
+        """Give a trip, and the trip list, new version tokens"""
+        now = time.time()
+        self.cache.set_many({
+            trip_token_key(trip_id): new_token(now),
+            LIST_TOKEN_KEY: new_token(now),
+        }, None)
+
+
+view_cache = ViewCache()
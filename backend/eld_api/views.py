@@ -1,169 +1,646 @@
 from rest_framework import status
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.shortcuts import get_object_or_404
-from django.http import HttpResponse
-from .models import Trip, Route, LogSheet, LogEntry
-from .serializers import TripSerializer, TripCreateSerializer, LogSheetSerializer
+from django.http import (
+    FileResponse, Http404, HttpResponse, HttpResponseNotAllowed, HttpResponseNotModified, JsonResponse,
+    StreamingHttpResponse
+)
+from django.db import transaction
+from django.db.models import Count
+from django.utils.cache import patch_cache_control
+from django.utils.dateparse import parse_date
+from django.utils.http import quote_etag
+from django.views.decorators.csrf import csrf_exempt
+from .models import Trip, Route, LogSheet, LogEntry, ExportJob, TripSnapshot
+from .serializers import (
+    TripSerializer, TripCreateSerializer, ExportJobSerializer, DistanceMatrixSerializer
+)
 from .services import RouteService, ELDService
 from .pdf_service import ELDPDFService
-from decimal import Decimal
+from .pdf_cache import pdf_cache
+from .instrumentation import timed
+from .exports import fail_stale_export_job, start_export_job
+from .eld_output import ELDOutputFile
+from .bulk_export import EXPORT_CONTENT_TYPE, export_trips_queryset, iter_export_records, iter_ndjson
+from .snapshots import get_trip_document, get_trip_version, render_trip_document
+from .pagination import TripCursorPagination
+from .fast_serializers import LogSheetRowSerializer, TripRowSerializer
+from .renderers import FastJSONRenderer
+from .view_cache import view_cache
+from .db_router import replica_reads
+from .caching import (
+    route_plan_cache_key, get_cached_route_plan, cache_route_plan, aget_cached_route_plan, acache_route_plan,
+    etag_matches, make_etag, conditional_response, set_validators, version_etag
+)
+from decimal import Decimal, InvalidOperation
+import json
 import logging
+import os
+import tempfile
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
 
+def save_trip_plan(serializer, route_data):
+    """Save a validated trip with its planned route and ELD logs; returns the serialized trip"""
+    # Write the whole trip/route/log graph in one transaction with a
+    # fixed number of INSERTs, however long the trip is
+    with timed('db_write'), transaction.atomic():
+        trip = serializer.save(
+            total_distance=route_data['total_distance'],
+            estimated_duration=route_data['estimated_driving_hours']
+        )
+
+        Route.objects.bulk_create([
+            Route(
+                trip=trip,
+                sequence=point['sequence'],
+                location=point['location'],
+                location_type=point['location_type'],
+                distance_from_previous=point['distance_from_previous'],
+                latitude=point['latitude'],
+                longitude=point['longitude'],
+                duration_hours=point['duration_hours']
+            )
+            for point in route_data['route_points']
+        ])
+
+        # Generate ELD logs
+        eld_service = ELDService()
+        log_sheets_data = eld_service.generate_log_sheets(trip, route_data)
+
+        log_sheets = LogSheet.objects.bulk_create([
+            LogSheet(
+                trip=trip,
+                date=sheet_data['date'],
+                driver_name=sheet_data['driver_name'],
+                vehicle_id=sheet_data['vehicle_id'],
+                driving_hours=sheet_data['driving_hours'],
+                on_duty_hours=sheet_data['on_duty_hours'],
+                off_duty_hours=sheet_data['off_duty_hours'],
+                sleeper_hours=sheet_data['sleeper_hours'],
+                cycle_hours_used=sheet_data['cycle_hours_used'],
+                cycle_hours_remaining=sheet_data['cycle_hours_remaining'],
+                total_distance=sheet_data['total_distance'],
+                fuel_stops=sheet_data['fuel_stops'],
+                rest_stops=sheet_data['rest_stops']
+            )
+            for sheet_data in log_sheets_data
+        ])
+
+        # bulk_create sets primary keys on PostgreSQL and SQLite, so the
+        # entries can reference their sheets directly
+        LogEntry.objects.bulk_create([
+            LogEntry(
+                log_sheet=log_sheet,
+                time=entry_data['time'],
+                status=entry_data['status'],
+                location=entry_data['location'],
+                remarks=entry_data['remarks']
+            )
+            for log_sheet, sheet_data in zip(log_sheets, log_sheets_data)
+            for entry_data in sheet_data['entries']
+        ])
+        
+        # Render the trip document once and keep it for trip_detail
+        with timed('serialize'):
+            trip_response_data, document = render_trip_document(trip.id)
+        TripSnapshot.objects.create(trip=trip, document=document)
+    
+    return trip_response_data
+
+
 @api_view(['POST'])
 def create_trip(request):
     """Create a new trip and calculate route"""
-    logger.info(f"Received data: {request.data}")  # Debug logging
-    print(f"Received data: {request.data}")  # Debug logging
+    logger.debug(f"Received data: {request.data}")
     serializer = TripCreateSerializer(data=request.data)
     if serializer.is_valid():
-        trip = serializer.save()
+        trip_data = serializer.validated_data
         
-        # Calculate route
+        # Calculate route before opening a transaction so no locks are held
+        # while the geocoder is on the network
         route_service = RouteService()
         route_data = route_service.calculate_route(
-            trip.pickup_location,
-            trip.dropoff_location,
-            trip.current_cycle_hours
+            trip_data['pickup_location'],
+            trip_data['dropoff_location'],
+            trip_data.get('current_cycle_hours', Decimal('0.00')),
+            trip_data.get('current_location', '')
         )
         
-        if route_data:
-            # Update trip with calculated data
-            trip.total_distance = route_data['total_distance']
-            trip.estimated_duration = route_data['estimated_driving_hours']
-            trip.save()
-            
-            # Create route entries
-            for point in route_data['route_points']:
-                Route.objects.create(
-                    trip=trip,
-                    sequence=point['sequence'],
-                    location=point['location'],
-                    location_type=point['location_type'],
-                    distance_from_previous=point['distance_from_previous'],
-                    duration_hours=point['duration_hours']
-                )
-            
-            # Generate ELD logs
-            eld_service = ELDService()
-            log_sheets_data = eld_service.generate_log_sheets(trip, route_data)
-            
-            for sheet_data in log_sheets_data:
-                log_sheet = LogSheet.objects.create(
-                    trip=trip,
-                    date=sheet_data['date'],
-                    driver_name=sheet_data['driver_name'],
-                    vehicle_id=sheet_data['vehicle_id'],
-                    driving_hours=sheet_data['driving_hours'],
-                    on_duty_hours=sheet_data['on_duty_hours'],
-                    off_duty_hours=sheet_data['off_duty_hours'],
-                    sleeper_hours=sheet_data['sleeper_hours'],
-                    cycle_hours_used=sheet_data['cycle_hours_used'],
-                    cycle_hours_remaining=sheet_data['cycle_hours_remaining'],
-                    total_distance=sheet_data['total_distance'],
-                    fuel_stops=sheet_data['fuel_stops'],
-                    rest_stops=sheet_data['rest_stops']
-                )
-                
-                # Create log entries
-                for entry_data in sheet_data['entries']:
-                    LogEntry.objects.create(
-                        log_sheet=log_sheet,
-                        time=entry_data['time'],
-                        status=entry_data['status'],
-                        location=entry_data['location'],
-                        remarks=entry_data['remarks']
-                    )
-            
-            # Return complete trip data
-            trip_serializer = TripSerializer(trip)
-            return Response({
-                'trip': trip_serializer.data,
-                'route_data': route_data,
-                'message': 'Trip created successfully with route and ELD logs'
-            }, status=status.HTTP_201_CREATED)
-        else:
-            trip.delete()
+        if not route_data:
             return Response({
                 'error': 'Could not calculate route for the given locations'
             }, status=status.HTTP_400_BAD_REQUEST)
+        
+        trip_response_data = save_trip_plan(serializer, route_data)
+        return Response({
+            'trip': trip_response_data,
+            'route_data': route_data,
+            'message': 'Trip created successfully with route and ELD logs'
+        }, status=status.HTTP_201_CREATED)
     
-    print(f"Serializer errors: {serializer.errors}")  # Debug logging
+    logger.debug(f"Serializer errors: {serializer.errors}")
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+def cached_json_response(request, body, etag, last_modified):
+    """Response for a cached (body, etag, last modified) entry, or 304 when the client's copy is current"""
+    if etag is not None:
+        response = conditional_response(request, etag, last_modified)
+        if response is not None:
+            return response
+    response = HttpResponse(body, content_type='application/json')
+    if etag is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def render_trip_detail(trip_id):
+    trip_version = get_trip_version(trip_id)
+    if trip_version is None:
+        return None
+    version, last_modified = trip_version
+    document = get_trip_document(trip_id)
+    if document is None:
+        return None
+    return document, version_etag('trip', trip_id, version, last_modified), last_modified
+
+
 @api_view(['GET'])
+@replica_reads
 def trip_detail(request, trip_id):
-    """Get detailed trip information"""
-    trip = get_object_or_404(Trip, id=trip_id)
-    serializer = TripSerializer(trip)
-    return Response(serializer.data)
+    """Get detailed trip information, served from the trip's stored snapshot.
+    
+    The response is kept in the view cache under the trip's version, so a
+    repeated read, or a revalidation of an unchanged trip, needs no query.
+    """
+    cached = view_cache.get_or_render(view_cache.trip_key(trip_id), lambda: render_trip_detail(trip_id))
+    if cached is None:
+        raise Http404('No Trip matches the given query.')
+    return cached_json_response(request, *cached)
+
+
+TRIP_NESTED_FIELDS = ('routes', 'log_sheets')
+
+
+def render_trip_list(request):
+    include = request.GET.get('include')
+    include = set(TRIP_NESTED_FIELDS) if include is None else set(filter(None, include.split(',')))
+    
+    trips = Trip.objects.all()
+    if 'log_sheets' not in include:
+        trips = trips.annotate(log_sheet_count=Count('log_sheets'))
+    
+    fields = request.GET.get('fields')
+    fields = set(filter(None, fields.split(','))) if fields else set(TripSerializer().fields)
+    fields -= set(TRIP_NESTED_FIELDS) - include
+    
+    # The ETag comes from the page's trip ids and versions, read from the keyset index. List
+    # pages get no Last-Modified: deleting a trip or shifting a page changes the ids but not
+    # the newest updated_at, so only the ETag tracks them
+    paginator = TripCursorPagination()
+    page = paginator.paginate_queryset(Trip.objects.values_list('created_at', 'id', 'snapshot__version'), request)
+    etag = None
+    # Trips written before versioning have no snapshot yet; such pages get no validators
+    if all(version is not None for _, _, version in page):
+        etag = make_etag([[list(row[1:]) for row in page], paginator.has_next])
+    
+    # Serialized from value rows; the output is the same as TripSerializer's
+    serializer = TripRowSerializer(fields=fields)
+    rows = serializer.values_list(trips.filter(id__in=[trip_id for _, trip_id, _ in page]))
+    data = paginator.get_paginated_response(serializer.serialize(rows.order_by('-created_at', '-id'))).data
+    return FastJSONRenderer().render(data), etag, None
 
 
 @api_view(['GET'])
+@replica_reads
 def trip_list(request):
-    """Get list of all trips"""
-    trips = Trip.objects.all().order_by('-created_at')
-    serializer = TripSerializer(trips, many=True)
-    return Response(serializer.data)
+    """Get a page of trips, newest first.
+    
+    `?include=routes,log_sheets` picks the nested collections to return (both
+    when omitted, none for `?include=`), `?fields=` limits the trip fields,
+    and `?cursor=`/`?limit=` page through the results. Pages are kept in the
+    view cache until any trip changes.
+    """
+    cached = view_cache.get_or_render(
+        view_cache.list_key(request.build_absolute_uri()), lambda: render_trip_list(request)
+    )
+    return cached_json_response(request, *cached)
+
+
+def render_log_sheet_detail(log_sheet_id):
+    sheet = LogSheet.objects.filter(id=log_sheet_id).values_list(
+        'trip__snapshot__version', 'trip__snapshot__updated_at'
+    ).first()
+    if sheet is None:
+        return None
+    version, last_modified = sheet
+    log_sheets = LogSheetRowSerializer().serialize(LogSheet.objects.filter(id=log_sheet_id))
+    if not log_sheets:
+        return None
+    etag = version_etag('sheet', log_sheet_id, version, last_modified) if version is not None else None
+    return FastJSONRenderer().render(log_sheets[0]), etag, last_modified
 
 
 @api_view(['GET'])
+@replica_reads
 def log_sheet_detail(request, log_sheet_id):
-    """Get detailed log sheet information"""
-    log_sheet = get_object_or_404(LogSheet, id=log_sheet_id)
-    serializer = LogSheetSerializer(log_sheet)
-    return Response(serializer.data)
+    """Get detailed log sheet information, cached and revalidated against its trip's version"""
+    key = view_cache.log_sheet_key(log_sheet_id)
+    cached = None
+    if key is not None:
+        cached = view_cache.get_or_render(key, lambda: render_log_sheet_detail(log_sheet_id))
+    if cached is None:
+        raise Http404('No LogSheet matches the given query.')
+    return cached_json_response(request, *cached)
+
+
+def parse_query_date(value):
+    """Date from a YYYY-MM-DD query parameter, or None when missing or invalid"""
+    try:
+        return parse_date(value or '')
+    except ValueError:
+        return None
+
+
+def parse_cycle_hours(value):
+    """Cycle hours from a query parameter, defaulting to zero when invalid"""
+    try:
+        current_cycle_hours = Decimal(value)
+    except (ValueError, TypeError, InvalidOperation):
+        return Decimal('0.00')
+    if not current_cycle_hours.is_finite():
+        return Decimal('0.00')
+    return current_cycle_hours
 
 
 @api_view(['GET'])
 def calculate_route_only(request):
-    """Calculate route without creating a trip"""
+    """Calculate route without creating a trip.
+    
+    Plans are cached by normalized endpoints and cycle-hours bucket and
+    served with an ETag, so a repeated preview with If-None-Match gets a 304
+    without the plan being rebuilt.
+    """
     pickup_location = request.GET.get('pickup_location')
     dropoff_location = request.GET.get('dropoff_location')
     current_cycle_hours = request.GET.get('current_cycle_hours', 0)
+    current_location = request.GET.get('current_location')
     
     if not pickup_location or not dropoff_location:
         return Response({
             'error': 'pickup_location and dropoff_location are required'
         }, status=status.HTTP_400_BAD_REQUEST)
     
-    try:
-        current_cycle_hours = Decimal(current_cycle_hours)
-    except (ValueError, TypeError):
-        current_cycle_hours = Decimal('0.00')
+    current_cycle_hours = parse_cycle_hours(current_cycle_hours)
     
-    route_service = RouteService()
-    route_data = route_service.calculate_route(
-        pickup_location,
-        dropoff_location,
-        current_cycle_hours
-    )
+    plan_key = route_plan_cache_key(pickup_location, dropoff_location, current_cycle_hours, current_location)
+    plan = get_cached_route_plan(plan_key)
+    if plan is None:
+        route_service = RouteService()
+        route_data = route_service.calculate_route(
+            pickup_location,
+            dropoff_location,
+            current_cycle_hours,
+            current_location
+        )
+        
+        if not route_data:
+            return Response({
+                'error': 'Could not calculate route for the given locations'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        plan = cache_route_plan(plan_key, route_data)
     
-    if route_data:
-        return Response(route_data)
+    if etag_matches(request, plan['etag']):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
     else:
-        return Response({
+        response = Response(plan['route_data'])
+    response['ETag'] = plan['etag']
+    patch_cache_control(response, private=True, max_age=settings.ROUTE_PLAN_MAX_AGE)
+    return response
+
+
+async def calculate_route_only_async(request):
+    """Async calculate_route_only for ASGI servers; same parameters, caching and responses"""
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    
+    pickup_location = request.GET.get('pickup_location')
+    dropoff_location = request.GET.get('dropoff_location')
+    current_cycle_hours = parse_cycle_hours(request.GET.get('current_cycle_hours', 0))
+    current_location = request.GET.get('current_location')
+    
+    if not pickup_location or not dropoff_location:
+        return JsonResponse({
+            'error': 'pickup_location and dropoff_location are required'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    plan_key = route_plan_cache_key(pickup_location, dropoff_location, current_cycle_hours, current_location)
+    plan = await aget_cached_route_plan(plan_key)
+    if plan is None:
+        route_service = await sync_to_async(RouteService)()
+        route_data = await route_service.acalculate_route(
+            pickup_location,
+            dropoff_location,
+            current_cycle_hours,
+            current_location
+        )
+        
+        if not route_data:
+            return JsonResponse({
+                'error': 'Could not calculate route for the given locations'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        plan = await acache_route_plan(plan_key, route_data)
+    
+    if etag_matches(request, plan['etag']):
+        response = HttpResponseNotModified()
+    else:
+        response = JsonResponse(plan['route_data'], encoder=JSONEncoder)
+    response['ETag'] = plan['etag']
+    patch_cache_control(response, private=True, max_age=settings.ROUTE_PLAN_MAX_AGE)
+    return response
+
+
+@csrf_exempt
+async def create_trip_async(request):
+    """Async create_trip for ASGI servers: geocoding is awaited, the ORM writes run in a thread"""
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+    
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return JsonResponse({'error': 'Invalid JSON body'}, status=status.HTTP_400_BAD_REQUEST)
+    else:
+        data = request.POST
+    logger.debug(f"Received data: {data}")
+    
+    serializer = TripCreateSerializer(data=data)
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST, encoder=JSONEncoder)
+    trip_data = serializer.validated_data
+    
+    route_service = await sync_to_async(RouteService)()
+    route_data = await route_service.acalculate_route(
+        trip_data['pickup_location'],
+        trip_data['dropoff_location'],
+        trip_data.get('current_cycle_hours', Decimal('0.00')),
+        trip_data.get('current_location', '')
+    )
+    
+    if not route_data:
+        return JsonResponse({
             'error': 'Could not calculate route for the given locations'
         }, status=status.HTTP_400_BAD_REQUEST)
+    
+    trip_response_data = await sync_to_async(save_trip_plan)(serializer, route_data)
+    return JsonResponse({
+        'trip': trip_response_data,
+        'route_data': route_data,
+        'message': 'Trip created successfully with route and ELD logs'
+    }, status=status.HTTP_201_CREATED, encoder=JSONEncoder)
+
+
+@api_view(['POST'])
+def distance_matrix(request):
+    """Distances in miles between every origin and every destination"""
+    serializer = DistanceMatrixSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    data = serializer.validated_data
+    route_service = RouteService()
+    origins, destinations, distances = route_service.distance_matrix(
+        data['origins'],
+        data['destinations'],
+        data['mode']
+    )
+    return Response({
+        'mode': data['mode'],
+        'origins': origins,
+        'destinations': destinations,
+        'distances': distances
+    })
 
 
 @api_view(['GET'])
+@replica_reads
 def download_log_sheet_pdf(request, log_sheet_id):
-    """Download ELD log sheet as PDF"""
-    log_sheet = get_object_or_404(LogSheet, id=log_sheet_id)
+    """Download ELD log sheet as PDF, rendering it only when not cached"""
+    log_sheet = get_object_or_404(
+        LogSheet.objects.select_related('trip').prefetch_related('entries'),
+        id=log_sheet_id
+    )
     trip = log_sheet.trip
     
+    digest = pdf_cache.content_hash(log_sheet, trip)
+    etag = quote_etag(digest)
+    if etag_matches(request, etag):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+    
+    pdf_file = pdf_cache.open(log_sheet.id, digest)
+    if pdf_file is None:
+        pdf_service = ELDPDFService()
+        pdf_file = pdf_service.generate_log_sheet_pdf(log_sheet, trip)
+        with pdf_file.getbuffer() as pdf_data:
+            pdf_cache.put(log_sheet.id, digest, pdf_data)
+    
+    response = FileResponse(
+        pdf_file,
+        as_attachment=True,
+        filename=f"eld_log_sheet_{log_sheet.date}.pdf",
+        content_type='application/pdf'
+    )
+    response['ETag'] = etag
+    
+    return response
+
+
+PDF_STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def iter_file_chunks(file_obj, chunk_size=PDF_STREAM_CHUNK_SIZE):
+    """Yield a file's contents chunk by chunk, closing it at the end"""
+    try:
+        while True:
+            chunk = file_obj.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        file_obj.close()
+
+
+def stream_log_sheets_pdf(log_sheets, filename):
+    """Render log sheets into one PDF, then send it back in chunks.
+    
+    The response is buffered, not streamed as pages are laid out: the whole
+    PDF is rendered into a SpooledTemporaryFile (on disk past
+    PDF_SPOOL_MAX_BYTES) before the first byte is sent. Sheets are read
+    from the database in chunks while the layout runs, so memory stays
+    bounded however many sheets there are.
+    """
+    pdf_file = tempfile.SpooledTemporaryFile(max_size=settings.PDF_SPOOL_MAX_BYTES)
     pdf_service = ELDPDFService()
-    buffer = pdf_service.generate_log_sheet_pdf(log_sheet, trip)
+    pdf_service.generate_log_sheets_pdf(log_sheets.iterator(chunk_size=settings.PDF_EXPORT_CHUNK_SIZE), pdf_file)
+    size = pdf_file.tell()
+    pdf_file.seek(0)
     
-    response = HttpResponse(buffer.getvalue(), content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="eld_log_sheet_{log_sheet.date}.pdf"'
+    response = StreamingHttpResponse(iter_file_chunks(pdf_file), content_type='application/pdf')
+    response['Content-Length'] = size
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@api_view(['GET'])
+@replica_reads
+def download_trip_pdf(request, trip_id):
+    """Download every log sheet of a trip as one multi-page PDF (buffered, see stream_log_sheets_pdf)"""
+    trip = get_object_or_404(Trip, id=trip_id)
+    log_sheets = (
+        LogSheet.objects.filter(trip=trip)
+        .select_related('trip')
+        .prefetch_related('entries')
+        .order_by('date', 'id')
+    )
+    if not log_sheets.exists():
+        return Response({'error': 'Trip has no log sheets'}, status=status.HTTP_404_NOT_FOUND)
+    return stream_log_sheets_pdf(log_sheets, f"eld_trip_{trip.id}_log_sheets.pdf")
+
+
+@api_view(['GET'])
+@replica_reads
+def download_log_sheets_pdf(request):
+    """Download a driver's log sheets over a date range as one multi-page PDF (buffered, see stream_log_sheets_pdf)"""
+    driver_name = request.GET.get('driver_name')
+    start_date = parse_query_date(request.GET.get('start_date'))
+    end_date = parse_query_date(request.GET.get('end_date'))
     
+    if not driver_name or not start_date or not end_date:
+        return Response({
+            'error': 'driver_name, start_date and end_date (YYYY-MM-DD) are required'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    if start_date > end_date:
+        return Response({
+            'error': 'start_date must not be after end_date'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    log_sheets = (
+        LogSheet.objects.filter(driver_name=driver_name, date__range=(start_date, end_date))
+        .select_related('trip')
+        .prefetch_related('entries')
+        .order_by('date', 'id')
+    )
+    if not log_sheets.exists():
+        return Response({'error': 'No log sheets found for the given driver and dates'},
+                        status=status.HTTP_404_NOT_FOUND)
+    return stream_log_sheets_pdf(log_sheets, f"eld_log_sheets_{start_date}_{end_date}.pdf")
+
+
+@api_view(['GET'])
+def download_eld_output_file(request):
+    """Download a driver's FMCSA ELD output file (CSV) over a date range, for inspections and audits"""
+    driver_name = request.GET.get('driver_name')
+    start_date = parse_query_date(request.GET.get('start_date'))
+    end_date = parse_query_date(request.GET.get('end_date'))
+    
+    if not driver_name or not start_date or not end_date:
+        return Response({
+            'error': 'driver_name, start_date and end_date (YYYY-MM-DD) are required'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    if start_date > end_date:
+        return Response({
+            'error': 'start_date must not be after end_date'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    output_file = ELDOutputFile(driver_name, start_date, end_date, comment=request.GET.get('comment', ''))
+    if not output_file.log_sheets.exists():
+        return Response({'error': 'No log sheets found for the given driver and dates'},
+                        status=status.HTTP_404_NOT_FOUND)
+    response = StreamingHttpResponse(output_file, content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{output_file.filename}"'
+    return response
+
+
+@api_view(['POST'])
+def create_export(request):
+    """Start a background ZIP export of log sheets for a trip or a driver's date range"""
+    serializer = ExportJobSerializer(data=request.data)
+    if serializer.is_valid():
+        job = serializer.save()
+        transaction.on_commit(lambda: start_export_job(job))
+        return Response(ExportJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['GET'])
+def export_detail(request, job_id):
+    """Get the status and progress of an export job"""
+    job = get_object_or_404(ExportJob, id=job_id)
+    fail_stale_export_job(job)
+    serializer = ExportJobSerializer(job)
+    return Response(serializer.data)
+
+
+@api_view(['GET'])
+def download_export(request, job_id):
+    """Download the ZIP archive of a completed export job"""
+    job = get_object_or_404(ExportJob, id=job_id)
+    fail_stale_export_job(job)
+    if job.status != 'completed':
+        return Response({
+            'error': f'Export is {job.status}, not ready for download'
+        }, status=status.HTTP_409_CONFLICT)
+    
+    try:
+        archive = open(job.file_path, 'rb')
+    except FileNotFoundError:
+        return Response({
+            'error': 'Export archive is no longer available; start a new export'
+        }, status=status.HTTP_410_GONE)
+    return FileResponse(
+        archive,
+        as_attachment=True,
+        filename=os.path.basename(job.file_path),
+        content_type='application/zip'
+    )
+
+
+@api_view(['GET'])
+def export_trips(request):
+    """Stream trips with their routes, log sheets and entries as NDJSON for bulk loads.
+
+    Optional filters: `start_date` and `end_date` (YYYY-MM-DD, day the trip
+    was created), `driver_name`, and `cursor` to resume after a checkpoint.
+    """
+    filters = {}
+    for name in ('start_date', 'end_date'):
+        value = request.GET.get(name)
+        if value:
+            filters[name] = parse_query_date(value)
+            if filters[name] is None:
+                return Response({'error': f'{name} must be a date (YYYY-MM-DD)'},
+                                status=status.HTTP_400_BAD_REQUEST)
+    try:
+        trips = export_trips_queryset(
+            driver_name=request.GET.get('driver_name'), cursor=request.GET.get('cursor'), **filters
+        )
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    chunk_size = getattr(settings, 'TRIP_EXPORT_CHUNK_SIZE', 100)
+    response = StreamingHttpResponse(iter_ndjson(iter_export_records(trips, chunk_size)),
+                                     content_type=EXPORT_CONTENT_TYPE)
+    response['Content-Disposition'] = 'attachment; filename="trips.ndjson"'
     return response
 
 
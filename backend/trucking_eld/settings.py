@@ -52,6 +52,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'eld_api.instrumentation.PerformanceMiddleware',
+    'eld_api.compression.CompressionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -60,6 +62,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'eld_api.db_router.ReplicaRoutingMiddleware',
 ]
 
 ROOT_URLCONF = 'trucking_eld.urls'
@@ -86,11 +89,16 @@ WSGI_APPLICATION = 'trucking_eld.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# Seconds a database connection is kept open; it is health-checked before reuse
+DATABASE_CONN_MAX_AGE = int(os.environ.get('DATABASE_CONN_MAX_AGE', 60))
+
 # Use PostgreSQL in production, SQLite in development
 if os.environ.get('DATABASE_URL'):
     import dj_database_url
     DATABASES = {
-        'default': dj_database_url.parse(os.environ.get('DATABASE_URL'))
+        'default': dj_database_url.parse(
+            os.environ.get('DATABASE_URL'), conn_max_age=DATABASE_CONN_MAX_AGE, conn_health_checks=True
+        )
     }
 else:
     DATABASES = {
@@ -100,6 +108,21 @@ else:
         }
     }
 
+# Read replicas for the read-only endpoints (eld_api.db_router): each URL in
+# the comma-separated DATABASE_REPLICA_URLS becomes an alias replica1,
+# replica2, ... To try it locally, point one at the primary's own database,
+# e.g. DATABASE_REPLICA_URLS=sqlite:////path/to/backend/db.sqlite3
+REPLICA_DATABASES = {}
+for number, url in enumerate(filter(None, os.environ.get('DATABASE_REPLICA_URLS', '').split(',')), 1):
+    import dj_database_url
+    REPLICA_DATABASES[f'replica{number}'] = {
+        **dj_database_url.parse(url.strip(), conn_max_age=DATABASE_CONN_MAX_AGE, conn_health_checks=True),
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASES.update(REPLICA_DATABASES)
+DATABASE_REPLICAS = list(REPLICA_DATABASES)
+DATABASE_ROUTERS = ['eld_api.db_router.ReplicaRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -138,9 +161,10 @@ USE_TZ = True
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
-# Add whitenoise for static files in production
+# Add whitenoise for static files in production, right after SecurityMiddleware
 if not DEBUG:
-    MIDDLEWARE.insert(1, 'whitenoise.middleware.WhiteNoiseMiddleware')
+    MIDDLEWARE.insert(MIDDLEWARE.index('django.middleware.security.SecurityMiddleware') + 1,
+                      'whitenoise.middleware.WhiteNoiseMiddleware')
     STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
 # Default primary key field type
@@ -166,7 +190,8 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.AllowAny',
     ],
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        # Same output as rest_framework.renderers.JSONRenderer, through orjson when installed
+        'eld_api.renderers.FastJSONRenderer',
     ],
 }
 
@@ -194,5 +219,149 @@ LOGGING = {
             'level': 'DEBUG',
             'propagate': False,
         },
+        'eld_api.performance': {
+            'handlers': ['console'],
+            'level': os.environ.get('PERFORMANCE_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
+# Geocode cache (in-process LRU in front of the eld_api_geocodecacheentry table)
+GEOCODE_CACHE_MAX_SIZE = int(os.environ.get('GEOCODE_CACHE_MAX_SIZE', 1024))
+GEOCODE_CACHE_TTL = 60 * 60 * 24 * 30  # 30 days
+GEOCODE_CACHE_NEGATIVE_TTL = 60 * 60 * 24  # 1 day for lookups with no result
+
+# Geocoder backend: 'nominatim', or 'gazetteer' for the local index built by
+# `manage.py build_gazetteer` (misses fall back to Nominatim unless disabled)
+GEOCODER_BACKEND = os.environ.get('GEOCODER_BACKEND', 'nominatim')
+GAZETTEER_INDEX_PATH = os.environ.get('GAZETTEER_INDEX_PATH', os.path.join(BASE_DIR, 'data', 'gazetteer.idx'))
+GAZETTEER_FALLBACK = os.environ.get('GAZETTEER_FALLBACK', 'True') == 'True'
+
+# Nominatim server used for geocoding; the public one allows one request per second
+NOMINATIM_DOMAIN = os.environ.get('NOMINATIM_DOMAIN', 'nominatim.openstreetmap.org')
+PUBLIC_NOMINATIM = NOMINATIM_DOMAIN == 'nominatim.openstreetmap.org'
+
+# Concurrent geocoding of trip endpoints: pool size and per-request budget (seconds).
+# Nominatim requests are also spaced to GEOCODE_RATE_LIMIT per second in each
+# process (0 for no limit); raise both only for a self-hosted server
+GEOCODE_MAX_WORKERS = int(os.environ.get('GEOCODE_MAX_WORKERS', 1 if PUBLIC_NOMINATIM else 8))
+GEOCODE_RATE_LIMIT = float(os.environ.get('GEOCODE_RATE_LIMIT', 1 if PUBLIC_NOMINATIM else 0))
+GEOCODE_TIMEOUT = float(os.environ.get('GEOCODE_TIMEOUT', 10))
+# Socket timeout (seconds) of each Nominatim request; bounds how long a lookup
+# that outlived GEOCODE_TIMEOUT keeps holding a pool worker
+GEOCODE_REQUEST_TIMEOUT = float(os.environ.get('GEOCODE_REQUEST_TIMEOUT', 5))
+
+# Cache framework (local memory per process by default; a file backend such as
+# django.core.cache.backends.filebased.FileBasedCache shares it across workers)
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'trucking-eld'),
+    },
+    # Rendered trip, trip list and log sheet responses (eld_api.view_cache).
+    # On disk by default so that every worker sees invalidations; LocMemCache
+    # is only safe with a single process, and a Redis-compatible server works
+    # with django.core.cache.backends.redis.RedisCache and a redis:// location.
+    'views': {
+        'BACKEND': os.environ.get('VIEW_CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.environ.get('VIEW_CACHE_LOCATION', os.path.join(BASE_DIR, 'cache', 'views')),
     },
 }
+if 'redis' not in CACHES['views']['BACKEND']:
+    CACHES['views']['OPTIONS'] = {'MAX_ENTRIES': int(os.environ.get('VIEW_CACHE_MAX_ENTRIES', 5000))}
+
+# View cache: seconds an entry is fresh (0 disables the cache), seconds a
+# stale entry is still served while one request re-renders it, and how long
+# that request holds its lock in the cache (only taken on Redis, Memcached
+# and database backends, whose add() is atomic across processes)
+VIEW_CACHE_TIMEOUT = int(os.environ.get('VIEW_CACHE_TIMEOUT', 300))
+VIEW_CACHE_GRACE = int(os.environ.get('VIEW_CACHE_GRACE', 60))
+VIEW_CACHE_LOCK_TIMEOUT = int(os.environ.get('VIEW_CACHE_LOCK_TIMEOUT', 10))
+
+# calculate-route plan cache
+ROUTE_PLAN_CACHE_TTL = 60 * 60  # seconds a plan stays in the server cache
+ROUTE_PLAN_MAX_AGE = 5 * 60  # Cache-Control max-age sent to clients
+ROUTE_PLAN_CYCLE_BUCKET_HOURS = 1  # cycle hours within one bucket share a plan
+
+# Rendered log sheet PDFs, cached on disk by content hash
+PDF_CACHE_DIR = os.environ.get('PDF_CACHE_DIR', os.path.join(BASE_DIR, 'cache', 'pdf'))
+PDF_CACHE_MAX_BYTES = int(os.environ.get('PDF_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+
+# Multi-sheet PDF export: sheets fetched per query, and how much of the PDF is
+# kept in memory before spooling to a temporary file
+PDF_EXPORT_CHUNK_SIZE = 100
+PDF_SPOOL_MAX_BYTES = 1024 * 1024
+
+# Bulk ZIP export of log sheets: pool size (defaults to the CPU count) and
+# where finished archives are written
+PDF_EXPORT_WORKERS = int(os.environ['PDF_EXPORT_WORKERS']) if os.environ.get('PDF_EXPORT_WORKERS') else None
+EXPORT_DIR = os.environ.get('EXPORT_DIR', os.path.join(BASE_DIR, 'cache', 'exports'))
+# Export jobs run at once per process (others wait as pending), and seconds
+# without progress after which an unfinished job (pending since its creation
+# or running since its last heartbeat) is taken to have died with its process
+EXPORT_MAX_CONCURRENT_JOBS = int(os.environ.get('EXPORT_MAX_CONCURRENT_JOBS', 1))
+EXPORT_JOB_STALE_SECONDS = int(os.environ.get('EXPORT_JOB_STALE_SECONDS', 600))
+
+# Distance calculations (see eld_api/distance.py for error bounds):
+# 'geodesic' (exact), 'lambert' (ellipsoidal, vectorized) or 'haversine'
+ROUTE_DISTANCE_MODE = os.environ.get('ROUTE_DISTANCE_MODE', 'geodesic')
+DISTANCE_MATRIX_MAX_CELLS = 250000
+DISTANCE_MATRIX_MAX_GEODESIC_CELLS = 2500
+# Distinct location strings a distance matrix request may ask to geocode
+DISTANCE_MATRIX_MAX_GEOCODES = int(os.environ.get('DISTANCE_MATRIX_MAX_GEOCODES', 25))
+
+# Offline road routing: directory of graph arrays built by
+# `manage.py build_road_graph`; straight-line distances are used without it
+ROAD_GRAPH_PATH = os.environ.get('ROAD_GRAPH_PATH', os.path.join(BASE_DIR, 'data', 'road_graph'))
+# Endpoints farther than this from every graph node are outside the area the
+# graph covers; such trips use the straight-line estimate instead
+ROAD_SNAP_MAX_MILES = float(os.environ.get('ROAD_SNAP_MAX_MILES', 10))
+
+# Truck stop index built by `manage.py build_poi_index`; rest and fuel stops
+# are snapped to the nearest facility within POI_SNAP_RADIUS_MILES
+POI_INDEX_PATH = os.environ.get('POI_INDEX_PATH', os.path.join(BASE_DIR, 'data', 'truck_stops.npz'))
+POI_SNAP_RADIUS_MILES = float(os.environ.get('POI_SNAP_RADIUS_MILES', 25))
+
+# Serve trips/create/ and calculate-route/ with async views; enable when
+# running under an ASGI server, e.g. `uvicorn trucking_eld.asgi:application`
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', 'False') == 'True'
+
+# Baseline for `manage.py benchmark` (write it with --save on a reference machine)
+BENCHMARK_BASELINE_PATH = os.environ.get('BENCHMARK_BASELINE_PATH', os.path.join(BASE_DIR, 'benchmarks', 'baseline.json'))
+
+# Per-request instrumentation (eld_api.instrumentation.PerformanceMiddleware):
+# phase timings in a Server-Timing header and an `eld_api.performance` log
+# line per request. Requests sending `X-Profile: <PROFILE_TOKEN>`, or all
+# requests with PROFILE_REQUESTS, get a cProfile dump in PROFILE_DIR.
+SERVER_TIMING = os.environ.get('SERVER_TIMING', 'True') == 'True'
+PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN', '')
+PROFILE_REQUESTS = os.environ.get('PROFILE_REQUESTS', 'False') == 'True'
+PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(BASE_DIR, 'cache', 'profiles'))
+
+# Prometheus /metrics endpoint; when METRICS_TOKEN is set, scrapers must send
+# `Authorization: Bearer <token>`. Multi-worker aggregation is enabled by the
+# PROMETHEUS_MULTIPROC_DIR environment variable (see gunicorn.conf.py).
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Brotli level for eld_api.compression.CompressionMiddleware (0-11); JSON
+# responses fall back to gzip when the brotli package is not installed
+BROTLI_QUALITY = int(os.environ.get('BROTLI_QUALITY', 5))
+
+# Trips per chunk of the NDJSON bulk export (exports/trips.ndjson and
+# `manage.py export_trips`); bounds its memory use
+TRIP_EXPORT_CHUNK_SIZE = int(os.environ.get('TRIP_EXPORT_CHUNK_SIZE', 100))
+
+# Carrier and device identification written to FMCSA ELD output files
+# (log-sheets/eld-output/); sheets are read ELD_OUTPUT_CHUNK_SIZE at a time
+ELD_CARRIER_USDOT = os.environ.get('ELD_CARRIER_USDOT', '')
+ELD_CARRIER_NAME = os.environ.get('ELD_CARRIER_NAME', '')
+ELD_REGISTRATION_ID = os.environ.get('ELD_REGISTRATION_ID', '')
+ELD_IDENTIFIER = os.environ.get('ELD_IDENTIFIER', '')
+ELD_TIME_ZONE_OFFSET = os.environ.get('ELD_TIME_ZONE_OFFSET', '00')
+ELD_OUTPUT_CHUNK_SIZE = int(os.environ.get('ELD_OUTPUT_CHUNK_SIZE', 100))
+
+# After a client writes, its reads stay on the primary database for this many
+# seconds (and recently invalidated view cache entries are rendered from it);
+# keep it above the replicas' usual replication lag
+DATABASE_REPLICA_STICKY_SECONDS = int(os.environ.get('DATABASE_REPLICA_STICKY_SECONDS', 5))
@@ -25,8 +25,11 @@ ALLOWED_HOSTS = [
     '.herokuapp.com',
 ]
 
-# Add whitenoise for static files
-MIDDLEWARE.insert(1, 'whitenoise.middleware.WhiteNoiseMiddleware')
+# Add whitenoise for static files, right after SecurityMiddleware as in
+# settings.py (which already adds it when DEBUG is off there)
+if 'whitenoise.middleware.WhiteNoiseMiddleware' not in MIDDLEWARE:
+    MIDDLEWARE.insert(MIDDLEWARE.index('django.middleware.security.SecurityMiddleware') + 1,
+                      'whitenoise.middleware.WhiteNoiseMiddleware')
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
@@ -38,7 +41,11 @@ DATABASES = {
         'PASSWORD': os.environ.get('DATABASE_PASSWORD', ''),
         'HOST': os.environ.get('DATABASE_HOST', 'localhost'),
         'PORT': os.environ.get('DATABASE_PORT', '5432'),
-    }
+        'CONN_MAX_AGE': DATABASE_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+    },
+    # Read replicas from DATABASE_REPLICA_URLS (see settings.py)
+    **REPLICA_DATABASES,
 }
 
 # Static files (CSS, JavaScript, Images)
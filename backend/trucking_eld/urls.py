@@ -22,5 +22,6 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('eld_api.urls')),
     path('health/', views.health_check, name='health_check'),
+    path('metrics', views.metrics, name='metrics'),
     path('', views.root_view, name='root'),
 ]
@@ -1,6 +1,10 @@
-from django.http import JsonResponse
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from django.utils.crypto import constant_time_compare
 from django.views.decorators.csrf import csrf_exempt
 
+from eld_api.metrics import render_metrics
+
 @csrf_exempt
 def health_check(request):
     """Health check endpoint for deployment monitoring."""
@@ -9,6 +13,14 @@ def health_check(request):
         'message': 'Django backend is running successfully'
     })
 
+def metrics(request):
+    """Prometheus metrics, aggregated over all workers when multiprocess mode is on"""
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token and not constant_time_compare(request.META.get('HTTP_AUTHORIZATION', ''), f"Bearer {token}"):
+        return HttpResponse(status=401)
+    body, content_type = render_metrics()
+    return HttpResponse(body, content_type=content_type)
+
 @csrf_exempt
 def root_view(request):
     """Root endpoint to handle requests to /"""
@@ -16,6 +28,7 @@ def root_view(request):
         'message': 'Spotter Backend API',
         'endpoints': {
             'health': '/health/',
+            'metrics': '/metrics',
             'api_test': '/api/test/',
             'trips': '/api/trips/',
             'create_trip': '/api/trips/create/',
@@ -31,7 +31,9 @@ function TripList() {
 	const navigate = useNavigate();
 
 	const [trips, setTrips] = useState([]);
+	const [nextPage, setNextPage] = useState(null);
 	const [loading, setLoading] = useState(true);
+	const [loadingMore, setLoadingMore] = useState(false);
 	const [error, setError] = useState("");
 
 	useEffect(() => {
@@ -40,8 +42,12 @@ function TripList() {
 
 	const fetchTrips = async () => {
 		try {
-			const response = await axios.get(`${API_BASE_URL}/api/trips/`);
-			setTrips(response.data);
+			// Trip summaries only; the nested logs are loaded on the detail page
+			const response = await axios.get(`${API_BASE_URL}/api/trips/`, {
+				params: { include: "" },
+			});
+			setTrips(response.data.results);
+			setNextPage(response.data.next);
 		} catch (err) {
 			setError("Failed to load trips");
 		} finally {
@@ -49,6 +55,19 @@ function TripList() {
 		}
 	};
 
+	const fetchMoreTrips = async () => {
+		setLoadingMore(true);
+		try {
+			const response = await axios.get(nextPage);
+			setTrips((current) => [...current, ...response.data.results]);
+			setNextPage(response.data.next);
+		} catch (err) {
+			setError("Failed to load trips");
+		} finally {
+			setLoadingMore(false);
+		}
+	};
+
 	const formatDate = (dateString) => {
 		const date = new Date(dateString);
 		return date.toLocaleDateString("en-US", {
@@ -185,7 +204,7 @@ function TripList() {
 									variant="h4"
 									sx={{ fontWeight: 700, color: "success.main" }}>
 									{trips.reduce(
-										(sum, trip) => sum + (trip.log_sheets?.length || 0),
+										(sum, trip) => sum + (trip.log_sheet_count || 0),
 										0
 									)}
 								</Typography>
@@ -443,7 +462,7 @@ function TripList() {
 											<Typography
 												variant="body2"
 												sx={{ color: "text.secondary" }}>
-												{trip.log_sheets?.length || 0} log sheets generated
+												{trip.log_sheet_count || 0} log sheets generated
 											</Typography>
 										</Box>
 									</CardContent>
@@ -464,6 +483,18 @@ function TripList() {
 					))}
 				</Grid>
 			)}
+
+			{nextPage && (
+				<Box sx={{ display: "flex", justifyContent: "center", mt: 4 }}>
+					<Button
+						variant="outlined"
+						onClick={fetchMoreTrips}
+						disabled={loadingMore}
+						startIcon={loadingMore ? <CircularProgress size={16} /> : null}>
+						Load More Trips
+					</Button>
+				</Box>
+			)}
 		</Box>
 	);
 }